@@ -0,0 +1,157 @@
+"""
+OpenAI Response Cache
+Persistent, content-addressed cache of chat completions keyed by the
+normalized prompt, model and parameters
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from db_pool import get_pool
+from singleflight import SingleFlight
+
+AI_CACHE_PATH = os.getenv('AI_CACHE_PATH', 'ai_cache.db')
+
+def normalize_messages(messages: List[Dict]) -> List[Dict]:
+    """Collapse whitespace so prompts that only differ in indentation match"""
+    return [{'role': m['role'], 'content': ' '.join(m['content'].split())} for m in messages]
+
+def cache_key(model: str, messages: List[Dict], params: Dict) -> str:
+    payload = json.dumps({'model': model, 'messages': messages, 'params': params},
+                         sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class AIResponseCache:
+    """Chat completion content cached on disk with a TTL and LRU size bound"""
+
+    def __init__(self, database: str = AI_CACHE_PATH, ttl: float = 7 * 24 * 3600,
+                 max_entries: int = 20000):
+        self.database = database
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._ready = False
+        self.counters = {'hits': 0, 'misses': 0, 'latency_saved': 0.0}
+
+    def _pool(self):
+        pool = get_pool(self.database)
+        if not self._ready:
+            with pool.connection() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS ai_responses (
+                        key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        latency REAL NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used REAL NOT NULL
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_ai_responses_last_used ON ai_responses (last_used)')
+            self._ready = True
+        return pool
+
+    def chat_completion(self, model: str, messages: List[Dict],
+                        parse: Optional[Callable[[str], Any]] = None, **params) -> Any:
+        """Message content of openai.ChatCompletion.create(model, messages, **params).
+
+        Served from the cache when an identical normalized request was made
+        within the TTL; concurrent misses for the same key share one call.
+        With `parse`, its result is returned instead, and content it rejects
+        by raising is not cached, so the next call asks the API again.
+        Errors are raised, never cached.
+        """
+        messages = normalize_messages(messages)
+        key = cache_key(model, messages, params)
+        parse = parse or str
+
+        result = self._parse_cached(key, parse)
+        if result is not None:
+            return result
+        return self._flight.do(key, self._fetch, key, model, messages, params, parse)
+
+    def invalidate(self, key: str):
+        """Drop the cached response for `key`"""
+        with self._pool().connection() as conn:
+            conn.execute('DELETE FROM ai_responses WHERE key = ?', (key,))
+
+    def _parse_cached(self, key: str, parse: Callable[[str], Any]):
+        cached = self._lookup(key)
+        if cached is None:
+            return None
+        try:
+            return parse(cached)
+        except Exception:
+            # Stored before it was checked; ask again
+            self.invalidate(key)
+            return None
+
+    def _lookup(self, key: str):
+        now = time.time()
+        with self._pool().connection() as conn:
+            row = conn.execute(
+                'SELECT content, latency, created_at FROM ai_responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row['created_at'] < now - self.ttl:
+                return None
+            conn.execute('UPDATE ai_responses SET last_used = ? WHERE key = ?', (now, key))
+
+        with self._lock:
+            self.counters['hits'] += 1
+            self.counters['latency_saved'] += row['latency']
+        return row['content']
+
+    def _fetch(self, key: str, model: str, messages: List[Dict], params: Dict,
+               parse: Callable[[str], Any]) -> Any:
+        # A waiter that lost the race may find the leader's stored result
+        result = self._parse_cached(key, parse)
+        if result is not None:
+            return result
+
+        import openai
+
+        started = time.perf_counter()
+        response = openai.ChatCompletion.create(model=model, messages=messages, **params)
+        latency = time.perf_counter() - started
+        content = response.choices[0].message.content
+
+        with self._lock:
+            self.counters['misses'] += 1
+        result = parse(content)
+        self._store(key, model, content, latency)
+        return result
+
+    def _store(self, key: str, model: str, content: str, latency: float):
+        now = time.time()
+        with self._pool().connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO ai_responses (key, model, content, latency, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (key, model, content, latency, now, now))
+            conn.execute('DELETE FROM ai_responses WHERE created_at < ?', (now - self.ttl,))
+            excess = conn.execute('SELECT COUNT(*) FROM ai_responses').fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute('''
+                    DELETE FROM ai_responses WHERE key IN (
+                        SELECT key FROM ai_responses ORDER BY last_used LIMIT ?
+                    )
+                ''', (excess,))
+
+    def stats(self) -> Dict:
+        """Hit rate, coalesced calls and upstream seconds saved since startup"""
+        with self._lock:
+            hits, misses = self.counters['hits'], self.counters['misses']
+            return {
+                'hits': hits,
+                'misses': misses,
+                'coalesced': self._flight.stats['coalesced'],
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+                'latency_saved_seconds': round(self.counters['latency_saved'], 3)
+            }
+
+ai_cache = AIResponseCache()
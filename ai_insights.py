@@ -0,0 +1,145 @@
+"""
+Background AI Insights
+Insights are generated off the request path by a small worker pool and
+stored per user with the hash of the context they were generated from
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from dashboard_cache import bump_data_version
+from db_pool import DATABASE
+from db_writer import get_writer
+
+# Shown until the first insight for a user has been generated
+PENDING_INSIGHTS = [{
+    'category': 'General',
+    'icon': '⏳',
+    'message': 'Your personalized insights are being prepared.',
+    'action': 'Check back in a moment.'
+}]
+
+# A failed generation is stored under this prefix plus the context hash
+# and retried once RETRY_AFTER seconds have passed
+RETRY_PREFIX = 'retry:'
+RETRY_AFTER = 300
+
+class InsightsUnavailable(Exception):
+    """Raised by a generator that could not produce real insights.
+
+    `fallback` is shown to users who have no earlier insights; it is never
+    stored as the result for the context.
+    """
+
+    def __init__(self, message: str, fallback: List[Dict]):
+        super().__init__(message)
+        self.fallback = fallback
+
+def load_insights(conn: sqlite3.Connection, user_id: int) -> Optional[Dict]:
+    """Latest stored insights for a user, or None if none were generated yet"""
+    row = conn.execute(
+        'SELECT context_hash, insights, generated_at FROM ai_insights WHERE user_id = ?', (user_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        'context_hash': row['context_hash'],
+        'insights': json.loads(row['insights']),
+        'generated_at': row['generated_at']
+    }
+
+def needs_refresh(stored: Optional[Dict], context_hash: str) -> bool:
+    """Whether insights for `context_hash` should be (re)generated"""
+    if stored is None:
+        return True
+    if stored['context_hash'] == context_hash:
+        return False
+    if stored['context_hash'] == RETRY_PREFIX + context_hash:
+        failed_at = datetime.strptime(stored['generated_at'], '%Y-%m-%d %H:%M:%S')
+        return (datetime.utcnow() - failed_at).total_seconds() >= RETRY_AFTER
+    return True
+
+class InsightWorker:
+    """Regenerates insights in the background, at most one job per user at a time"""
+
+    def __init__(self, generate: Callable[[Dict, List[Dict]], List[Dict]],
+                 database: str = DATABASE, max_workers: int = 2):
+        self.generate = generate
+        self.database = database
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-insights')
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.stats = {'scheduled': 0, 'generated': 0, 'failed': 0}
+
+    def refresh(self, user_id: int, user_profile: Dict, recent_logs: List[Dict], context_hash: str):
+        """Queue regeneration from these inputs.
+
+        If a job for the user is already queued or running, its inputs are
+        replaced instead, so a burst of new logs costs one extra generation.
+        """
+        with self._lock:
+            already_scheduled = user_id in self._pending
+            self._pending[user_id] = (user_profile, recent_logs, context_hash)
+            if already_scheduled:
+                return
+            self.stats['scheduled'] += 1
+        self._executor.submit(self._run, user_id)
+
+    def _run(self, user_id: int):
+        while True:
+            with self._lock:
+                user_profile, recent_logs, context_hash = self._pending[user_id]
+            try:
+                insights = self.generate(user_profile, recent_logs)
+                self._store(user_id, context_hash, insights)
+                self.stats['generated'] += 1
+            except Exception as e:
+                print(f"Background AI insights error: {e}")
+                self.stats['failed'] += 1
+                try:
+                    fallback = e.fallback if isinstance(e, InsightsUnavailable) else PENDING_INSIGHTS
+                    self._store_failure(user_id, context_hash, fallback)
+                except Exception as e:
+                    print(f"Background AI insights error: {e}")
+
+            with self._lock:
+                # Inputs that arrived while generating get their own pass
+                if self._pending[user_id][2] == context_hash:
+                    del self._pending[user_id]
+                    return
+
+    def _store(self, user_id: int, context_hash: str, insights: List[Dict]):
+        def save(conn):
+            conn.execute('''
+                INSERT OR REPLACE INTO ai_insights (user_id, context_hash, insights, generated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (user_id, context_hash, json.dumps(insights)))
+            # Cached dashboards still show the previous insights
+            bump_data_version(conn, user_id)
+
+        get_writer(self.database).submit(save).result()
+
+    def _store_failure(self, user_id: int, context_hash: str, fallback: List[Dict]):
+        """Mark the context for a retry, keeping any earlier real insights on show"""
+        def save(conn):
+            conn.execute('''
+                INSERT INTO ai_insights (user_id, context_hash, insights, generated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    context_hash = excluded.context_hash, generated_at = excluded.generated_at
+            ''', (user_id, RETRY_PREFIX + context_hash, json.dumps(fallback)))
+            bump_data_version(conn, user_id)
+
+        get_writer(self.database).submit(save).result()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+def create_worker(generate: Callable, database: str = DATABASE) -> InsightWorker:
+    """Worker pool sized by AI_INSIGHT_WORKERS (default 2)"""
+    return InsightWorker(generate, database, int(os.getenv('AI_INSIGHT_WORKERS', '2')))
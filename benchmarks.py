@@ -0,0 +1,337 @@
+"""
+Performance Benchmarks
+Run with: python benchmarks.py [name ...]   (no name runs everything)
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import json
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from db_pool import ConnectionPool
+from db_writer import GroupCommitWriter
+
+def _seed_database(path, users=50, logs_per_user=120):
+    """Create a throwaway database shaped like fitness_app.db"""
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE users (email TEXT PRIMARY KEY, name TEXT NOT NULL, password TEXT NOT NULL,
+                            created_at TEXT NOT NULL, profile_data TEXT);
+        CREATE TABLE daily_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, user_email TEXT NOT NULL,
+                                 date TEXT NOT NULL, timestamp TEXT NOT NULL, data TEXT NOT NULL);
+        CREATE TABLE weekly_checkins (id INTEGER PRIMARY KEY AUTOINCREMENT, user_email TEXT NOT NULL,
+                                      week_of TEXT NOT NULL, timestamp TEXT NOT NULL, data TEXT NOT NULL);
+    ''')
+    start = datetime(2024, 1, 1)
+    for u in range(users):
+        email = f'user{u}@example.com'
+        conn.execute('INSERT INTO users VALUES (?, ?, ?, ?, ?)',
+                     (email, f'User {u}', 'x', start.isoformat(), '{}'))
+        rows = []
+        for d in range(logs_per_user):
+            day = start + timedelta(days=d)
+            data = {'date': day.strftime('%Y-%m-%d'), 'timestamp': day.isoformat(),
+                    'sleep_hours': 7, 'stress_level': 4, 'score': 7.5}
+            rows.append((email, data['date'], data['timestamp'], json.dumps(data)))
+        conn.executemany('INSERT INTO daily_logs (user_email, date, timestamp, data) VALUES (?, ?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+
+def _run_concurrently(worker, threads, requests_per_thread):
+    """Run `worker` from several threads and return requests per second"""
+    def loop(n):
+        for i in range(requests_per_thread):
+            worker(n, i)
+
+    pool = [threading.Thread(target=loop, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return (threads * requests_per_thread) / elapsed
+
+DASHBOARD_QUERIES = [
+    ('SELECT * FROM users WHERE email = ?', lambda email: (email,)),
+    ('SELECT data FROM daily_logs WHERE user_email = ? ORDER BY timestamp DESC LIMIT 30', lambda email: (email,)),
+    ('SELECT data FROM weekly_checkins WHERE user_email = ? ORDER BY timestamp', lambda email: (email,)),
+    ('SELECT COUNT(*) FROM daily_logs WHERE user_email = ?', lambda email: (email,)),
+]
+
+def bench_db_pool(threads=8, requests_per_thread=200):
+    """Dashboard-shaped read load: connect-per-query vs the shared pool"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        _seed_database(path)
+
+        def naive_request(n, i):
+            email = f'user{(n * 7 + i) % 50}@example.com'
+            for sql, params in DASHBOARD_QUERIES:
+                conn = sqlite3.connect(path)
+                conn.execute(sql, params(email)).fetchall()
+                conn.close()
+
+        pool = ConnectionPool(path, max_connections=threads)
+
+        def pooled_request(n, i):
+            email = f'user{(n * 7 + i) % 50}@example.com'
+            with pool.connection():
+                for sql, params in DASHBOARD_QUERIES:
+                    with pool.connection() as nested:
+                        nested.execute(sql, params(email)).fetchall()
+
+        naive_rps = _run_concurrently(naive_request, threads, requests_per_thread)
+        pooled_rps = _run_concurrently(pooled_request, threads, requests_per_thread)
+        pool.close_all()
+
+    print(f'db-pool: {threads} threads x {requests_per_thread} dashboard requests')
+    print(f'  connect per query: {naive_rps:8.0f} req/s')
+    print(f'  pooled (WAL):      {pooled_rps:8.0f} req/s  ({pooled_rps / naive_rps:.1f}x)')
+
+INSERT_LOG = 'INSERT INTO daily_logs (user_email, date, timestamp, data) VALUES (?, ?, ?, ?)'
+
+def bench_group_commit(threads=16, writes_per_thread=100):
+    """Concurrent log inserts: one commit per write vs the group-commit writer"""
+    def log_row(n, i):
+        return (f'user{n}@example.com', '2024-06-01', f'{n}-{i}', '{"score": 7}')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        _seed_database(path, users=threads, logs_per_user=0)
+
+        pool = ConnectionPool(path, max_connections=threads)
+
+        def commit_per_write(n, i):
+            with pool.connection() as conn:
+                conn.execute(INSERT_LOG, log_row(n, i))
+
+        writer = GroupCommitWriter(path)
+
+        def group_commit(n, i):
+            writer.execute(INSERT_LOG, log_row(n, i)).result()
+
+        single_wps = _run_concurrently(commit_per_write, threads, writes_per_thread)
+        group_wps = _run_concurrently(group_commit, threads, writes_per_thread)
+        commits = writer.stats['commits']
+        writer.close()
+        pool.close_all()
+
+    total = threads * writes_per_thread
+    print(f'group-commit: {threads} threads x {writes_per_thread} durable inserts')
+    print(f'  commit per write:  {single_wps:8.0f} writes/s')
+    print(f'  group commit:      {group_wps:8.0f} writes/s  ({group_wps / single_wps:.1f}x, '
+          f'{total / max(commits, 1):.1f} writes/commit)')
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Answers every GET with the server's canned body after a simulated delay"""
+
+    def do_GET(self):
+        time.sleep(self.server.next_delay())
+        body = self.server.body
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up on a deliberately slow answer
+
+    def log_message(self, *args):
+        pass
+
+def _start_stub(payload, base_delay, slow_delay, slow_ratio, seed):
+    """Local JSON API that is usually fast and occasionally very slow"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    server.daemon_threads = True
+    server.body = json.dumps(payload).encode('utf-8')
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def next_delay():
+        with lock:
+            slow = rng.random() < slow_ratio
+            return slow_delay if slow else base_delay * rng.uniform(0.8, 1.2)
+
+    server.next_delay = next_delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+def bench_food_search(searches=200, budget=0.3):
+    """Food search latency: sources queried one after another vs parallel fan-out"""
+    from food_database import FoodDatabaseService
+
+    stubs = [
+        _start_stub({'foods': [{'description': 'Apple, raw', 'foodNutrients': []}] * 3}, 0.04, 1.0, 0.02, 1),
+        _start_stub({'products': [{'product_name': 'Apple', 'nutriments': {'energy-kcal_100g': 52}}] * 3},
+                    0.06, 1.5, 0.03, 2),
+        _start_stub({'hints': [{'food': {'label': 'Apple', 'nutrients': {'ENERC_KCAL': 52}}}] * 3}, 0.05, 1.0, 0.02, 3),
+    ]
+    (_, fdc_url), (_, off_url), (_, edamam_url) = stubs
+
+    service = FoodDatabaseService()
+    service.fdc_base_url = fdc_url
+    service.off_search_url = off_url
+    service.edamam_url = edamam_url
+    service.edamam_app_id = service.edamam_app_key = 'bench'
+
+    def sequential(query):
+        # The pre-fan-out behaviour: each source waited on in turn
+        results = []
+        for search, limit in ((service.search_fdc, 5), (service.search_openfoodfacts, 5), (service.search_edamam, 3)):
+            results.extend(search(query, limit, timeout=5.0))
+        return results
+
+    def timed(search):
+        samples = []
+        for i in range(searches):
+            started = time.perf_counter()
+            search(f'apple {i}')
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    sequential_ms = [s * 1000 for s in timed(sequential)]
+    parallel_ms = [s * 1000 for s in timed(lambda q: service.search_food_multiple_sources(q, 10, budget=budget))]
+
+    for server, _ in stubs:
+        server.shutdown()
+
+    print(f'food-search: {searches} searches over 3 stub sources (budget {budget * 1000:.0f}ms)')
+    for label, samples in (('sequential', sequential_ms), ('parallel', parallel_ms)):
+        print(f'  {label + ":":12s} p50 {_percentile(samples, 50):7.1f}ms   p99 {_percentile(samples, 99):7.1f}ms')
+
+def bench_food_catalog(items=50000, queries=2000):
+    """Catalog lookups: linear substring scan vs the prebuilt token/trie index"""
+    from food_catalog import UK_RETAIL_FOODS, UK_RESTAURANT_FOODS, CatalogIndex
+
+    rng = random.Random(7)
+    seed_foods = UK_RETAIL_FOODS + UK_RESTAURANT_FOODS
+    words = sorted({word for food in seed_foods for word in food['name'].split()})
+    brands = sorted({food['brand'] for food in seed_foods})
+    catalog = [
+        {'name': ' '.join(rng.sample(words, 3)), 'brand': rng.choice(brands), 'source': 'Bench'}
+        for _ in range(items)
+    ]
+    probes = [rng.choice(words)[:rng.randint(3, 6)] for _ in range(queries)]
+
+    def linear(query):
+        return [food for food in catalog
+                if query.lower() in food['name'].lower() or
+                   query.lower() in food['brand'].lower()][:15]
+
+    started = time.perf_counter()
+    index = CatalogIndex(catalog)
+    build = time.perf_counter() - started
+
+    timings = {}
+    for label, search in (('linear scan', linear), ('index', lambda q: index.search(q, 15))):
+        started = time.perf_counter()
+        for query in probes:
+            search(query)
+        timings[label] = (time.perf_counter() - started) / queries * 1e6
+
+    print(f'food-catalog: {items} items, {queries} prefix queries (index built in {build:.2f}s)')
+    for label, micros in timings.items():
+        print(f'  {label + ":":13s} {micros:9.1f} us/query')
+
+def bench_food_autocomplete(items=20000, queries=1000):
+    """Fuzzy autocomplete latency on the real catalogs and a large synthetic one"""
+    import food_search
+    from food_catalog import UK_RETAIL_FOODS, UK_RESTAURANT_FOODS
+
+    rng = random.Random(11)
+    seed_foods = UK_RETAIL_FOODS + UK_RESTAURANT_FOODS
+    words = sorted({word for food in seed_foods for word in food['name'].split() if len(word) > 3})
+    brands = sorted({food['brand'] for food in seed_foods})
+
+    def typo(word):
+        # Drop, double or swap one character, like a hurried phone keyboard
+        i = rng.randrange(1, len(word) - 1)
+        return rng.choice([word[:i] + word[i + 1:], word[:i] + word[i] + word[i:],
+                           word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]])
+
+    probes = []
+    for _ in range(queries):
+        text = ' '.join(typo(rng.choice(words)) for _ in range(rng.randint(1, 2)))
+        probes.append(text[:rng.randint(3, len(text))])  # Partially typed
+
+    started = time.perf_counter()
+    synthetic = food_search.FuzzySearchEngine([
+        {'name': ' '.join(rng.sample(words, 3)), 'brand': rng.choice(brands)} for _ in range(items)
+    ])
+    build = time.perf_counter() - started
+
+    print(f'food-autocomplete: {queries} typo\'d, partially typed queries, top 10')
+    for label, search in (('UK catalogs', food_search.autocomplete),
+                          (f'{items} items', synthetic.search)):
+        samples = []
+        for query in probes:
+            started = time.perf_counter()
+            search(query, 10)
+            samples.append((time.perf_counter() - started) * 1000)
+        print(f'  {label + ":":13s} p50 {_percentile(samples, 50):6.2f}ms   p99 {_percentile(samples, 99):6.2f}ms')
+    print(f'  ({items}-item index built in {build:.2f}s)')
+
+def bench_nutrition_totals(days=2000, items_per_day=12):
+    """Daily macro totals from display strings vs normalized vectors in one batch"""
+    from food_catalog import UK_RETAIL_FOODS
+    from food_database import NutritionCalculator
+    from nutrition import NUTRIENTS, UNITS, parse_amount
+
+    rng = random.Random(5)
+    raw = [{key: value for key, value in food.items() if not key.endswith('_per_100g') and key != 'serving_grams'}
+           for food in UK_RETAIL_FOODS]
+    plans = [[rng.randrange(len(raw)) for _ in range(items_per_day)] for _ in range(days)]
+    grams = [rng.choice((30, 50, 100, 150, 250)) for _ in range(items_per_day)]
+    meals = ('breakfast', 'lunch', 'dinner', 'snacks')
+
+    started = time.perf_counter()
+    for plan in plans:
+        totals = dict.fromkeys(NUTRIENTS, 0.0)
+        for index, amount in zip(plan, grams):
+            # Re-parse the display strings for every logged item
+            nutrients = raw[index]['nutrients']
+            for name, unit in zip(NUTRIENTS, UNITS):
+                totals[name] += parse_amount(nutrients.get(name), unit) * amount / 100
+    strings = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for plan in plans:
+        items = [(UK_RETAIL_FOODS[index], amount) for index, amount in zip(plan, grams)]
+        per_meal = len(items) // len(meals)
+        NutritionCalculator.day_totals({
+            meal: items[i * per_meal:(i + 1) * per_meal] for i, meal in enumerate(meals)
+        })
+    batch = time.perf_counter() - started
+
+    print(f'nutrition-totals: {days} days x {items_per_day} items')
+    print(f'  parsing strings:  {1e6 * strings / days:7.1f}us/day (day total only)')
+    print(f'  batch vectors:    {1e6 * batch / days:7.1f}us/day (per meal, day total and macro split)')
+
+BENCHMARKS = {
+    'db-pool': bench_db_pool,
+    'group-commit': bench_group_commit,
+    'food-search': bench_food_search,
+    'food-catalog': bench_food_catalog,
+    'food-autocomplete': bench_food_autocomplete,
+    'nutrition-totals': bench_nutrition_totals,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f'Unknown benchmark: {name} (choose from {", ".join(BENCHMARKS)})')
+            sys.exit(1)
+        BENCHMARKS[name]()
@@ -0,0 +1,90 @@
+"""
+Dashboard Response Cache
+Built dashboard payloads keyed on (user id, data version) and evicted
+least-recently-used first under a memory cap
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+DASHBOARD_CACHE_BYTES = int(os.getenv('DASHBOARD_CACHE_MB', '32')) * 1024 * 1024
+
+def bump_data_version(conn: sqlite3.Connection, user_id: int):
+    """Invalidate a user's cached dashboard.
+
+    Call inside the transaction that changes their logs, profile or health
+    data, so every process sees the new version together with the change.
+    """
+    conn.execute('UPDATE users SET data_version = data_version + 1 WHERE id = ?', (user_id,))
+
+class CachedDashboard:
+    """One user's built dashboard plus its serialized API body"""
+
+    __slots__ = ('version', 'context', 'body', 'etag', 'size')
+
+    def __init__(self, version: Hashable, context: Dict, body: bytes):
+        self.version = version
+        self.context = context
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        # The context holds roughly what the body does, plus recent logs
+        self.size = len(body) + len(json.dumps(context, default=str))
+
+class DashboardCache:
+    """LRU cache holding the latest built dashboard per user"""
+
+    def __init__(self, max_bytes: int = DASHBOARD_CACHE_BYTES, max_entries: int = 4096):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, user_id: int, version: Hashable) -> Optional[CachedDashboard]:
+        """Cached dashboard for this exact data version, or None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry.version != version:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.stats['hits'] += 1
+            return entry
+
+    def put(self, user_id: int, version: Hashable, context: Dict, body: bytes) -> CachedDashboard:
+        """Store a freshly built dashboard, replacing older versions"""
+        entry = CachedDashboard(version, context, body)
+        if entry.size > self.max_bytes:
+            return entry  # Too big to ever fit; serve it uncached
+
+        with self._lock:
+            previous = self._entries.pop(user_id, None)
+            if previous is not None:
+                self.bytes -= previous.size
+            self._entries[user_id] = entry
+            self.bytes += entry.size
+
+            while self.bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self.stats['evictions'] += 1
+        return entry
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+            if entry is not None:
+                self.bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+dashboard_cache = DashboardCache()
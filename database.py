@@ -1,14 +1,33 @@
-import sqlite3
 import json
+import math
+import threading
+from collections.abc import Mapping
 from datetime import datetime
+from db_pool import connection
+from db_writer import get_writer
+import migrations
+
+# Daily log fields stored in typed columns; everything else stays in the
+# `data` JSON blob as overflow
+TYPED_LOG_FIELDS = [name for name, _ in migrations.TYPED_LOG_COLUMNS]
+# Python type a column hands back, so values of that type round-trip exactly
+_COLUMN_TYPES = {name: int if column_type == 'INTEGER' else float
+                 for name, column_type in migrations.TYPED_LOG_COLUMNS}
+LOG_COLUMNS = 'data, ' + ', '.join(TYPED_LOG_FIELDS)
 
 def init_database():
     """Initialize the database with required tables"""
-    conn = sqlite3.connect('fitness_app.db')
-    cursor = conn.cursor()
+    with connection() as conn:
+        migrations.migrate(conn, baseline=_create_tables)
+        backfill_pending = _backfill_progress(conn) is not None
 
+    if backfill_pending:
+        threading.Thread(target=backfill_log_columns, daemon=True).start()
+
+def _create_tables(conn):
+    """Base tables for a database that has never been migrated"""
     # Users table
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS users (
             email TEXT PRIMARY KEY,
             name TEXT NOT NULL,
@@ -22,7 +41,7 @@ def init_database():
     ''')
 
     # Daily logs table
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS daily_logs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_email TEXT NOT NULL,
@@ -34,7 +53,7 @@ def init_database():
     ''')
 
     # Weekly checkins table
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS weekly_checkins (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_email TEXT NOT NULL,
@@ -45,148 +64,342 @@ def init_database():
         )
     ''')
 
-    conn.commit()
-    conn.close()
+USER_COLUMNS = ('email', 'name', 'password', 'created_at', 'subscription_tier',
+                'subscription_status', 'stripe_customer_id', 'profile_data')
+
+_NOT_LOADED = object()
+
+class User(Mapping):
+    """User record that only queries its log history when first accessed.
+
+    Reads like the old user dict (user['name'], user.get(...)), but login
+    and redirect checks cost a single primary-key lookup. daily_logs and
+    weekly_checkins are loaded and memoized on first access, so one
+    instance should live no longer than the request that fetched it.
+    """
+    __slots__ = ('_row', '_profile_data', '_daily_logs', '_weekly_checkins')
+
+    _KEYS = USER_COLUMNS + ('daily_logs', 'weekly_checkins')
+
+    def __init__(self, row, daily_logs=_NOT_LOADED, weekly_checkins=_NOT_LOADED):
+        self._row = tuple(row)
+        self._profile_data = _NOT_LOADED
+        self._daily_logs = daily_logs
+        self._weekly_checkins = weekly_checkins
+
+    email = property(lambda self: self._row[0])
+    name = property(lambda self: self._row[1])
+    password = property(lambda self: self._row[2])
+    created_at = property(lambda self: self._row[3])
+    subscription_tier = property(lambda self: self._row[4])
+    subscription_status = property(lambda self: self._row[5])
+    stripe_customer_id = property(lambda self: self._row[6])
+
+    @property
+    def profile_data(self):
+        if self._profile_data is _NOT_LOADED:
+            self._profile_data = json.loads(self._row[7]) if self._row[7] else {}
+        return self._profile_data
+
+    @property
+    def daily_logs(self):
+        if self._daily_logs is _NOT_LOADED:
+            with connection() as conn:
+                rows = conn.execute(
+                    f'SELECT {LOG_COLUMNS} FROM daily_logs WHERE user_email = ? ORDER BY timestamp',
+                    (self.email,)
+                ).fetchall()
+            self._daily_logs = [_row_to_log(row) for row in rows]
+        return self._daily_logs
+
+    @property
+    def weekly_checkins(self):
+        if self._weekly_checkins is _NOT_LOADED:
+            with connection() as conn:
+                rows = conn.execute(
+                    'SELECT data FROM weekly_checkins WHERE user_email = ? ORDER BY timestamp',
+                    (self.email,)
+                ).fetchall()
+            self._weekly_checkins = [_row_to_checkin(row) for row in rows]
+        return self._weekly_checkins
+
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        # Mapping's default would call __getitem__ and load the history
+        return key in self._KEYS
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def to_dict(self):
+        """Plain dict with history loaded, e.g. for JSON export"""
+        return {key: self[key] for key in self._KEYS}
+
+    def __repr__(self):
+        return f'User({self.email!r})'
 
 def get_user(email):
-    """Get user by email"""
-    conn = sqlite3.connect('fitness_app.db')
-    cursor = conn.cursor()
-
-    cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
-    user_row = cursor.fetchone()
+    """Get user by email (log history is loaded lazily)"""
+    with connection() as conn:
+        user_row = conn.execute(
+            f'SELECT {", ".join(USER_COLUMNS)} FROM users WHERE email = ?', (email,)
+        ).fetchone()
 
     if not user_row:
-        conn.close()
         return None
 
-    # Get daily logs
-    cursor.execute('SELECT data FROM daily_logs WHERE user_email = ? ORDER BY timestamp', (email,))
-    daily_logs = [json.loads(row[0]) for row in cursor.fetchall()]
-
-    # Get weekly checkins
-    cursor.execute('SELECT data FROM weekly_checkins WHERE user_email = ? ORDER BY timestamp', (email,))
-    weekly_checkins = [json.loads(row[0]) for row in cursor.fetchall()]
-
-    conn.close()
-
-    # Reconstruct user object
-    user = {
-        'email': user_row[0],
-        'name': user_row[1],
-        'password': user_row[2],
-        'created_at': user_row[3],
-        'subscription_tier': user_row[4],
-        'subscription_status': user_row[5],
-        'stripe_customer_id': user_row[6],
-        'profile_data': json.loads(user_row[7]) if user_row[7] else {},
-        'daily_logs': daily_logs,
-        'weekly_checkins': weekly_checkins
-    }
-
-    return user
+    return User(user_row)
 
 def save_user(user_data):
     """Save or update user"""
     try:
         print(f'Attempting to save user to database: {user_data["email"]}')
-        conn = sqlite3.connect('fitness_app.db')
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            INSERT OR REPLACE INTO users 
-            (email, name, password, created_at, subscription_tier, subscription_status, stripe_customer_id, profile_data)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            user_data['email'],
-            user_data['name'],
-            user_data['password'],
-            user_data['created_at'],
-            user_data.get('subscription_tier', 'free'),
-            user_data.get('subscription_status', 'active'),
-            user_data.get('stripe_customer_id'),
-            json.dumps(user_data.get('profile_data', {}))
-        ))
-
-        conn.commit()
+        with connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO users 
+                (email, name, password, created_at, subscription_tier, subscription_status, stripe_customer_id, profile_data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                user_data['email'],
+                user_data['name'],
+                user_data['password'],
+                user_data['created_at'],
+                user_data.get('subscription_tier', 'free'),
+                user_data.get('subscription_status', 'active'),
+                user_data.get('stripe_customer_id'),
+                json.dumps(user_data.get('profile_data', {}))
+            ))
+
         print(f'User saved successfully: {user_data["email"]}')
-        conn.close()
     except Exception as e:
         print(f'Database save error: {e}')
-        if 'conn' in locals():
-            conn.close()
         raise e
 
 def add_daily_log(email, log_data):
     """Add daily log for user"""
-    conn = sqlite3.connect('fitness_app.db')
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        INSERT INTO daily_logs (user_email, date, timestamp, data)
-        VALUES (?, ?, ?, ?)
-    ''', (email, log_data['date'], log_data['timestamp'], json.dumps(log_data)))
+    typed, overflow = _split_log(log_data)
 
-    conn.commit()
-    conn.close()
+    get_writer().execute(f'''
+        INSERT INTO daily_logs (user_email, date, timestamp, {LOG_COLUMNS})
+        VALUES (?, ?, ?, ?, {', '.join('?' * len(TYPED_LOG_FIELDS))})
+    ''', (email, log_data['date'], log_data['timestamp'], json.dumps(overflow),
+          *[typed.get(field) for field in TYPED_LOG_FIELDS])).result()
 
 def get_user_logs(email):
     """Get daily logs for a specific user"""
-    conn = sqlite3.connect('fitness_app.db')
-    cursor = conn.cursor()
-
-    cursor.execute('SELECT data FROM daily_logs WHERE user_email = ? ORDER BY timestamp DESC', (email,))
-    logs = [json.loads(row[0]) for row in cursor.fetchall()]
-
-    conn.close()
-    return logs
+    with connection() as conn:
+        rows = conn.execute(f'SELECT {LOG_COLUMNS} FROM daily_logs WHERE user_email = ? ORDER BY timestamp DESC', (email,)).fetchall()
+
+    return [_row_to_log(row) for row in rows]
+
+def get_user_logs_page(email, before_date=None, before_id=None, page_size=30):
+    """One page of a user's daily logs, newest first, using a keyset cursor.
+
+    Pass the `next_cursor` of the previous page as before_date/before_id to
+    continue; each page is an index range scan no matter how deep it is.
+    """
+    conditions, params = _keyset_condition('date', before_date, before_id)
+    with connection() as conn:
+        rows = conn.execute(f'''
+            SELECT id, date, {LOG_COLUMNS} FROM daily_logs
+            WHERE user_email = ?{conditions}
+            ORDER BY date DESC, id DESC
+            LIMIT ?
+        ''', (email, *params, page_size + 1)).fetchall()
+
+    return _page(rows, page_size, 'before_date', lambda row: _row_to_log(row[2:]))
+
+def get_user_checkins_page(email, before_timestamp=None, before_id=None, page_size=10):
+    """One page of a user's weekly checkins, newest first, using a keyset cursor"""
+    conditions, params = _keyset_condition('timestamp', before_timestamp, before_id)
+    with connection() as conn:
+        rows = conn.execute(f'''
+            SELECT id, timestamp, data FROM weekly_checkins
+            WHERE user_email = ?{conditions}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        ''', (email, *params, page_size + 1)).fetchall()
+
+    return _page(rows, page_size, 'before_timestamp', lambda row: json.loads(row[2]))
+
+def _keyset_condition(column, before_value, before_id):
+    """SQL fragment continuing a (column, id) descending keyset"""
+    if before_value is None:
+        return '', ()
+    if before_id is None:
+        return f' AND {column} < ?', (before_value,)
+    return f' AND ({column}, id) < (?, ?)', (before_value, before_id)
+
+def _page(rows, page_size, cursor_name, decode):
+    """Build a page result from `page_size + 1` (id, key, ...) rows"""
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = None
+    if has_more:
+        next_cursor = {cursor_name: rows[-1][1], 'before_id': rows[-1][0]}
+    return {
+        'items': [decode(row) for row in rows],
+        'next_cursor': next_cursor
+    }
 
 def get_user_checkins(email):
     """Get weekly checkins for a specific user"""
-    conn = sqlite3.connect('fitness_app.db')
-    cursor = conn.cursor()
-
-    cursor.execute('SELECT data FROM weekly_checkins WHERE user_email = ? ORDER BY timestamp DESC', (email,))
-    checkins = [json.loads(row[0]) for row in cursor.fetchall()]
+    with connection() as conn:
+        rows = conn.execute('SELECT data FROM weekly_checkins WHERE user_email = ? ORDER BY timestamp DESC', (email,)).fetchall()
 
-    conn.close()
-    return checkins
+    return [json.loads(row[0]) for row in rows]
 
 def add_weekly_checkin(email, checkin_data):
     """Add weekly checkin for user"""
-    conn = sqlite3.connect('fitness_app.db')
-    cursor = conn.cursor()
-
     # Ensure we have required fields
     week_of = checkin_data.get('date', datetime.now().isoformat())
     timestamp = datetime.now().isoformat()
 
-    cursor.execute('''
+    get_writer().execute('''
         INSERT INTO weekly_checkins (user_email, week_of, timestamp, data)
         VALUES (?, ?, ?, ?)
-    ''', (email, week_of, timestamp, json.dumps(checkin_data)))
-
-    conn.commit()
-    conn.close()
+    ''', (email, week_of, timestamp, json.dumps(checkin_data))).result()
 
 def get_all_users():
     """Get all users for admin interface"""
-    conn = sqlite3.connect('fitness_app.db')
-    cursor = conn.cursor()
-
-    cursor.execute('SELECT email FROM users')
-    user_emails = [row[0] for row in cursor.fetchall()]
-    
-    conn.close()
-    
-    # Get complete user objects for each user
-    users = []
-    for email in user_emails:
-        user = get_user(email)
-        if user:
-            users.append(user)
-    
-    return users
+    return [user for page in iter_user_pages() for user in page]
+
+def iter_user_pages(page_size=200):
+    """Yield complete user objects in pages of at most `page_size` users.
+
+    Each page costs three set-based queries (users, daily_logs,
+    weekly_checkins) regardless of how many users it holds, and only one
+    page is held in memory at a time.
+    """
+    last_email = ''
+    while True:
+        with connection() as conn:
+            user_rows = conn.execute(
+                f'SELECT {", ".join(USER_COLUMNS)} FROM users WHERE email > ? ORDER BY email LIMIT ?',
+                (last_email, page_size)
+            ).fetchall()
+            if not user_rows:
+                return
+
+            emails = [row[0] for row in user_rows]
+            daily_logs = _load_history(conn, 'daily_logs', emails, LOG_COLUMNS, _row_to_log)
+            weekly_checkins = _load_history(conn, 'weekly_checkins', emails, 'data', _row_to_checkin)
+
+        yield [
+            User(row, daily_logs.get(row[0], []), weekly_checkins.get(row[0], []))
+            for row in user_rows
+        ]
+
+        if len(user_rows) < page_size:
+            return
+        last_email = emails[-1]
+
+def _load_history(conn, table, emails, columns, decode):
+    """Fetch and group one history table for a batch of users in one pass"""
+    placeholders = ','.join('?' * len(emails))
+    history = {}
+    rows = conn.execute(
+        f'SELECT user_email, {columns} FROM {table} WHERE user_email IN ({placeholders}) '
+        f'ORDER BY user_email, timestamp',
+        emails
+    )
+    for row in rows:
+        history.setdefault(row[0], []).append(decode(row[1:]))
+    return history
+
+def _row_to_checkin(row):
+    return json.loads(row[0])
+
+def _to_number(value):
+    """Numeric value of a log field, or None if it is not a plain number"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(number):
+        return None
+    return number
+
+def _split_log(log_data):
+    """Split a log into typed column values and the overflow blob.
+
+    A value only leaves the blob when the column gives it back unchanged;
+    form strings like "7", or an int in a REAL column, keep their original
+    form in the blob and are copied into the column for SQL to use.
+    """
+    typed = {}
+    overflow = dict(log_data)
+    for field in TYPED_LOG_FIELDS:
+        value = overflow.get(field)
+        number = _to_number(value)
+        if number is not None:
+            typed[field] = number
+            if type(value) is _COLUMN_TYPES[field]:
+                del overflow[field]
+    return typed, overflow
+
+def _row_to_log(row):
+    """Rebuild a log dict from a `LOG_COLUMNS` row"""
+    log = json.loads(row[0])
+    for field, value in zip(TYPED_LOG_FIELDS, row[1:]):
+        if value is not None and field not in log:
+            log[field] = value
+    return log
+
+def _backfill_progress(conn):
+    """(last_id, target_id) of the typed-column backfill, or None when done"""
+    if 'last_id' not in migrations.table_columns(conn, 'backfills'):
+        return None
+    row = conn.execute(
+        "SELECT last_id, target_id FROM backfills WHERE name = 'daily_log_columns'"
+    ).fetchone()
+    if not row or row[0] >= row[1]:
+        return None
+    return row[0], row[1]
+
+def backfill_log_columns(batch_size=500):
+    """Move typed fields out of pre-migration log blobs, one batch per commit.
+
+    Progress is checkpointed in the backfills table so an interrupted run
+    resumes where it stopped, and re-running a batch is harmless. Logs
+    written after the migration are already split by add_daily_log.
+    """
+    assignments = ', '.join(f'{field} = COALESCE(?, {field})' for field in TYPED_LOG_FIELDS)
+    try:
+        while True:
+            with connection() as conn:
+                progress = _backfill_progress(conn)
+                if progress is None:
+                    return
+                last_id, target_id = progress
+
+                rows = conn.execute(
+                    'SELECT id, data FROM daily_logs WHERE id > ? AND id <= ? ORDER BY id LIMIT ?',
+                    (last_id, target_id, batch_size)
+                ).fetchall()
+
+                updates = []
+                for row_id, data in rows:
+                    typed, overflow = _split_log(json.loads(data))
+                    updates.append((json.dumps(overflow),
+                                    *[typed.get(field) for field in TYPED_LOG_FIELDS], row_id))
+                conn.executemany(f'UPDATE daily_logs SET data = ?, {assignments} WHERE id = ?', updates)
+
+                conn.execute(
+                    "UPDATE backfills SET last_id = ? WHERE name = 'daily_log_columns'",
+                    (rows[-1][0] if rows else target_id,)
+                )
+    except Exception as e:
+        print(f'Daily log backfill error: {e}')
 
 # Initialize database when module is imported
 try:
@@ -0,0 +1,128 @@
+"""
+Pooled SQLite Connection Manager
+Shares long-lived WAL-mode connections between database.py and main.py
+instead of opening a new sqlite3 connection for every helper call
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DATABASE = os.getenv('DATABASE_PATH', 'fitness_app.db')
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections with per-thread reuse"""
+
+    def __init__(self, database: str = DATABASE, max_connections: int = 8,
+                 busy_timeout_ms: int = 5000, cached_statements: int = 256):
+        self.database = database
+        self.max_connections = max_connections
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection and apply the pool's pragmas"""
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA synchronous=NORMAL')
+
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                return self._connect()
+            except Exception:
+                self._slots.release()
+                raise
+
+    def _release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; nested calls on the same thread share it.
+
+        The outermost borrow commits on success and rolls back on error.
+        """
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    def close_all(self):
+        """Close every connection the pool has opened"""
+        with self._lock:
+            connections, self._all = self._all, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._idle = queue.LifoQueue()
+
+    def stats(self) -> dict:
+        return {
+            'database': self.database,
+            'open_connections': len(self._all),
+            'idle_connections': self._idle.qsize(),
+            'max_connections': self.max_connections
+        }
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(database: str = DATABASE) -> ConnectionPool:
+    """Get the shared pool for a database file, creating it on first use"""
+    pool = _pools.get(database)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(database)
+            if pool is None:
+                pool = ConnectionPool(database)
+                _pools[database] = pool
+    return pool
+
+def connection(database: str = DATABASE):
+    """Borrow a pooled connection for `database` (use as a context manager)"""
+    return get_pool(database).connection()
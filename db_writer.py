@@ -0,0 +1,149 @@
+"""
+Group-Commit Database Writer
+A single background thread applies queued writes in batched transactions,
+so concurrent requests stop contending for SQLite's write lock
+"""
+
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+from db_pool import DATABASE, ConnectionPool
+
+_STOP = object()
+
+class GroupCommitWriter:
+    """Single-writer queue that commits pending operations together"""
+
+    def __init__(self, database: str = DATABASE, max_batch: int = 500, max_delay: float = 0.02):
+        self.database = database
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        # A private one-connection pool: the writer never competes with
+        # request threads for a slot in the shared pool
+        self._pool = ConnectionPool(database, max_connections=1)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.stats = {'operations': 0, 'commits': 0, 'failed': 0}
+
+    def submit(self, operation: Callable) -> Future:
+        """Queue `operation(conn)` for the next group commit.
+
+        The returned future resolves to the operation's return value once
+        the transaction containing it has committed, or to its exception.
+        A failing operation is rolled back alone; the rest of its batch
+        still commits.
+        """
+        future = Future()
+        self._ensure_started()
+        self._queue.put((operation, future))
+        return future
+
+    def execute(self, sql: str, params=()) -> Future:
+        """Queue a single statement; resolves to its rowcount"""
+        return self.submit(lambda conn: conn.execute(sql, params).rowcount)
+
+    def executemany(self, sql: str, rows) -> Future:
+        """Queue a bulk statement; resolves to its rowcount"""
+        rows = list(rows)
+        return self.submit(lambda conn: conn.executemany(sql, rows).rowcount)
+
+    def close(self, timeout: float = 5.0):
+        """Flush everything queued so far and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        self._pool.close_all()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            # Take whatever queued up while the previous batch was
+            # committing, bounded by batch size and collection time
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch and time.monotonic() < deadline:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        outcomes = []
+        try:
+            with self._pool.connection() as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                for operation, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute('SAVEPOINT group_op')
+                    try:
+                        result = operation(conn)
+                        conn.execute('RELEASE group_op')
+                        outcomes.append((future, result, None))
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO group_op')
+                        conn.execute('RELEASE group_op')
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            print(f'Group commit error: {e}')
+            self.stats['failed'] += len(batch)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.stats['commits'] += 1
+        self.stats['operations'] += len(outcomes)
+        for future, result, error in outcomes:
+            if error is not None:
+                self.stats['failed'] += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_writer(database: str = DATABASE) -> GroupCommitWriter:
+    """Get the shared writer for a database file, creating it on first use"""
+    writer = _writers.get(database)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(database)
+            if writer is None:
+                writer = GroupCommitWriter(database)
+                _writers[database] = writer
+    return writer
+
+@atexit.register
+def _flush_writers():
+    for writer in list(_writers.values()):
+        writer.close()
@@ -1,10 +1,11 @@
 
 import smtplib
-import requests
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 
+from http_client import http_client
+
 class EmailService:
     def __init__(self):
         self.mailchimp_api_key = os.getenv('MAILCHIMP_API_KEY', '')
@@ -42,7 +43,7 @@ class EmailService:
         }
 
         try:
-            response = requests.post(url, json=data, headers=headers)
+            response = http_client.post(url, 'mailchimp', json=data, headers=headers)
             return response.status_code == 200
         except Exception as e:
             print(f"Mailchimp error: {e}")
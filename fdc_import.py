@@ -0,0 +1,378 @@
+"""
+FDC Bulk Import
+Streams the USDA FoodData Central bulk downloads into the local food
+store, so FDC lookups are answered locally instead of through the
+rate-limited web API
+
+    python fdc_import.py FoodData_Central_sr_legacy_food_json_2021-10-28.json
+    python fdc_import.py FoodData_Central_csv_2024-10-31/
+
+JSON files are read with an incremental parser and CSV folders are staged
+in SQLite, so memory use stays flat however large the download is. Every
+batch commits together with its checkpoint; an interrupted import picks
+up where it stopped when run again.
+"""
+
+import argparse
+import codecs
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional
+
+from food_store import FoodStore, food_store
+from nutrition import normalize_food
+
+SOURCE = 'FDC'  # Fan-out source the import stands in for
+FOOD_SOURCE = 'USDA FoodData Central'  # Same records search_fdc returns
+
+logger = logging.getLogger(__name__)
+
+# FDC nutrient ids for each of our nutrients, most preferred first
+FDC_NUTRIENTS = {
+    'calories': ((1008, 'kcal'), (2048, 'kcal'), (2047, 'kcal'), (1062, 'kJ')),
+    'protein': ((1003, 'g'),),
+    'carbs': ((1005, 'g'), (1050, 'g')),
+    'fat': ((1004, 'g'), (1085, 'g')),
+    'fiber': ((1079, 'g'),),
+    'sugar': ((2000, 'g'), (1063, 'g')),
+    'sodium': ((1093, 'mg'),),
+}
+NUTRIENT_IDS = frozenset(nutrient_id for options in FDC_NUTRIENTS.values() for nutrient_id, _ in options)
+
+# Sample and acquisition records in the full download are not foods
+FOOD_DATA_TYPES = {'foundation_food', 'sr_legacy_food', 'branded_food', 'survey_fndds_food'}
+# The JSON downloads spell the same data types differently
+JSON_DATA_TYPES = {
+    'Foundation': 'foundation_food',
+    'SR Legacy': 'sr_legacy_food',
+    'Branded': 'branded_food',
+    'Survey (FNDDS)': 'survey_fndds_food',
+}
+
+CSV_PHASES = ('food.csv', 'branded_food.csv', 'food_nutrient.csv', 'load')
+
+STAGING = [
+    '''CREATE TABLE IF NOT EXISTS fdc_stage_foods (
+        fdc_id INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        category TEXT NOT NULL DEFAULT '',
+        brand TEXT NOT NULL DEFAULT ''
+    )''',
+    '''CREATE TABLE IF NOT EXISTS fdc_stage_nutrients (
+        fdc_id INTEGER NOT NULL,
+        nutrient_id INTEGER NOT NULL,
+        amount REAL NOT NULL
+    )''',
+]
+
+def fdc_food(description: str, brand: str, category: str, amounts: Dict[int, float]) -> Dict:
+    """Food record in search_fdc's shape from FDC nutrient amounts per 100 g"""
+    nutrients = {}
+    for name, options in FDC_NUTRIENTS.items():
+        for nutrient_id, unit in options:
+            amount = amounts.get(nutrient_id)
+            if amount is not None:
+                nutrients[name] = f"{amount}g" if unit == 'g' else f"{amount} {unit}"
+                break
+
+    return normalize_food({
+        'name': description,
+        'source': FOOD_SOURCE,
+        'nutrients': nutrients,
+        'serving_size': '100g',
+        'brand': brand or '',
+        'category': category or ''
+    })
+
+def _json_food(record: Dict) -> Optional[Dict]:
+    if not isinstance(record, dict) or not record.get('description'):
+        return None
+    amounts = {}
+    for item in record.get('foodNutrients') or ():
+        nutrient_id = (item.get('nutrient') or {}).get('id')
+        if nutrient_id in NUTRIENT_IDS and item.get('amount') is not None:
+            amounts[nutrient_id] = item['amount']
+    category = (record.get('brandedFoodCategory')
+                or (record.get('foodCategory') or {}).get('description')
+                or (record.get('wweiaFoodCategory') or {}).get('wweiaFoodCategoryDescription'))
+    return fdc_food(record['description'], record.get('brandOwner') or record.get('brandName'),
+                    category, amounts)
+
+class JSONArrayReader:
+    """Incremental reader for the records of a file's first top-level array.
+
+    The FDC JSON downloads are one object holding one huge array
+    ({"SRLegacyFoods": [...]}); records are decoded one at a time from a
+    small rolling buffer. `offset` is the byte position just after the
+    last record yielded, which a later reader can start from.
+    """
+
+    def __init__(self, path: str, offset: int = 0, chunk_size: int = 1 << 20):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._start = offset
+        self._base = offset  # Byte offset of self._buffer[0]
+        self._buffer = ''
+        self._pos = 0
+
+    @property
+    def offset(self) -> int:
+        return self._base + len(self._buffer[:self._pos].encode('utf-8'))
+
+    def _fill(self, file, decoder) -> bool:
+        chunk = file.read(self.chunk_size)
+        # Drop what has been consumed so the buffer stays around one chunk
+        self._base = self.offset
+        self._buffer = self._buffer[self._pos:] + decoder.decode(chunk, final=not chunk)
+        self._pos = 0
+        return bool(chunk)
+
+    def __iter__(self) -> Iterator[Dict]:
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        json_decoder = json.JSONDecoder()
+        in_array = self._start > 0
+        more = True
+        with open(self.path, 'rb') as file:
+            file.seek(self._start)
+            while True:
+                buffer, pos = self._buffer, self._pos
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                self._pos = pos
+
+                if pos < len(buffer):
+                    if not in_array:
+                        start = buffer.find('[', pos)
+                        self._pos = len(buffer) if start < 0 else start + 1
+                        in_array = start >= 0
+                        continue
+                    if buffer[pos] == ']':
+                        return
+                    try:
+                        record, end = json_decoder.raw_decode(buffer, pos)
+                    except ValueError:
+                        if not more:
+                            raise
+                    else:
+                        self._pos = end
+                        yield record
+                        continue
+
+                if not more:
+                    return
+                more = self._fill(file, decoder)
+
+def _checkpoint(conn, path: str) -> Optional[Dict]:
+    row = conn.execute('SELECT * FROM bulk_imports WHERE path = ?', (path,)).fetchone()
+    return dict(row) if row else None
+
+def _save_checkpoint(conn, path: str, phase: str, position: int, rows: int, finished: bool = False,
+                     data_types: Iterable[str] = ()):
+    """Record progress, adding `data_types` to the data types seen so far"""
+    seen = set(filter(None, conn.execute(
+        'SELECT data_types FROM bulk_imports WHERE path = ?', (path,)
+    ).fetchone()[0].split(',')))
+    conn.execute('''
+        UPDATE bulk_imports SET phase = ?, position = ?, rows = ?, finished_at = ?, data_types = ? WHERE path = ?
+    ''', (phase, position, rows, time.time() if finished else None,
+          ','.join(sorted(seen.union(data_types) - {''})), path))
+
+class _Progress:
+    """Throughput line logged after every committed batch"""
+
+    def __init__(self, label: str, rows: int = 0, total_bytes: int = 0):
+        self.label = label
+        self.total_bytes = total_bytes
+        self.started = time.perf_counter()
+        self.rows_at_start = rows
+
+    def report(self, rows: int, position: Optional[int] = None):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        line = f'{self.label}: {rows:,} rows, {(rows - self.rows_at_start) / elapsed:,.0f} rows/s'
+        if position is not None and self.total_bytes:
+            line += f', {100 * position / self.total_bytes:.1f}% of {self.total_bytes / 1e6:,.0f} MB'
+        logger.info(line)
+
+def _import_json(store: FoodStore, path: str, checkpoint: Dict, batch_size: int) -> int:
+    rows = checkpoint['rows']
+    reader = JSONArrayReader(path, checkpoint['position'])
+    progress = _Progress(os.path.basename(path), rows, os.path.getsize(path))
+
+    batch = []
+    data_types = set()
+    for record in reader:
+        food = _json_food(record)
+        if food:
+            batch.append(food)
+            data_types.add(JSON_DATA_TYPES.get(record.get('dataType'), record.get('dataType') or ''))
+        if len(batch) >= batch_size:
+            with store.connection() as conn:
+                rows += store.upsert(conn, batch, imported=True)
+                _save_checkpoint(conn, path, 'json', reader.offset, rows, data_types=data_types)
+            batch = []
+            progress.report(rows, reader.offset)
+
+    with store.connection() as conn:
+        rows += store.upsert(conn, batch, imported=True)
+        _save_checkpoint(conn, path, 'json', reader.offset, rows, finished=True, data_types=data_types)
+    progress.report(rows, reader.offset)
+    return rows
+
+def _read_csv(path: str, skip: int) -> Iterator[Dict]:
+    with open(path, newline='', encoding='utf-8') as file:
+        yield from islice(csv.DictReader(file), skip, None)
+
+def _stage_csv(store: FoodStore, directory: str, phase: str, position: int, batch_size: int,
+               categories: Dict[str, str]):
+    """Copy the useful columns of one CSV file into the staging tables"""
+    path = os.path.join(directory, phase)
+    if not os.path.exists(path):
+        return  # branded_food.csv only ships with the branded and full downloads
+
+    data_types = set()
+    if phase == 'food.csv':
+        sql = 'INSERT OR REPLACE INTO fdc_stage_foods (fdc_id, description, category) VALUES (?, ?, ?)'
+        def convert(row):
+            if row['data_type'] in FOOD_DATA_TYPES and row['description']:
+                data_types.add(row['data_type'])
+                return (int(row['fdc_id']), row['description'], categories.get(row['food_category_id'], ''))
+    elif phase == 'branded_food.csv':
+        sql = '''UPDATE fdc_stage_foods SET brand = ?, category = COALESCE(NULLIF(?, ''), category)
+                 WHERE fdc_id = ?'''
+        def convert(row):
+            return (row['brand_owner'] or row.get('brand_name') or '', row.get('branded_food_category') or '',
+                    int(row['fdc_id']))
+    else:
+        sql = 'INSERT INTO fdc_stage_nutrients (fdc_id, nutrient_id, amount) VALUES (?, ?, ?)'
+        def convert(row):
+            if row['amount'] and int(row['nutrient_id']) in NUTRIENT_IDS:
+                return (int(row['fdc_id']), int(row['nutrient_id']), float(row['amount']))
+
+    progress = _Progress(phase, position, 0)
+    rows = position
+    batch = []
+    for row in _read_csv(path, position):
+        rows += 1
+        values = convert(row)
+        if values:
+            batch.append(values)
+        if rows % batch_size == 0:
+            with store.connection() as conn:
+                conn.executemany(sql, batch)
+                _save_checkpoint(conn, directory, phase, rows, 0, data_types=data_types)
+            batch = []
+            progress.report(rows)
+
+    with store.connection() as conn:
+        conn.executemany(sql, batch)
+        _save_checkpoint(conn, directory, phase, rows, 0, data_types=data_types)
+    progress.report(rows)
+
+def _load_staged(store: FoodStore, directory: str, last_id: int, rows: int, batch_size: int) -> int:
+    """Join staged foods with their nutrients into the food store, in fdc_id order"""
+    with store.connection() as conn:
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_fdc_stage_nutrients ON fdc_stage_nutrients (fdc_id)')
+    progress = _Progress('load', rows)
+
+    while True:
+        with store.connection() as conn:
+            staged = conn.execute('''
+                SELECT fdc_id, description, category, brand FROM fdc_stage_foods
+                WHERE fdc_id > ? ORDER BY fdc_id LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not staged:
+                _save_checkpoint(conn, directory, 'load', last_id, rows, finished=True)
+                conn.execute('DROP TABLE fdc_stage_foods')
+                conn.execute('DROP TABLE fdc_stage_nutrients')
+                progress.report(rows)
+                return rows
+
+            amounts = {}
+            for fdc_id, nutrient_id, amount in conn.execute('''
+                SELECT fdc_id, nutrient_id, amount FROM fdc_stage_nutrients WHERE fdc_id BETWEEN ? AND ?
+            ''', (staged[0]['fdc_id'], staged[-1]['fdc_id'])):
+                amounts.setdefault(fdc_id, {})[nutrient_id] = amount
+
+            foods = [fdc_food(row['description'], row['brand'], row['category'], amounts.get(row['fdc_id'], {}))
+                     for row in staged]
+            rows += store.upsert(conn, foods, imported=True)
+            last_id = staged[-1]['fdc_id']
+            _save_checkpoint(conn, directory, 'load', last_id, rows)
+        progress.report(rows)
+
+def _import_csv(store: FoodStore, directory: str, checkpoint: Dict, batch_size: int) -> int:
+    with store.connection() as conn:
+        for statement in STAGING:
+            conn.execute(statement)
+
+    # food_category.csv is a few dozen rows
+    categories = {}
+    category_path = os.path.join(directory, 'food_category.csv')
+    if os.path.exists(category_path):
+        categories = {row['id']: row['description'] for row in _read_csv(category_path, 0)}
+
+    phase, position = checkpoint['phase'], checkpoint['position']
+    for name in CSV_PHASES[CSV_PHASES.index(phase):]:
+        if name == 'load':
+            return _load_staged(store, directory, position if phase == 'load' else 0,
+                                checkpoint['rows'], batch_size)
+        _stage_csv(store, directory, name, position if name == phase else 0, batch_size, categories)
+
+def import_fdc(path: str, store: FoodStore = food_store, batch_size: int = 20000,
+               restart: bool = False) -> int:
+    """Import an FDC JSON file or unpacked CSV folder into `store`; returns rows loaded.
+
+    Resumes from the saved checkpoint unless `restart` is set. A finished
+    import is not repeated.
+    """
+    path = os.path.abspath(path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'{path} does not exist')
+    is_csv = os.path.isdir(path)
+    if is_csv and not os.path.exists(os.path.join(path, 'food.csv')):
+        raise FileNotFoundError(f'{path} has no food.csv; point at the unpacked FDC CSV folder')
+
+    with store.connection() as conn:
+        checkpoint = _checkpoint(conn, path)
+        if checkpoint is None or restart:
+            conn.execute('''
+                INSERT OR REPLACE INTO bulk_imports (path, source, phase, position, rows, started_at)
+                VALUES (?, ?, ?, 0, 0, ?)
+            ''', (path, SOURCE, CSV_PHASES[0] if is_csv else 'json', time.time()))
+            if is_csv:
+                conn.execute('DROP TABLE IF EXISTS fdc_stage_foods')
+                conn.execute('DROP TABLE IF EXISTS fdc_stage_nutrients')
+            checkpoint = _checkpoint(conn, path)
+
+    if checkpoint['finished_at']:
+        logger.info('%s was already imported (%s rows); use --restart to import again',
+                    path, f'{checkpoint["rows"]:,}')
+        return checkpoint['rows']
+    if checkpoint['position']:
+        logger.info('Resuming %s at %s position %s',
+                    os.path.basename(path), checkpoint['phase'], f'{checkpoint["position"]:,}')
+
+    if is_csv:
+        return _import_csv(store, path, checkpoint, batch_size)
+    return _import_json(store, path, checkpoint, batch_size)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import a FoodData Central bulk download into the food store')
+    parser.add_argument('path', help='FDC JSON file or unpacked CSV folder')
+    parser.add_argument('--batch-size', type=int, default=20000, help='rows per transaction (default: 20000)')
+    parser.add_argument('--restart', action='store_true', help='ignore any saved checkpoint')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    started = time.perf_counter()
+    try:
+        total = import_fdc(args.path, batch_size=args.batch_size, restart=args.restart)
+    except (OSError, ValueError) as e:
+        logger.error('FDC import failed: %s', e)
+        sys.exit(1)
+    logger.info('Done: %s foods in %.1fs', f'{total:,}', time.perf_counter() - started)
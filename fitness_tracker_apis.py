@@ -1,10 +1,24 @@
 
 import os
-import requests
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
+from http_client import http_client
+
+# Upstream requests allowed in flight at once per provider, across all users
+PROVIDER_CONCURRENCY = {'fitbit': 4, 'oura': 4, 'google_fit': 4}
+
+# Most days one history request may cover: Fitbit's heart rate series
+# allows a year, Oura pages through any range and Google Fit aggregates
+# are kept to 90 daily buckets
+RANGE_WINDOW_DAYS = {'fitbit': 365, 'oura': 365, 'google_fit': 90}
+
+GOOGLE_FIT_AGGREGATE_URL = 'https://www.googleapis.com/fitness/v1/users/me/dataset:aggregate'
+
 class FitnessTrackerAPI:
     """Unified fitness tracker API integration"""
     
@@ -18,7 +32,47 @@ class FitnessTrackerAPI:
         self.google_fit_client_id = os.getenv('GOOGLE_FIT_CLIENT_ID')
         self.google_fit_client_secret = os.getenv('GOOGLE_FIT_CLIENT_SECRET')
         
-    def sync_fitbit_data(self, access_token: str, date: str = None) -> Dict:
+        # Whole-sync deadline (seconds) and the read timeout of one request
+        self.sync_budget = float(os.getenv('DEVICE_SYNC_BUDGET', '20'))
+        self.request_timeout = 10.0
+        self._limits = {name: threading.BoundedSemaphore(limit) for name, limit in PROVIDER_CONCURRENCY.items()}
+        # Providers and their HTTP sub-requests get separate pools, so a
+        # provider waiting on its sub-requests can never starve them
+        self._provider_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='device-sync')
+        self._request_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='device-sync-http')
+    
+    def _request(self, method: str, url: str, integration: str, deadline: Optional[float], **kwargs):
+        """One upstream call under the provider's concurrency limit and the sync deadline.
+
+        Without a deadline the call waits as long as it takes for a free slot.
+        With one, the connect and read timeouts are cut to the time left and
+        failures are not retried, so the call returns by the deadline.
+        """
+        if deadline is None:
+            self._limits[integration].acquire()
+        else:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._limits[integration].acquire(timeout=remaining):
+                raise TimeoutError(f'{integration} sync deadline passed')
+        try:
+            if deadline is None:
+                return http_client.request(method, url, integration, timeout=(3.05, self.request_timeout), **kwargs)
+            remaining = max(0.1, deadline - time.monotonic())
+            timeout = (min(3.05, remaining), min(self.request_timeout, remaining))
+            return http_client.request(method, url, integration, retries=0, timeout=timeout, **kwargs)
+        finally:
+            self._limits[integration].release()
+    
+    def _get_all(self, integration: str, requests: List[tuple], deadline: Optional[float]) -> List:
+        """GET (url, kwargs) pairs in parallel; responses in request order.
+
+        The first failure is raised, as it would be from serial calls.
+        """
+        futures = [self._request_executor.submit(self._request, 'GET', url, integration, deadline, **kwargs)
+                   for url, kwargs in requests]
+        return [future.result() for future in futures]
+    
+    def sync_fitbit_data(self, access_token: str, date: str = None, deadline: Optional[float] = None) -> Dict:
         """Sync data from Fitbit API"""
         if not self.fitbit_client_id:
             return {"error": "Fitbit API not configured"}
@@ -32,17 +86,15 @@ class FitnessTrackerAPI:
         }
         
         try:
-            # Get activity data
+            # Activity, sleep and heart rate data, fetched in parallel
             activity_url = f'https://api.fitbit.com/1/user/-/activities/date/{date}.json'
-            activity_response = requests.get(activity_url, headers=headers)
-            
-            # Get sleep data
             sleep_url = f'https://api.fitbit.com/1.2/user/-/sleep/date/{date}.json'
-            sleep_response = requests.get(sleep_url, headers=headers)
-            
-            # Get heart rate data
             hr_url = f'https://api.fitbit.com/1/user/-/activities/heart/date/{date}/1d.json'
-            hr_response = requests.get(hr_url, headers=headers)
+            activity_response, sleep_response, hr_response = self._get_all('fitbit', [
+                (activity_url, {'headers': headers}),
+                (sleep_url, {'headers': headers}),
+                (hr_url, {'headers': headers}),
+            ], deadline)
             
             if activity_response.status_code == 200:
                 activity_data = activity_response.json()
@@ -71,7 +123,7 @@ class FitnessTrackerAPI:
         except Exception as e:
             return {"error": f"Fitbit sync failed: {str(e)}"}
     
-    def sync_oura_data(self, access_token: str, date: str = None) -> Dict:
+    def sync_oura_data(self, access_token: str, date: str = None, deadline: Optional[float] = None) -> Dict:
         """Sync data from Oura Ring API"""
         if not self.oura_api_key:
             return {"error": "Oura API not configured"}
@@ -85,18 +137,16 @@ class FitnessTrackerAPI:
         }
         
         try:
-            # Get daily activity
+            # Daily activity, sleep and readiness, fetched in parallel
             activity_url = f'https://api.ouraring.com/v2/usercollection/daily_activity'
-            activity_params = {'start_date': date, 'end_date': date}
-            activity_response = requests.get(activity_url, headers=headers, params=activity_params)
-            
-            # Get sleep data
             sleep_url = f'https://api.ouraring.com/v2/usercollection/daily_sleep'
-            sleep_response = requests.get(sleep_url, headers=headers, params=activity_params)
-            
-            # Get readiness data
             readiness_url = f'https://api.ouraring.com/v2/usercollection/daily_readiness'
-            readiness_response = requests.get(readiness_url, headers=headers, params=activity_params)
+            activity_params = {'start_date': date, 'end_date': date}
+            activity_response, sleep_response, readiness_response = self._get_all('oura', [
+                (activity_url, {'headers': headers, 'params': activity_params}),
+                (sleep_url, {'headers': headers, 'params': activity_params}),
+                (readiness_url, {'headers': headers, 'params': activity_params}),
+            ], deadline)
             
             if activity_response.status_code == 200:
                 activity_data = activity_response.json()
@@ -157,7 +207,7 @@ class FitnessTrackerAPI:
         except Exception as e:
             return {"error": f"Garmin sync failed: {str(e)}"}
     
-    def sync_google_fit_data(self, access_token: str, date: str = None) -> Dict:
+    def sync_google_fit_data(self, access_token: str, date: str = None, deadline: Optional[float] = None) -> Dict:
         """Sync data from Google Fit API"""
         if not self.google_fit_client_id:
             return {"error": "Google Fit API not configured"}
@@ -176,7 +226,7 @@ class FitnessTrackerAPI:
             end_time = start_time + (24 * 60 * 60 * 1000)  # Add 24 hours
             
             # Get aggregated data
-            aggregate_url = 'https://www.googleapis.com/fitness/v1/users/me/dataset:aggregate'
+            aggregate_url = GOOGLE_FIT_AGGREGATE_URL
             aggregate_data = {
                 "aggregateBy": [
                     {"dataTypeName": "com.google.step_count.delta"},
@@ -189,7 +239,9 @@ class FitnessTrackerAPI:
                 "endTimeMillis": end_time
             }
             
-            response = requests.post(aggregate_url, headers=headers, json=aggregate_data)
+            # The aggregate POST is a read, so it is safe to retry
+            response = self._request('POST', aggregate_url, 'google_fit', deadline, headers=headers,
+                                     json=aggregate_data, idempotent=True)
             
             if response.status_code == 200:
                 data = response.json()
@@ -230,36 +282,176 @@ class FitnessTrackerAPI:
         except Exception as e:
             return {"error": f"Google Fit sync failed: {str(e)}"}
     
-    def sync_all_connected_devices(self, user_tokens: Dict, date: str = None) -> List[Dict]:
-        """Sync data from all connected devices for a user"""
-        results = []
+    def sync_all_connected_devices(self, user_tokens: Dict, date: str = None,
+                                   budget: Optional[float] = None) -> List[Dict]:
+        """Sync data from all connected devices for a user.
+
+        Providers (and their sub-requests) run in parallel; the whole sync
+        is capped at `budget` seconds. Each provider's result carries its
+        sync_ms, and a provider still running at the deadline is reported
+        as timed out. Every upstream request is bounded by the same
+        deadline, so such a provider finishes shortly after; its late
+        result is discarded.
+        """
+        budget = self.sync_budget if budget is None else budget
+        deadline = time.monotonic() + budget
         
+        syncs = []
         # Sync Fitbit if token available
         if user_tokens.get('fitbit_access_token'):
-            fitbit_data = self.sync_fitbit_data(user_tokens['fitbit_access_token'], date)
-            results.append(fitbit_data)
+            syncs.append(('Fitbit', self.sync_fitbit_data, (user_tokens['fitbit_access_token'], date, deadline)))
         
         # Sync Oura if token available
         if user_tokens.get('oura_access_token'):
-            oura_data = self.sync_oura_data(user_tokens['oura_access_token'], date)
-            results.append(oura_data)
+            syncs.append(('Oura Ring', self.sync_oura_data, (user_tokens['oura_access_token'], date, deadline)))
         
         # Sync Google Fit if token available
         if user_tokens.get('google_fit_access_token'):
-            google_fit_data = self.sync_google_fit_data(user_tokens['google_fit_access_token'], date)
-            results.append(google_fit_data)
+            syncs.append(('Google Fit', self.sync_google_fit_data,
+                          (user_tokens['google_fit_access_token'], date, deadline)))
         
         # Sync Garmin if tokens available
         if user_tokens.get('garmin_access_token') and user_tokens.get('garmin_access_token_secret'):
-            garmin_data = self.sync_garmin_data(
+            syncs.append(('Garmin', self.sync_garmin_data, (
                 user_tokens['garmin_access_token'], 
                 user_tokens['garmin_access_token_secret'], 
                 date
-            )
-            results.append(garmin_data)
+            )))
+        
+        def timed(name, sync, args):
+            started = time.perf_counter()
+            result = sync(*args)
+            result.setdefault('source', name)
+            result['sync_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            return result
+        
+        futures = [(name, self._provider_executor.submit(timed, name, sync, args)) for name, sync, args in syncs]
+        wait([future for _, future in futures], timeout=max(0.0, deadline - time.monotonic()))
         
+        results = []
+        for name, future in futures:
+            if future.done():
+                results.append(future.result())
+            else:
+                # Only stops a sync that has not started; running ones end at the deadline
+                future.cancel()
+                results.append({'source': name, 'error': f'{name} sync timed out after {budget:.1f}s',
+                                'sync_ms': round(budget * 1000, 1)})
         return results
     
+    def fetch_daily_range(self, provider: str, access_token: str, start_date: str, end_date: str,
+                          deadline: Optional[float] = None) -> Dict[str, Dict]:
+        """Per-day health_data fields for start_date..end_date (inclusive) from one provider.
+
+        Returns {date: {'steps', 'heart_rate', 'calories_burned',
+        'active_minutes', 'raw'}} for the days the provider has data, where
+        'raw' is that day's slice of the provider's JSON. The range
+        must fit in RANGE_WINDOW_DAYS[provider]. Unlike the sync_* methods
+        this raises on failure, so callers can retry the same window.
+        """
+        fetch = {
+            'fitbit': self._fitbit_range,
+            'oura': self._oura_range,
+            'google_fit': self._google_fit_range,
+        }[provider]
+        return fetch(access_token, start_date, end_date, deadline)
+    
+    def _fitbit_range(self, access_token: str, start_date: str, end_date: str, deadline: Optional[float]) -> Dict:
+        headers = {'Authorization': f'Bearer {access_token}', 'Accept': 'application/json'}
+        series = ['steps', 'calories', 'minutesVeryActive', 'heart']
+        responses = self._get_all('fitbit', [
+            (f'https://api.fitbit.com/1/user/-/activities/{name}/date/{start_date}/{end_date}.json', {'headers': headers})
+            for name in series
+        ], deadline)
+        
+        days = {}
+        for name, response in zip(series, responses):
+            response.raise_for_status()
+            for point in response.json().get(f'activities-{name}', []):
+                day = days.setdefault(point['dateTime'], {'raw': {}})
+                day['raw'][name] = point
+                value = point.get('value')
+                if name == 'heart':
+                    day['heart_rate'] = (value or {}).get('restingHeartRate')
+                elif name == 'steps':
+                    day['steps'] = int(float(value or 0))
+                elif name == 'calories':
+                    day['calories_burned'] = int(float(value or 0))
+                else:
+                    day['active_minutes'] = int(float(value or 0))
+        return days
+    
+    def _oura_collection(self, collection: str, headers: Dict, start_date: str, end_date: str,
+                         deadline: Optional[float]) -> List[Dict]:
+        url = f'https://api.ouraring.com/v2/usercollection/{collection}'
+        params = {'start_date': start_date, 'end_date': end_date}
+        records = []
+        while True:
+            response = self._request('GET', url, 'oura', deadline, headers=headers, params=params)
+            response.raise_for_status()
+            data = response.json()
+            records.extend(data.get('data', []))
+            if not data.get('next_token'):
+                return records
+            params = {'start_date': start_date, 'end_date': end_date, 'next_token': data['next_token']}
+    
+    def _oura_range(self, access_token: str, start_date: str, end_date: str, deadline: Optional[float]) -> Dict:
+        headers = {'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'}
+        days = {}
+        for record in self._oura_collection('daily_activity', headers, start_date, end_date, deadline):
+            days[record['day']] = {
+                'steps': record.get('steps', 0),
+                'calories_burned': record.get('active_calories', 0),
+                'active_minutes': (record.get('high_activity_time', 0) + record.get('medium_activity_time', 0)) // 60,
+                'heart_rate': None,
+                'raw': record
+            }
+        return days
+    
+    def _google_fit_range(self, access_token: str, start_date: str, end_date: str, deadline: Optional[float]) -> Dict:
+        headers = {'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'}
+        start_time = int(datetime.strptime(start_date, '%Y-%m-%d').timestamp() * 1000)
+        end_time = int((datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).timestamp() * 1000)
+        aggregate_data = {
+            "aggregateBy": [
+                {"dataTypeName": "com.google.step_count.delta"},
+                {"dataTypeName": "com.google.calories.expended"},
+                {"dataTypeName": "com.google.active_minutes"},
+                {"dataTypeName": "com.google.heart_rate.bpm"}
+            ],
+            "bucketByTime": {"durationMillis": 86400000},  # One bucket per day
+            "startTimeMillis": start_time,
+            "endTimeMillis": end_time
+        }
+        response = self._request('POST', GOOGLE_FIT_AGGREGATE_URL, 'google_fit', deadline, headers=headers,
+                                 json=aggregate_data, idempotent=True)
+        response.raise_for_status()
+        
+        days = {}
+        for bucket in response.json().get('bucket', []):
+            date = datetime.fromtimestamp(int(bucket['startTimeMillis']) / 1000).strftime('%Y-%m-%d')
+            day = {'steps': 0, 'calories_burned': 0, 'active_minutes': 0, 'heart_rate': None}
+            points = 0
+            for dataset in bucket.get('dataset', []):
+                data_type = dataset.get('dataSourceId', '')
+                for point in dataset.get('point', []):
+                    values = point.get('value', [])
+                    if not values:
+                        continue
+                    points += 1
+                    if 'step_count' in data_type:
+                        day['steps'] += values[0].get('intVal', 0)
+                    elif 'calories' in data_type:
+                        day['calories_burned'] += int(values[0].get('fpVal', 0))
+                    elif 'active_minutes' in data_type:
+                        day['active_minutes'] += values[0].get('intVal', 0)
+                    elif 'heart_rate' in data_type:
+                        day['heart_rate'] = values[0].get('fpVal')
+            if points:
+                day['raw'] = bucket
+                days[date] = day
+        return days
+    
     # Helper methods for data extraction
     def _extract_fitbit_sleep_hours(self, sleep_data: Dict) -> float:
         """Extract sleep hours from Fitbit sleep data"""
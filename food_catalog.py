@@ -0,0 +1,320 @@
+"""
+UK Food Catalogs
+Static UK supermarket and restaurant foods, indexed once at import for
+fast name/brand lookups
+"""
+
+import heapq
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from nutrition import normalize_food
+
+_TOKEN = re.compile(r"[a-z0-9&]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; apostrophes are dropped so Sainsbury's == Sainsburys"""
+    return _TOKEN.findall(text.lower().replace("'", ""))
+
+class _TrieNode:
+    __slots__ = ('children', 'tokens')
+
+    def __init__(self):
+        self.children = {}
+        self.tokens = []
+
+class CatalogIndex:
+    """Read-only search index over a food catalog.
+
+    Name and brand tokens go into an inverted index (token -> item ids) and
+    a prefix trie over the distinct tokens. Each trie node lists the tokens
+    below it, so the trailing, still-being-typed query word costs one walk
+    down the trie plus a union of postings. Results keep catalog order.
+    """
+
+    def __init__(self, foods: Iterable[Dict]):
+        self.foods = tuple(foods)
+        # Substring fallback for queries the token index cannot answer
+        # (e.g. "burger" inside "cheeseburger")
+        self._haystacks = tuple(f"{food['name']} {food.get('brand', '')}".lower() for food in self.foods)
+
+        postings = defaultdict(set)
+        for item_id, food in enumerate(self.foods):
+            for token in tokenize(food['name']) + tokenize(food.get('brand', '')):
+                postings[token].add(item_id)
+        self._postings = {token: frozenset(ids) for token, ids in postings.items()}
+
+        self._trie = _TrieNode()
+        for token in sorted(self._postings):
+            node = self._trie
+            for char in token:
+                node = node.children.setdefault(char, _TrieNode())
+                node.tokens.append(token)
+        self._freeze(self._trie)
+
+    def _freeze(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            node.tokens = tuple(node.tokens)
+            stack.extend(node.children.values())
+
+    def _prefix_ids(self, prefix: str) -> set:
+        node = self._trie
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        ids = set()
+        for token in node.tokens:
+            ids.update(self._postings[token])
+        return ids
+
+    def first(self, limit: int) -> List[Dict]:
+        return [dict(food) for food in self.foods[:limit]]
+
+    def search(self, query: str, limit: int = 15) -> List[Dict]:
+        """Items matching every query word, in catalog order.
+
+        Completed words must match a name/brand token exactly; the last
+        word matches as a prefix unless the query ends in a separator.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        if query[-1:].isalnum():
+            complete, partial = tokens[:-1], tokens[-1]
+        else:
+            complete, partial = tokens, None
+
+        matches = [self._postings.get(token, frozenset()) for token in complete]
+        if partial is not None:
+            matches.append(self._prefix_ids(partial))
+        matches.sort(key=len)
+        ids = set(matches[0]).intersection(*matches[1:])
+
+        if not ids:
+            needle = query.lower()
+            ids = [item_id for item_id, haystack in enumerate(self._haystacks) if needle in haystack]
+
+        return [dict(self.foods[item_id]) for item_id in heapq.nsmallest(limit, ids)]
+
+UK_RETAIL_FOODS = (
+    # Tesco Foods
+    {'name': 'Tesco Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Tesco'},
+    {'name': 'Tesco Finest Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Tesco'},
+    {'name': 'Tesco Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'Tesco'},
+    {'name': 'Tesco Greek Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'Tesco'},
+    {'name': 'Tesco Bananas', 'source': 'UK Retail', 'nutrients': {'calories': '89 kcal', 'protein': '1.1g', 'carbs': '23g', 'fat': '0.3g'}, 'serving_size': '100g', 'brand': 'Tesco'},
+    {'name': 'Tesco Porridge Oats', 'source': 'UK Retail', 'nutrients': {'calories': '379 kcal', 'protein': '11g', 'carbs': '60g', 'fat': '8g'}, 'serving_size': '100g', 'brand': 'Tesco'},
+    {'name': 'Tesco Semi-Skimmed Milk', 'source': 'UK Retail', 'nutrients': {'calories': '46 kcal', 'protein': '3.4g', 'carbs': '4.8g', 'fat': '1.7g'}, 'serving_size': '100ml', 'brand': 'Tesco'},
+    {'name': 'Tesco Large Eggs', 'source': 'UK Retail', 'nutrients': {'calories': '155 kcal', 'protein': '13g', 'carbs': '1.1g', 'fat': '11g'}, 'serving_size': '100g', 'brand': 'Tesco'},
+    {'name': 'Tesco Broccoli', 'source': 'UK Retail', 'nutrients': {'calories': '34 kcal', 'protein': '2.8g', 'carbs': '7g', 'fat': '0.4g'}, 'serving_size': '100g', 'brand': 'Tesco'},
+    {'name': 'Tesco Brown Rice', 'source': 'UK Retail', 'nutrients': {'calories': '111 kcal', 'protein': '2.6g', 'carbs': '23g', 'fat': '0.9g'}, 'serving_size': '100g', 'brand': 'Tesco'},
+
+    # Sainsbury's Foods
+    {'name': 'Sainsburys Taste the Difference Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
+    {'name': 'Sainsburys Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
+    {'name': 'Sainsburys Scottish Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
+    {'name': 'Sainsburys Greek Style Natural Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
+    {'name': 'Sainsburys Bananas', 'source': 'UK Retail', 'nutrients': {'calories': '89 kcal', 'protein': '1.1g', 'carbs': '23g', 'fat': '0.3g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
+    {'name': 'Sainsburys Porridge Oats', 'source': 'UK Retail', 'nutrients': {'calories': '379 kcal', 'protein': '11g', 'carbs': '60g', 'fat': '8g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
+    {'name': 'Sainsburys Semi Skimmed Milk', 'source': 'UK Retail', 'nutrients': {'calories': '46 kcal', 'protein': '3.4g', 'carbs': '4.8g', 'fat': '1.7g'}, 'serving_size': '100ml', 'brand': 'Sainsburys'},
+    {'name': 'Sainsburys Free Range Eggs', 'source': 'UK Retail', 'nutrients': {'calories': '155 kcal', 'protein': '13g', 'carbs': '1.1g', 'fat': '11g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
+    {'name': 'Sainsburys Broccoli', 'source': 'UK Retail', 'nutrients': {'calories': '34 kcal', 'protein': '2.8g', 'carbs': '7g', 'fat': '0.4g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
+    {'name': 'Sainsburys Brown Rice', 'source': 'UK Retail', 'nutrients': {'calories': '111 kcal', 'protein': '2.6g', 'carbs': '23g', 'fat': '0.9g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
+
+    # M&S Foods
+    {'name': 'M&S Select Farms Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'M&S'},
+    {'name': 'M&S Scottish Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'M&S'},
+    {'name': 'M&S Seeded Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '260 kcal', 'protein': '10g', 'carbs': '42g', 'fat': '6g'}, 'serving_size': '100g', 'brand': 'M&S'},
+    {'name': 'M&S Greek Style Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'M&S'},
+    {'name': 'M&S Organic Bananas', 'source': 'UK Retail', 'nutrients': {'calories': '89 kcal', 'protein': '1.1g', 'carbs': '23g', 'fat': '0.3g'}, 'serving_size': '100g', 'brand': 'M&S'},
+    {'name': 'M&S Scottish Porridge Oats', 'source': 'UK Retail', 'nutrients': {'calories': '379 kcal', 'protein': '11g', 'carbs': '60g', 'fat': '8g'}, 'serving_size': '100g', 'brand': 'M&S'},
+    {'name': 'M&S Organic Semi Skimmed Milk', 'source': 'UK Retail', 'nutrients': {'calories': '46 kcal', 'protein': '3.4g', 'carbs': '4.8g', 'fat': '1.7g'}, 'serving_size': '100ml', 'brand': 'M&S'},
+    {'name': 'M&S Free Range Eggs', 'source': 'UK Retail', 'nutrients': {'calories': '155 kcal', 'protein': '13g', 'carbs': '1.1g', 'fat': '11g'}, 'serving_size': '100g', 'brand': 'M&S'},
+
+    # ASDA Foods
+    {'name': 'ASDA Smart Price Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'ASDA'},
+    {'name': 'ASDA Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'ASDA'},
+    {'name': 'ASDA Atlantic Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'ASDA'},
+    {'name': 'ASDA Greek Style Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'ASDA'},
+    {'name': 'ASDA Bananas', 'source': 'UK Retail', 'nutrients': {'calories': '89 kcal', 'protein': '1.1g', 'carbs': '23g', 'fat': '0.3g'}, 'serving_size': '100g', 'brand': 'ASDA'},
+    {'name': 'ASDA Porridge Oats', 'source': 'UK Retail', 'nutrients': {'calories': '379 kcal', 'protein': '11g', 'carbs': '60g', 'fat': '8g'}, 'serving_size': '100g', 'brand': 'ASDA'},
+
+    # Morrisons Foods
+    {'name': 'Morrisons British Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Morrisons'},
+    {'name': 'Morrisons Malted Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'Morrisons'},
+    {'name': 'Morrisons Scottish Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Morrisons'},
+    {'name': 'Morrisons Greek Style Natural Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'Morrisons'},
+    {'name': 'Morrisons Bananas', 'source': 'UK Retail', 'nutrients': {'calories': '89 kcal', 'protein': '1.1g', 'carbs': '23g', 'fat': '0.3g'}, 'serving_size': '100g', 'brand': 'Morrisons'},
+
+    # Iceland Foods
+    {'name': 'Iceland Chicken Breast Fillets', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Iceland'},
+    {'name': 'Iceland Salmon Fillets', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Iceland'},
+    {'name': 'Iceland Frozen Mixed Vegetables', 'source': 'UK Retail', 'nutrients': {'calories': '42 kcal', 'protein': '2.6g', 'carbs': '8g', 'fat': '0.4g'}, 'serving_size': '100g', 'brand': 'Iceland'},
+
+    # Waitrose Foods
+    {'name': 'Waitrose Organic Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Waitrose'},
+    {'name': 'Waitrose Duchy Organic Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'Waitrose'},
+    {'name': 'Waitrose Wild Alaskan Salmon', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Waitrose'},
+    {'name': 'Waitrose Greek Style Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'Waitrose'},
+
+    # Co-op Foods
+    {'name': 'Co-op British Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Co-op'},
+    {'name': 'Co-op Seeded Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '260 kcal', 'protein': '10g', 'carbs': '42g', 'fat': '6g'}, 'serving_size': '100g', 'brand': 'Co-op'},
+    {'name': 'Co-op Scottish Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Co-op'},
+
+    # Aldi Foods
+    {'name': 'Aldi Never Any! Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Aldi'},
+    {'name': 'Aldi Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'Aldi'},
+    {'name': 'Aldi Fresh Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Aldi'},
+    {'name': 'Aldi Greek Style Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'Aldi'},
+
+    # Lidl Foods
+    {'name': 'Lidl Birchwood British Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Lidl'},
+    {'name': 'Lidl Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'Lidl'},
+    {'name': 'Lidl Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Lidl'},
+
+    # Common UK Ready Meals & Convenience Foods
+    {'name': 'Tesco Chicken Tikka Masala', 'source': 'UK Retail', 'nutrients': {'calories': '145 kcal', 'protein': '12g', 'carbs': '8g', 'fat': '8g'}, 'serving_size': '100g', 'brand': 'Tesco'},
+    {'name': 'M&S Chicken & Vegetable Curry', 'source': 'UK Retail', 'nutrients': {'calories': '120 kcal', 'protein': '14g', 'carbs': '6g', 'fat': '5g'}, 'serving_size': '100g', 'brand': 'M&S'},
+    {'name': 'Sainsburys Lasagne', 'source': 'UK Retail', 'nutrients': {'calories': '155 kcal', 'protein': '9g', 'carbs': '15g', 'fat': '7g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
+    {'name': 'ASDA Fish & Chips', 'source': 'UK Retail', 'nutrients': {'calories': '220 kcal', 'protein': '12g', 'carbs': '25g', 'fat': '9g'}, 'serving_size': '100g', 'brand': 'ASDA'},
+
+    # UK Breakfast Items
+    {'name': 'Tesco Baked Beans', 'source': 'UK Retail', 'nutrients': {'calories': '81 kcal', 'protein': '5g', 'carbs': '15g', 'fat': '0.6g'}, 'serving_size': '100g', 'brand': 'Tesco'},
+    {'name': 'Warburtons Crumpets', 'source': 'UK Retail', 'nutrients': {'calories': '199 kcal', 'protein': '6g', 'carbs': '38g', 'fat': '2.4g'}, 'serving_size': '100g', 'brand': 'Warburtons'},
+    {'name': 'Kelloggs Cornflakes', 'source': 'UK Retail', 'nutrients': {'calories': '378 kcal', 'protein': '7g', 'carbs': '84g', 'fat': '0.9g'}, 'serving_size': '100g', 'brand': 'Kelloggs'},
+    {'name': 'Weetabix Original', 'source': 'UK Retail', 'nutrients': {'calories': '362 kcal', 'protein': '12g', 'carbs': '69g', 'fat': '2.2g'}, 'serving_size': '100g', 'brand': 'Weetabix'},
+
+    # UK Snacks & Treats
+    {'name': 'McVities Digestive Biscuits', 'source': 'UK Retail', 'nutrients': {'calories': '471 kcal', 'protein': '7g', 'carbs': '66g', 'fat': '20g'}, 'serving_size': '100g', 'brand': 'McVities'},
+    {'name': 'Walkers Ready Salted Crisps', 'source': 'UK Retail', 'nutrients': {'calories': '534 kcal', 'protein': '6g', 'carbs': '49g', 'fat': '35g'}, 'serving_size': '100g', 'brand': 'Walkers'},
+    {'name': 'Cadbury Dairy Milk Chocolate', 'source': 'UK Retail', 'nutrients': {'calories': '534 kcal', 'protein': '7.3g', 'carbs': '57g', 'fat': '30g'}, 'serving_size': '100g', 'brand': 'Cadbury'},
+
+    # UK Cheese & Dairy
+    {'name': 'Cathedral City Mature Cheddar', 'source': 'UK Retail', 'nutrients': {'calories': '416 kcal', 'protein': '25g', 'carbs': '0.1g', 'fat': '35g'}, 'serving_size': '100g', 'brand': 'Cathedral City'},
+    {'name': 'Philadelphia Cream Cheese', 'source': 'UK Retail', 'nutrients': {'calories': '255 kcal', 'protein': '5.8g', 'carbs': '4g', 'fat': '24g'}, 'serving_size': '100g', 'brand': 'Philadelphia'},
+    {'name': 'Yeo Valley Organic Butter', 'source': 'UK Retail', 'nutrients': {'calories': '737 kcal', 'protein': '0.9g', 'carbs': '0.6g', 'fat': '81g'}, 'serving_size': '100g', 'brand': 'Yeo Valley'},
+)
+
+UK_RESTAURANT_FOODS = (
+    # McDonalds UK
+    {'name': 'McDonalds Big Mac', 'source': 'UK Restaurant', 'calories_per_100g': 257, 'nutrients': {'calories': '503 kcal', 'protein': '25g', 'carbs': '44g', 'fat': '26g'}, 'serving_size': '1 burger', 'brand': 'McDonalds'},
+    {'name': 'Big Mac', 'source': 'UK Restaurant', 'calories_per_100g': 257, 'nutrients': {'calories': '503 kcal', 'protein': '25g', 'carbs': '44g', 'fat': '26g'}, 'serving_size': '1 burger', 'brand': 'McDonalds'},
+    {'name': 'McDonalds Chicken McNuggets (6)', 'source': 'UK Restaurant', 'nutrients': {'calories': '259 kcal', 'protein': '15g', 'carbs': '16g', 'fat': '15g'}, 'serving_size': '6 nuggets', 'brand': 'McDonalds'},
+    {'name': 'McDonalds Fries (Medium)', 'source': 'UK Restaurant', 'nutrients': {'calories': '337 kcal', 'protein': '3.4g', 'carbs': '41g', 'fat': '17g'}, 'serving_size': '1 portion', 'brand': 'McDonalds'},
+    {'name': 'McDonalds Quarter Pounder with Cheese', 'source': 'UK Restaurant', 'nutrients': {'calories': '529 kcal', 'protein': '30g', 'carbs': '41g', 'fat': '31g'}, 'serving_size': '1 burger', 'brand': 'McDonalds'},
+    {'name': 'McDonalds Filet-O-Fish', 'source': 'UK Restaurant', 'nutrients': {'calories': '329 kcal', 'protein': '17g', 'carbs': '33g', 'fat': '13g'}, 'serving_size': '1 burger', 'brand': 'McDonalds'},
+
+    # KFC UK
+    {'name': 'KFC Original Recipe Chicken (1 piece)', 'source': 'UK Restaurant', 'nutrients': {'calories': '237 kcal', 'protein': '21g', 'carbs': '7.4g', 'fat': '13g'}, 'serving_size': '1 piece', 'brand': 'KFC'},
+    {'name': 'KFC Zinger Burger', 'source': 'UK Restaurant', 'nutrients': {'calories': '450 kcal', 'protein': '27g', 'carbs': '44g', 'fat': '19g'}, 'serving_size': '1 burger', 'brand': 'KFC'},
+    {'name': 'KFC Fries (Regular)', 'source': 'UK Restaurant', 'nutrients': {'calories': '284 kcal', 'protein': '3.4g', 'carbs': '34g', 'fat': '14g'}, 'serving_size': '1 portion', 'brand': 'KFC'},
+    {'name': 'KFC Popcorn Chicken (Regular)', 'source': 'UK Restaurant', 'nutrients': {'calories': '285 kcal', 'protein': '16g', 'carbs': '21g', 'fat': '16g'}, 'serving_size': '1 portion', 'brand': 'KFC'},
+
+    # Pizza Hut UK
+    {'name': 'Pizza Hut Margherita Pizza (Slice)', 'source': 'UK Restaurant', 'nutrients': {'calories': '220 kcal', 'protein': '9g', 'carbs': '25g', 'fat': '9g'}, 'serving_size': '1 slice', 'brand': 'Pizza Hut'},
+    {'name': 'Pizza Hut Pepperoni Feast (Slice)', 'source': 'UK Restaurant', 'nutrients': {'calories': '280 kcal', 'protein': '12g', 'carbs': '28g', 'fat': '14g'}, 'serving_size': '1 slice', 'brand': 'Pizza Hut'},
+    {'name': 'Pizza Hut Garlic Bread', 'source': 'UK Restaurant', 'nutrients': {'calories': '180 kcal', 'protein': '4g', 'carbs': '25g', 'fat': '7g'}, 'serving_size': '1 slice', 'brand': 'Pizza Hut'},
+
+    # Subway UK
+    {'name': 'Subway Italian B.M.T. (6 inch)', 'source': 'UK Restaurant', 'nutrients': {'calories': '380 kcal', 'protein': '19g', 'carbs': '44g', 'fat': '14g'}, 'serving_size': '1 sub', 'brand': 'Subway'},
+    {'name': 'Subway Chicken Teriyaki (6 inch)', 'source': 'UK Restaurant', 'nutrients': {'calories': '370 kcal', 'protein': '25g', 'carbs': '48g', 'fat': '8g'}, 'serving_size': '1 sub', 'brand': 'Subway'},
+    {'name': 'Subway Veggie Delite (6 inch)', 'source': 'UK Restaurant', 'nutrients': {'calories': '230 kcal', 'protein': '9g', 'carbs': '37g', 'fat': '3g'}, 'serving_size': '1 sub', 'brand': 'Subway'},
+
+    # Nandos UK
+    {'name': 'Nandos 1/4 Chicken', 'source': 'UK Restaurant', 'nutrients': {'calories': '327 kcal', 'protein': '42g', 'carbs': '0g', 'fat': '17g'}, 'serving_size': '1 portion', 'brand': 'Nandos'},
+    {'name': 'Nandos Peri-Peri Fries (Regular)', 'source': 'UK Restaurant', 'nutrients': {'calories': '441 kcal', 'protein': '4.4g', 'carbs': '54g', 'fat': '22g'}, 'serving_size': '1 portion', 'brand': 'Nandos'},
+    {'name': 'Nandos Spicy Rice', 'source': 'UK Restaurant', 'nutrients': {'calories': '369 kcal', 'protein': '7.3g', 'carbs': '67g', 'fat': '7.3g'}, 'serving_size': '1 portion', 'brand': 'Nandos'},
+
+    # Burger King UK
+    {'name': 'Burger King Whopper', 'source': 'UK Restaurant', 'nutrients': {'calories': '677 kcal', 'protein': '29g', 'carbs': '49g', 'fat': '41g'}, 'serving_size': '1 burger', 'brand': 'Burger King'},
+    {'name': 'Burger King Chicken Royale', 'source': 'UK Restaurant', 'nutrients': {'calories': '623 kcal', 'protein': '23g', 'carbs': '55g', 'fat': '34g'}, 'serving_size': '1 burger', 'brand': 'Burger King'},
+    {'name': 'Burger King Fries (Medium)', 'source': 'UK Restaurant', 'nutrients': {'calories': '354 kcal', 'protein': '4g', 'carbs': '45g', 'fat': '17g'}, 'serving_size': '1 portion', 'brand': 'Burger King'},
+
+    # Dominos Pizza UK
+    {'name': 'Dominos Margherita Pizza (Slice)', 'source': 'UK Restaurant', 'nutrients': {'calories': '210 kcal', 'protein': '8g', 'carbs': '24g', 'fat': '8g'}, 'serving_size': '1 slice', 'brand': 'Dominos'},
+    {'name': 'Dominos Pepperoni Passion (Slice)', 'source': 'UK Restaurant', 'nutrients': {'calories': '270 kcal', 'protein': '11g', 'carbs': '27g', 'fat': '13g'}, 'serving_size': '1 slice', 'brand': 'Dominos'},
+    {'name': 'Dominos Garlic Pizza Bread', 'source': 'UK Restaurant', 'nutrients': {'calories': '170 kcal', 'protein': '3g', 'carbs': '23g', 'fat': '7g'}, 'serving_size': '1 slice', 'brand': 'Dominos'},
+
+    # Just Eat / Deliveroo - Generic (Needs Specifics)
+    {'name': 'Just Eat - Generic Takeaway Meal', 'source': 'UK Delivery', 'nutrients': {'calories': '800 kcal', 'protein': '30g', 'carbs': '80g', 'fat': '40g'}, 'serving_size': '1 meal', 'brand': 'Just Eat'},
+    {'name': 'Deliveroo - Generic Restaurant Meal', 'source': 'UK Delivery', 'nutrients': {'calories': '750 kcal', 'protein': '25g', 'carbs': '70g', 'fat': '40g'}, 'serving_size': '1 meal', 'brand': 'Deliveroo'},
+
+    # Greggs UK
+    {'name': 'Greggs Sausage Roll', 'source': 'UK Retail', 'nutrients': {'calories': '329 kcal', 'protein': '9.7g', 'carbs': '27g', 'fat': '20g'}, 'serving_size': '1 roll', 'brand': 'Greggs'},
+    {'name': 'Greggs Steak Bake', 'source': 'UK Retail', 'nutrients': {'calories': '411 kcal', 'protein': '14g', 'carbs': '37g', 'fat': '22g'}, 'serving_size': '1 bake', 'brand': 'Greggs'},
+    {'name': 'Greggs Vegan Sausage Roll', 'source': 'UK Retail', 'nutrients': {'calories': '311 kcal', 'protein': '7.7g', 'carbs': '24g', 'fat': '20g'}, 'serving_size': '1 roll', 'brand': 'Greggs'},
+
+     # Local Indian Takeaway - Generic
+    {'name': 'Chicken Tikka Masala (Takeaway)', 'source': 'UK Takeaway', 'nutrients': {'calories': '750 kcal', 'protein': '40g', 'carbs': '60g', 'fat': '40g'}, 'serving_size': '1 portion', 'brand': 'Local Indian'},
+    {'name': 'Lamb Biryani (Takeaway)', 'source': 'UK Takeaway', 'nutrients': {'calories': '850 kcal', 'protein': '35g', 'carbs': '90g', 'fat': '40g'}, 'serving_size': '1 portion', 'brand': 'Local Indian'},
+    {'name': 'Vegetable Samosa (Takeaway)', 'source': 'UK Takeaway', 'nutrients': {'calories': '250 kcal', 'protein': '5g', 'carbs': '30g', 'fat': '12g'}, 'serving_size': '1 piece', 'brand': 'Local Indian'},
+
+    # Local Chinese Takeaway - Generic
+    {'name': 'Sweet and Sour Chicken (Takeaway)', 'source': 'UK Takeaway', 'nutrients': {'calories': '650 kcal', 'protein': '30g', 'carbs': '70g', 'fat': '25g'}, 'serving_size': '1 portion', 'brand': 'Local Chinese'},
+    {'name': 'Egg Fried Rice (Takeaway)', 'source': 'UK Takeaway', 'nutrients': {'calories': '400 kcal', 'protein': '10g', 'carbs': '50g', 'fat': '15g'}, 'serving_size': '1 portion', 'brand': 'Local Chinese'},
+    {'name': 'Spring Rolls (Takeaway)', 'source': 'UK Takeaway', 'nutrients': {'calories': '200 kcal', 'protein': '3g', 'carbs': '20g', 'fat': '10g'}, 'serving_size': '1 piece', 'brand': 'Local Chinese'},
+
+    # Local Fish and Chips Shop - Generic
+    {'name': 'Fish and Chips (Takeaway)', 'source': 'UK Takeaway', 'calories_per_100g': 200, 'nutrients': {'calories': '800 kcal', 'protein': '30g', 'carbs': '70g', 'fat': '50g'}, 'serving_size': '1 portion', 'brand': 'Local Chippy'},
+    {'name': 'Sausage and Chips (Takeaway)', 'source': 'UK Takeaway', 'calories_per_100g': 175, 'nutrients': {'calories': '700 kcal', 'protein': '25g', 'carbs': '60g', 'fat': '40g'}, 'serving_size': '1 portion', 'brand': 'Local Chippy'},
+    {'name': 'Battered Sausage (Takeaway)', 'source': 'UK Takeaway', 'calories_per_100g': 267, 'nutrients': {'calories': '400 kcal', 'protein': '15g', 'carbs': '30g', 'fat': '25g'}, 'serving_size': '1 piece', 'brand': 'Local Chippy'},
+
+    # More Popular Branded Foods
+    # Coca-Cola Products
+    {'name': 'Coca Cola', 'source': 'UK Retail', 'calories_per_100g': 42, 'nutrients': {'calories': '42 kcal', 'protein': '0g', 'carbs': '10.6g', 'fat': '0g'}, 'serving_size': '100ml', 'brand': 'Coca-Cola'},
+    {'name': 'Diet Coke', 'source': 'UK Retail', 'calories_per_100g': 0, 'nutrients': {'calories': '0 kcal', 'protein': '0g', 'carbs': '0g', 'fat': '0g'}, 'serving_size': '100ml', 'brand': 'Coca-Cola'},
+    {'name': 'Sprite', 'source': 'UK Retail', 'calories_per_100g': 37, 'nutrients': {'calories': '37 kcal', 'protein': '0g', 'carbs': '9g', 'fat': '0g'}, 'serving_size': '100ml', 'brand': 'Coca-Cola'},
+
+    # Nestle Products
+    {'name': 'Kit Kat', 'source': 'UK Retail', 'calories_per_100g': 518, 'nutrients': {'calories': '518 kcal', 'protein': '8g', 'carbs': '57g', 'fat': '28g'}, 'serving_size': '100g', 'brand': 'Nestle'},
+    {'name': 'Smarties', 'source': 'UK Retail', 'calories_per_100g': 468, 'nutrients': {'calories': '468 kcal', 'protein': '4.5g', 'carbs': '73g', 'fat': '17g'}, 'serving_size': '100g', 'brand': 'Nestle'},
+    {'name': 'Aero Chocolate', 'source': 'UK Retail', 'calories_per_100g': 535, 'nutrients': {'calories': '535 kcal', 'protein': '6.9g', 'carbs': '56g', 'fat': '32g'}, 'serving_size': '100g', 'brand': 'Nestle'},
+
+    # Unilever Products
+    {'name': 'Ben & Jerrys Cookie Dough', 'source': 'UK Retail', 'calories_per_100g': 270, 'nutrients': {'calories': '270 kcal', 'protein': '4g', 'carbs': '28g', 'fat': '16g'}, 'serving_size': '100g', 'brand': 'Ben & Jerrys'},
+    {'name': 'Magnum Classic', 'source': 'UK Retail', 'calories_per_100g': 310, 'nutrients': {'calories': '310 kcal', 'protein': '4.3g', 'carbs': '26g', 'fat': '21g'}, 'serving_size': '100g', 'brand': 'Magnum'},
+
+    # Mars Products
+    {'name': 'Mars Bar', 'source': 'UK Retail', 'calories_per_100g': 449, 'nutrients': {'calories': '449 kcal', 'protein': '4.6g', 'carbs': '68g', 'fat': '17g'}, 'serving_size': '100g', 'brand': 'Mars'},
+    {'name': 'Snickers', 'source': 'UK Retail', 'calories_per_100g': 488, 'nutrients': {'calories': '488 kcal', 'protein': '8.2g', 'carbs': '56g', 'fat': '25g'}, 'serving_size': '100g', 'brand': 'Mars'},
+    {'name': 'Twix', 'source': 'UK Retail', 'calories_per_100g': 502, 'nutrients': {'calories': '502 kcal', 'protein': '5.2g', 'carbs': '62g', 'fat': '25g'}, 'serving_size': '100g', 'brand': 'Mars'},
+
+    # Kelloggs Products
+    {'name': 'Kelloggs Special K', 'source': 'UK Retail', 'calories_per_100g': 378, 'nutrients': {'calories': '378 kcal', 'protein': '17g', 'carbs': '67g', 'fat': '1.5g'}, 'serving_size': '100g', 'brand': 'Kelloggs'},
+    {'name': 'Kelloggs Crunchy Nut', 'source': 'UK Retail', 'calories_per_100g': 407, 'nutrients': {'calories': '407 kcal', 'protein': '7g', 'carbs': '77g', 'fat': '8g'}, 'serving_size': '100g', 'brand': 'Kelloggs'},
+    {'name': 'Kelloggs Frosties', 'source': 'UK Retail', 'calories_per_100g': 375, 'nutrients': {'calories': '375 kcal', 'protein': '4.5g', 'carbs': '87g', 'fat': '0.6g'}, 'serving_size': '100g', 'brand': 'Kelloggs'},
+
+    # Pepsico Products
+    {'name': 'Pepsi Cola', 'source': 'UK Retail', 'calories_per_100g': 43, 'nutrients': {'calories': '43 kcal', 'protein': '0g', 'carbs': '11g', 'fat': '0g'}, 'serving_size': '100ml', 'brand': 'Pepsi'},
+    {'name': 'Walkers Cheese & Onion', 'source': 'UK Retail', 'calories_per_100g': 534, 'nutrients': {'calories': '534 kcal', 'protein': '6g', 'carbs': '49g', 'fat': '35g'}, 'serving_size': '100g', 'brand': 'Walkers'},
+    {'name': 'Doritos Tangy Cheese', 'source': 'UK Retail', 'calories_per_100g': 498, 'nutrients': {'calories': '498 kcal', 'protein': '7g', 'carbs': '58g', 'fat': '26g'}, 'serving_size': '100g', 'brand': 'Doritos'},
+
+    # Heinz Products
+    {'name': 'Heinz Baked Beans', 'source': 'UK Retail', 'calories_per_100g': 81, 'nutrients': {'calories': '81 kcal', 'protein': '5g', 'carbs': '15g', 'fat': '0.6g'}, 'serving_size': '100g', 'brand': 'Heinz'},
+    {'name': 'Heinz Tomato Ketchup', 'source': 'UK Retail', 'calories_per_100g': 101, 'nutrients': {'calories': '101 kcal', 'protein': '1.1g', 'carbs': '24g', 'fat': '0.1g'}, 'serving_size': '100g', 'brand': 'Heinz'},
+
+    # Mondelez Products
+    {'name': 'Oreo Cookies', 'source': 'UK Retail', 'calories_per_100g': 480, 'nutrients': {'calories': '480 kcal', 'protein': '5g', 'carbs': '70g', 'fat': '20g'}, 'serving_size': '100g', 'brand': 'Oreo'},
+    {'name': 'Toblerone', 'source': 'UK Retail', 'calories_per_100g': 534, 'nutrients': {'calories': '534 kcal', 'protein': '8.8g', 'carbs': '62g', 'fat': '28g'}, 'serving_size': '100g', 'brand': 'Toblerone'},
+
+    # General Mills
+    {'name': 'Haagen Dazs Vanilla', 'source': 'UK Retail', 'calories_per_100g': 244, 'nutrients': {'calories': '244 kcal', 'protein': '4.5g', 'carbs': '21g', 'fat': '16g'}, 'serving_size': '100g', 'brand': 'Haagen-Dazs'},
+
+    # UK Specific Brands
+    {'name': 'Yorkshire Tea', 'source': 'UK Retail', 'calories_per_100g': 1, 'nutrients': {'calories': '1 kcal', 'protein': '0g', 'carbs': '0.3g', 'fat': '0g'}, 'serving_size': '100ml', 'brand': 'Yorkshire Tea'},
+    {'name': 'Hovis Wholemeal Bread', 'source': 'UK Retail', 'calories_per_100g': 219, 'nutrients': {'calories': '219 kcal', 'protein': '9g', 'carbs': '36g', 'fat': '3g'}, 'serving_size': '100g', 'brand': 'Hovis'},
+    {'name': 'Bisto Gravy', 'source': 'UK Retail', 'calories_per_100g': 363, 'nutrients': {'calories': '363 kcal', 'protein': '2.5g', 'carbs': '79g', 'fat': '5.5g'}, 'serving_size': '100g', 'brand': 'Bisto'},
+)
+
+# Numeric per-100g nutrients are parsed from the display strings once, here
+UK_RETAIL_FOODS = tuple(normalize_food(food) for food in UK_RETAIL_FOODS)
+UK_RESTAURANT_FOODS = tuple(normalize_food(food) for food in UK_RESTAURANT_FOODS)
+
+uk_retail_index = CatalogIndex(UK_RETAIL_FOODS)
+uk_restaurant_index = CatalogIndex(UK_RESTAURANT_FOODS)
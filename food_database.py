@@ -1,8 +1,12 @@
-import requests
 import os
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 import json
 
+from food_store import normalize_query
+from http_client import http_client
+from nutrition import NUTRIENTS, as_dict, group_totals, macro_split, normalize_food, nutrient_vector, serving_vector
+from singleflight import SingleFlight
+
 class FoodDatabaseAPI:
     def __init__(self):
         self.usda_api_key = os.getenv('USDA_API_KEY', '')  # Optional - USDA works without key too
@@ -21,19 +25,19 @@ class FoodDatabaseAPI:
             if self.usda_api_key:
                 params['api_key'] = self.usda_api_key
 
-            response = requests.get(url, params=params, timeout=10)
+            response = http_client.get(url, 'usda', params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 foods = []
                 for food in data.get('foods', []):
-                    foods.append({
+                    foods.append(normalize_food({
                         'id': food.get('fdcId'),
                         'name': food.get('description', ''),
                         'brand': food.get('brandOwner', ''),
                         'calories_per_100g': self._extract_calories(food.get('foodNutrients', [])),
                         'source': 'USDA',
                         'country': 'US'
-                    })
+                    }))
                 return foods
         except Exception as e:
             print(f"USDA API error: {e}")
@@ -52,13 +56,13 @@ class FoodDatabaseAPI:
                 'countries': 'United Kingdom,United States'  # Focus on UK/US
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = http_client.get(url, 'openfoodfacts', params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 foods = []
                 for product in data.get('products', []):
                     nutriments = product.get('nutriments', {})
-                    foods.append({
+                    foods.append(normalize_food({
                         'id': product.get('code'),
                         'name': product.get('product_name', ''),
                         'brand': product.get('brands', ''),
@@ -68,7 +72,7 @@ class FoodDatabaseAPI:
                         'fat_per_100g': nutriments.get('fat_100g', 0),
                         'source': 'OpenFoodFacts',
                         'country': product.get('countries', '').split(',')[0] if product.get('countries') else 'Unknown'
-                    })
+                    }))
                 return foods
         except Exception as e:
             print(f"Open Food Facts API error: {e}")
@@ -88,14 +92,14 @@ class FoodDatabaseAPI:
                 'nutrition-type': 'cooking'
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = http_client.get(url, 'edamam', params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 foods = []
                 for hint in data.get('hints', [])[:limit]:
                     food = hint.get('food', {})
                     nutrients = food.get('nutrients', {})
-                    foods.append({
+                    foods.append(normalize_food({
                         'id': food.get('foodId'),
                         'name': food.get('label', ''),
                         'brand': food.get('brand', ''),
@@ -105,7 +109,7 @@ class FoodDatabaseAPI:
                         'fat_per_100g': nutrients.get('FAT', 0),
                         'source': 'Edamam',
                         'country': 'US/UK'
-                    })
+                    }))
                 return foods
         except Exception as e:
             print(f"Edamam API error: {e}")
@@ -118,6 +122,9 @@ class FoodDatabaseAPI:
                 return nutrient.get('value', 0)
         return 0
 
+# Concurrent lookups of the same product share one upstream call
+label_flight = SingleFlight()
+
 # Nutrition calculator helper
 class NutritionLabelAPI:
     def __init__(self):
@@ -129,6 +136,10 @@ class NutritionLabelAPI:
         if not self.api_key:
             return {"error": "Nutrition Label API key not configured"}
 
+        key = normalize_query(product_name) or product_name
+        return dict(label_flight.do(key, self._analyze_packaged_food, product_name))
+
+    def _analyze_packaged_food(self, product_name: str) -> Dict:
         try:
             headers = {
                 'X-RapidAPI-Key': self.api_key,
@@ -138,10 +149,10 @@ class NutritionLabelAPI:
             url = f"{self.base_url}/nutrition"
             params = {'query': product_name}
 
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            response = http_client.get(url, 'nutrition_label', headers=headers, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
-                return {
+                return normalize_food({
                     'name': data.get('name', product_name),
                     'calories_per_100g': data.get('calories', 0),
                     'protein_per_100g': data.get('protein', 0),
@@ -152,7 +163,7 @@ class NutritionLabelAPI:
                     'sodium_per_100g': data.get('sodium', 0),
                     'source': 'Nutrition Label API',
                     'detailed_label': data.get('nutrition_label', {})
-                }
+                })
         except Exception as e:
             print(f"Nutrition Label API error: {e}")
 
@@ -161,21 +172,66 @@ class NutritionLabelAPI:
 class NutritionCalculator:
     @staticmethod
     def calculate_serving_nutrition(food_data: Dict, serving_size_grams: float) -> Dict:
-        """Calculate nutrition for a specific serving size"""
-        multiplier = serving_size_grams / 100  # Convert from per 100g
+        """Calculate nutrition for a specific serving size.
+
+        Fields are None for a food with only per-serving values and an
+        unknown serving weight (see nutrient_vector), and 0 for a food with
+        no values at all.
+        """
+        if nutrient_vector(food_data) is None:
+            unknown = None if serving_vector(food_data) is not None else 0.0
+            totals = dict.fromkeys(('calories', 'protein', 'carbs', 'fat'), unknown)
+        else:
+            totals = NutritionCalculator.meal_totals([(food_data, serving_size_grams)])
 
         return {
-            'calories': round((food_data.get('calories_per_100g', 0) * multiplier), 1),
-            'protein': round((food_data.get('protein_per_100g', 0) * multiplier), 1),
-            'carbs': round((food_data.get('carbs_per_100g', 0) * multiplier), 1),
-            'fat': round((food_data.get('fat_per_100g', 0) * multiplier), 1),
+            'calories': totals['calories'],
+            'protein': totals['protein'],
+            'carbs': totals['carbs'],
+            'fat': totals['fat'],
             'serving_size': f"{serving_size_grams}g"
         }
 
+    @staticmethod
+    def meal_totals(items: Iterable[Tuple[Dict, float]]) -> Dict:
+        """Nutrient totals for (food, grams) pairs"""
+        return NutritionCalculator.day_totals({'meal': items})['total']
+
+    @staticmethod
+    def day_totals(meals: Dict[str, Iterable[Tuple]]) -> Dict:
+        """Per-meal and whole-day nutrient totals for {meal: [(food, grams), ...]}.
+
+        An item may be (food, grams, servings) instead; servings are
+        needed for foods whose serving weight is unknown, and a ValueError
+        is raised if they are missing. Every item of the day is scaled and
+        summed in one batch.
+        """
+        vectors, grams, bounds = [], [], []
+        for items in meals.values():
+            start = len(vectors)
+            for food, amount, *servings in items:
+                if servings and servings[0] is not None:
+                    vector, weight = serving_vector(food), float(servings[0]) * 100
+                else:
+                    vector, weight = nutrient_vector(food), float(amount or 0)
+                if vector is None:
+                    raise ValueError(f"{food.get('name', 'food')} has no known serving weight; give servings")
+                vectors.append(vector)
+                grams.append(weight)
+            bounds.append((start, len(vectors)))
+
+        meal_vectors = group_totals(vectors, grams, bounds)
+        total = as_dict(map(sum, zip(*meal_vectors))) if meal_vectors else as_dict([0.0] * len(NUTRIENTS))
+        return {
+            'meals': {meal: as_dict(vector) for meal, vector in zip(meals, meal_vectors)},
+            'total': total,
+            'macro_split': macro_split(total)
+        }
+
 # Main search function for the Flask app
 def search_food_database(query: str) -> List[Dict]:
     """Main search function called by Flask app"""
-    food_db = FoodDatabaseService()
+    # The shared service, so its thread pools and in-flight searches are reused
     return food_db.search_all_databases(query)
 
 # Example usage function
@@ -195,11 +251,17 @@ def search_food_with_nutrition(query: str, serving_size: float = 100) -> Dict:
         }
 
     return {'error': 'No foods found'}
-import requests
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, List, Optional
 
+from ai_cache import ai_cache
+import food_store as food_store_module
+from food_catalog import uk_restaurant_index, uk_retail_index
+from food_search import autocomplete, merge_results, uk_restaurant_fuzzy, uk_retail_fuzzy
+
 class FoodDatabaseService:
     def __init__(self):
         # FoodData Central (USDA) - Free, extensive US database
@@ -209,39 +271,122 @@ class FoodDatabaseService:
         # OpenFoodFacts - Free, global database with UK foods
         self.off_base_url = "https://world.openfoodfacts.org/api/v0"
 
+        # OpenFoodFacts search endpoint
+        self.off_search_url = "https://world.openfoodfacts.org/cgi/search.pl"
+
         # Edamam - Free tier with 100 requests/month
+        self.edamam_url = "https://api.edamam.com/api/food-database/v2/parser"
         self.edamam_app_id = os.getenv('EDAMAM_APP_ID', '')
         self.edamam_app_key = os.getenv('EDAMAM_APP_KEY', '')
 
-    def search_food_multiple_sources(self, query: str, limit: int = 10) -> List[Dict]:
-        """Search across multiple food databases"""
-        results = []
+        # Per-source request timeouts and the budget for a whole fan-out search (seconds)
+        self.source_timeouts = {'FDC': 3.0, 'OpenFoodFacts': 4.0, 'Edamam': 3.0}
+        self.search_budget = float(os.getenv('FOOD_SEARCH_BUDGET', '5.0'))
+        self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='food-search')
 
-        # Search FoodData Central (USDA)
-        try:
-            fdc_results = self.search_fdc(query, limit//2)
-            results.extend(fdc_results)
-        except Exception as e:
-            print(f"FDC search error: {e}")
+        # Local copy of remote results; refreshed off the request path
+        self.store = food_store_module.food_store
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='food-refresh')
+        self._refresh_lock = threading.Lock()
+        self._refreshing = set()
 
-        # Search OpenFoodFacts
-        try:
-            off_results = self.search_openfoodfacts(query, limit//2)
-            results.extend(off_results)
-        except Exception as e:
-            print(f"OpenFoodFacts search error: {e}")
+        # Identical searches running at the same time share one execution
+        self._search_flight = SingleFlight()
 
+    def _remote_sources(self, limit: int) -> List[tuple]:
+        sources = [
+            ('FDC', self.search_fdc, limit//2),
+            ('OpenFoodFacts', self.search_openfoodfacts, limit//2),
+        ]
         # Search Edamam if credentials available
         if self.edamam_app_id and self.edamam_app_key:
+            sources.append(('Edamam', self.search_edamam, limit//3))
+        return sources
+
+    def _fan_out(self, query: str, limit: int, budget: float, only: Optional[List[str]] = None) -> Dict[str, List[Dict]]:
+        """Query remote sources in parallel; {source: results} for those that answered in time"""
+        sources = [source for source in self._remote_sources(limit) if only is None or source[0] in only]
+        futures = [
+            (name, self._executor.submit(search, query, source_limit,
+                                         timeout=min(self.source_timeouts[name], budget)))
+            for name, search, source_limit in sources
+        ]
+        wait([future for _, future in futures], timeout=budget)
+
+        # Keep the source order so results rank the same as before
+        answered = {}
+        for name, future in futures:
+            if not future.done():
+                future.cancel()
+                print(f"{name} search skipped: no answer within {budget:.1f}s")
+                continue
             try:
-                edamam_results = self.search_edamam(query, limit//3)
-                results.extend(edamam_results)
+                answered[name] = future.result()
             except Exception as e:
-                print(f"Edamam search error: {e}")
+                print(f"{name} search error: {e}")
+        return answered
+
+    def search_food_multiple_sources(self, query: str, limit: int = 10, budget: Optional[float] = None) -> List[Dict]:
+        """Search across multiple food databases in parallel.
+
+        Each source gets its own timeout and the whole search is capped at
+        `budget` seconds; sources that have not answered by then are left
+        out, so a slow source costs partial results rather than latency.
+        """
+        budget = self.search_budget if budget is None else budget
+        results = []
+        for foods in self._fan_out(query, limit, budget).values():
+            results.extend(foods)
+        return results[:limit]
 
+    def refresh_remote_results(self, query: str, limit: int = 10, sources: Optional[List[str]] = None) -> List[Dict]:
+        """Fetch `query` from upstream (optionally only some sources) into the local store"""
+        answered = self._fan_out(query, limit, self.search_budget, only=sources)
+        self.store.save(query, answered)
+        results = []
+        for foods in answered.values():
+            results.extend(foods)
         return results[:limit]
 
-    def search_fdc(self, query: str, limit: int = 5) -> List[Dict]:
+    def _refresh_in_background(self, query: str, limit: int, sources: List[str]):
+        key = food_store_module.normalize_query(query)
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.refresh_remote_results(query, limit, sources)
+            except Exception as e:
+                print(f"Background food refresh error: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_executor.submit(refresh)
+
+    def search_remote_databases(self, query: str, limit: int = 10) -> List[Dict]:
+        """Remote database results, answered from the local store first.
+
+        Stored results are returned immediately and refreshed in the
+        background once a source's TTL has passed, so repeat searches make
+        no upstream calls and searches keep working offline. Only a query
+        the store has never seen waits for upstream.
+        """
+        if not food_store_module.normalize_query(query):
+            return []
+
+        stored = self.store.search(query, limit)
+        stale = self.store.stale_sources(query, [name for name, _, _ in self._remote_sources(limit)])
+        if not stale:
+            return stored
+        if stored:
+            self._refresh_in_background(query, limit, stale)
+            return stored
+        return self.refresh_remote_results(query, limit, stale)
+
+    def search_fdc(self, query: str, limit: int = 5, timeout: float = 3.0) -> List[Dict]:
         """Search USDA FoodData Central"""
         url = f"{self.fdc_base_url}/foods/search"
         params = {
@@ -251,7 +396,8 @@ class FoodDatabaseService:
             'dataType': ['Foundation', 'SR Legacy']
         }
 
-        response = requests.get(url, params=params)
+        # No retries: the fan-out budget already bounds how long a search waits
+        response = http_client.get(url, 'fdc', params=params, timeout=timeout, retries=0)
         response.raise_for_status()
         data = response.json()
 
@@ -273,24 +419,26 @@ class FoodDatabaseService:
                     nutrients['fat'] = f"{value}g"
                 elif 'fiber' in name:
                     nutrients['fiber'] = f"{value}g"
+                elif 'sugars' in name:
+                    nutrients['sugar'] = f"{value}g"
+                elif 'sodium' in name:
+                    nutrients['sodium'] = f"{value} {unit}"
 
-            results.append({
+            results.append(normalize_food({
                 'name': food.get('description', ''),
                 'source': 'USDA FoodData Central',
                 'nutrients': nutrients,
                 'serving_size': '100g',
                 'brand': food.get('brandOwner', ''),
                 'category': food.get('foodCategory', '')
-            })
+            }))
 
         return results
 
-    def search_openfoodfacts(self, query: str, limit: int = 5) -> List[Dict]:
+    def search_openfoodfacts(self, query: str, limit: int = 5, timeout: float = 4.0) -> List[Dict]:
         """Search OpenFoodFacts database"""
-        url = f"{self.off_base_url}/product/{query}.json"
-
         # For search, use the search endpoint
-        search_url = "https://world.openfoodfacts.org/cgi/search.pl"
+        search_url = self.off_search_url
         params = {
             'search_terms': query,
             'search_simple': 1,
@@ -300,7 +448,7 @@ class FoodDatabaseService:
             'countries': 'United Kingdom'  # Prioritize UK products
         }
 
-        response = requests.get(search_url, params=params)
+        response = http_client.get(search_url, 'openfoodfacts', params=params, timeout=timeout, retries=0)
         response.raise_for_status()
         data = response.json()
 
@@ -320,21 +468,25 @@ class FoodDatabaseService:
                 nutrients['fat'] = f"{nutriments['fat_100g']}g"
             if 'fiber_100g' in nutriments:
                 nutrients['fiber'] = f"{nutriments['fiber_100g']}g"
+            if 'sugars_100g' in nutriments:
+                nutrients['sugar'] = f"{nutriments['sugars_100g']}g"
+            if 'sodium_100g' in nutriments:
+                nutrients['sodium'] = f"{nutriments['sodium_100g']}g"
 
-            results.append({
+            results.append(normalize_food({
                 'name': product.get('product_name', ''),
                 'source': 'OpenFoodFacts',
                 'nutrients': nutrients,
                 'serving_size': '100g',
                 'brand': product.get('brands', ''),
                 'category': product.get('categories_tags', [])
-            })
+            }))
 
         return results
 
-    def search_edamam(self, query: str, limit: int = 3) -> List[Dict]:
+    def search_edamam(self, query: str, limit: int = 3, timeout: float = 3.0) -> List[Dict]:
         """Search Edamam Food Database"""
-        url = "https://api.edamam.com/api/food-database/v2/parser"
+        url = self.edamam_url
         params = {
             'app_id': self.edamam_app_id,
             'app_key': self.edamam_app_key,
@@ -342,7 +494,7 @@ class FoodDatabaseService:
             'limit': limit
         }
 
-        response = requests.get(url, params=params)
+        response = http_client.get(url, 'edamam', params=params, timeout=timeout, retries=0)
         response.raise_for_status()
         data = response.json()
 
@@ -362,258 +514,51 @@ class FoodDatabaseService:
                 formatted_nutrients['fat'] = f"{nutrients['FAT']}g"
             if 'FIBTG' in nutrients:
                 formatted_nutrients['fiber'] = f"{nutrients['FIBTG']}g"
+            if 'SUGAR' in nutrients:
+                formatted_nutrients['sugar'] = f"{nutrients['SUGAR']}g"
+            if 'NA' in nutrients:
+                formatted_nutrients['sodium'] = f"{nutrients['NA']}mg"
 
-            results.append({
+            results.append(normalize_food({
                 'name': food.get('label', ''),
                 'source': 'Edamam',
                 'nutrients': formatted_nutrients,
                 'serving_size': '100g',
                 'brand': food.get('brand', ''),
                 'category': food.get('category', '')
-            })
+            }))
 
         return results
 
     def get_uk_specific_foods(self, query: str) -> List[Dict]:
         """Get UK-specific food items from major supermarkets"""
-        uk_foods = [
-            # Tesco Foods
-            {'name': 'Tesco Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Tesco'},
-            {'name': 'Tesco Finest Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Tesco'},
-            {'name': 'Tesco Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'Tesco'},
-            {'name': 'Tesco Greek Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'Tesco'},
-            {'name': 'Tesco Bananas', 'source': 'UK Retail', 'nutrients': {'calories': '89 kcal', 'protein': '1.1g', 'carbs': '23g', 'fat': '0.3g'}, 'serving_size': '100g', 'brand': 'Tesco'},
-            {'name': 'Tesco Porridge Oats', 'source': 'UK Retail', 'nutrients': {'calories': '379 kcal', 'protein': '11g', 'carbs': '60g', 'fat': '8g'}, 'serving_size': '100g', 'brand': 'Tesco'},
-            {'name': 'Tesco Semi-Skimmed Milk', 'source': 'UK Retail', 'nutrients': {'calories': '46 kcal', 'protein': '3.4g', 'carbs': '4.8g', 'fat': '1.7g'}, 'serving_size': '100ml', 'brand': 'Tesco'},
-            {'name': 'Tesco Large Eggs', 'source': 'UK Retail', 'nutrients': {'calories': '155 kcal', 'protein': '13g', 'carbs': '1.1g', 'fat': '11g'}, 'serving_size': '100g', 'brand': 'Tesco'},
-            {'name': 'Tesco Broccoli', 'source': 'UK Retail', 'nutrients': {'calories': '34 kcal', 'protein': '2.8g', 'carbs': '7g', 'fat': '0.4g'}, 'serving_size': '100g', 'brand': 'Tesco'},
-            {'name': 'Tesco Brown Rice', 'source': 'UK Retail', 'nutrients': {'calories': '111 kcal', 'protein': '2.6g', 'carbs': '23g', 'fat': '0.9g'}, 'serving_size': '100g', 'brand': 'Tesco'},
-
-            # Sainsbury's Foods
-            {'name': 'Sainsburys Taste the Difference Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
-            {'name': 'Sainsburys Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
-            {'name': 'Sainsburys Scottish Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
-            {'name': 'Sainsburys Greek Style Natural Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
-            {'name': 'Sainsburys Bananas', 'source': 'UK Retail', 'nutrients': {'calories': '89 kcal', 'protein': '1.1g', 'carbs': '23g', 'fat': '0.3g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
-            {'name': 'Sainsburys Porridge Oats', 'source': 'UK Retail', 'nutrients': {'calories': '379 kcal', 'protein': '11g', 'carbs': '60g', 'fat': '8g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
-            {'name': 'Sainsburys Semi Skimmed Milk', 'source': 'UK Retail', 'nutrients': {'calories': '46 kcal', 'protein': '3.4g', 'carbs': '4.8g', 'fat': '1.7g'}, 'serving_size': '100ml', 'brand': 'Sainsburys'},
-            {'name': 'Sainsburys Free Range Eggs', 'source': 'UK Retail', 'nutrients': {'calories': '155 kcal', 'protein': '13g', 'carbs': '1.1g', 'fat': '11g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
-            {'name': 'Sainsburys Broccoli', 'source': 'UK Retail', 'nutrients': {'calories': '34 kcal', 'protein': '2.8g', 'carbs': '7g', 'fat': '0.4g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
-            {'name': 'Sainsburys Brown Rice', 'source': 'UK Retail', 'nutrients': {'calories': '111 kcal', 'protein': '2.6g', 'carbs': '23g', 'fat': '0.9g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
-
-            # M&S Foods
-            {'name': 'M&S Select Farms Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'M&S'},
-            {'name': 'M&S Scottish Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'M&S'},
-            {'name': 'M&S Seeded Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '260 kcal', 'protein': '10g', 'carbs': '42g', 'fat': '6g'}, 'serving_size': '100g', 'brand': 'M&S'},
-            {'name': 'M&S Greek Style Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'M&S'},
-            {'name': 'M&S Organic Bananas', 'source': 'UK Retail', 'nutrients': {'calories': '89 kcal', 'protein': '1.1g', 'carbs': '23g', 'fat': '0.3g'}, 'serving_size': '100g', 'brand': 'M&S'},
-            {'name': 'M&S Scottish Porridge Oats', 'source': 'UK Retail', 'nutrients': {'calories': '379 kcal', 'protein': '11g', 'carbs': '60g', 'fat': '8g'}, 'serving_size': '100g', 'brand': 'M&S'},
-            {'name': 'M&S Organic Semi Skimmed Milk', 'source': 'UK Retail', 'nutrients': {'calories': '46 kcal', 'protein': '3.4g', 'carbs': '4.8g', 'fat': '1.7g'}, 'serving_size': '100ml', 'brand': 'M&S'},
-            {'name': 'M&S Free Range Eggs', 'source': 'UK Retail', 'nutrients': {'calories': '155 kcal', 'protein': '13g', 'carbs': '1.1g', 'fat': '11g'}, 'serving_size': '100g', 'brand': 'M&S'},
-
-            # ASDA Foods
-            {'name': 'ASDA Smart Price Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'ASDA'},
-            {'name': 'ASDA Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'ASDA'},
-            {'name': 'ASDA Atlantic Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'ASDA'},
-            {'name': 'ASDA Greek Style Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'ASDA'},
-            {'name': 'ASDA Bananas', 'source': 'UK Retail', 'nutrients': {'calories': '89 kcal', 'protein': '1.1g', 'carbs': '23g', 'fat': '0.3g'}, 'serving_size': '100g', 'brand': 'ASDA'},
-            {'name': 'ASDA Porridge Oats', 'source': 'UK Retail', 'nutrients': {'calories': '379 kcal', 'protein': '11g', 'carbs': '60g', 'fat': '8g'}, 'serving_size': '100g', 'brand': 'ASDA'},
-
-            # Morrisons Foods
-            {'name': 'Morrisons British Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Morrisons'},
-            {'name': 'Morrisons Malted Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'Morrisons'},
-            {'name': 'Morrisons Scottish Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Morrisons'},
-            {'name': 'Morrisons Greek Style Natural Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'Morrisons'},
-            {'name': 'Morrisons Bananas', 'source': 'UK Retail', 'nutrients': {'calories': '89 kcal', 'protein': '1.1g', 'carbs': '23g', 'fat': '0.3g'}, 'serving_size': '100g', 'brand': 'Morrisons'},
-
-            # Iceland Foods
-            {'name': 'Iceland Chicken Breast Fillets', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Iceland'},
-            {'name': 'Iceland Salmon Fillets', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Iceland'},
-            {'name': 'Iceland Frozen Mixed Vegetables', 'source': 'UK Retail', 'nutrients': {'calories': '42 kcal', 'protein': '2.6g', 'carbs': '8g', 'fat': '0.4g'}, 'serving_size': '100g', 'brand': 'Iceland'},
-
-            # Waitrose Foods
-            {'name': 'Waitrose Organic Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Waitrose'},
-            {'name': 'Waitrose Duchy Organic Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'Waitrose'},
-            {'name': 'Waitrose Wild Alaskan Salmon', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Waitrose'},
-            {'name': 'Waitrose Greek Style Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'Waitrose'},
-
-            # Co-op Foods
-            {'name': 'Co-op British Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Co-op'},
-            {'name': 'Co-op Seeded Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '260 kcal', 'protein': '10g', 'carbs': '42g', 'fat': '6g'}, 'serving_size': '100g', 'brand': 'Co-op'},
-            {'name': 'Co-op Scottish Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Co-op'},
-
-            # Aldi Foods
-            {'name': 'Aldi Never Any! Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Aldi'},
-            {'name': 'Aldi Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'Aldi'},
-            {'name': 'Aldi Fresh Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Aldi'},
-            {'name': 'Aldi Greek Style Yogurt', 'source': 'UK Retail', 'nutrients': {'calories': '133 kcal', 'protein': '10g', 'carbs': '4g', 'fat': '10g'}, 'serving_size': '100g', 'brand': 'Aldi'},
-
-            # Lidl Foods
-            {'name': 'Lidl Birchwood British Chicken Breast', 'source': 'UK Retail', 'nutrients': {'calories': '165 kcal', 'protein': '31g', 'carbs': '0g', 'fat': '3.6g'}, 'serving_size': '100g', 'brand': 'Lidl'},
-            {'name': 'Lidl Wholemeal Bread', 'source': 'UK Retail', 'nutrients': {'calories': '247 kcal', 'protein': '9g', 'carbs': '45g', 'fat': '4g'}, 'serving_size': '100g', 'brand': 'Lidl'},
-            {'name': 'Lidl Salmon Fillet', 'source': 'UK Retail', 'nutrients': {'calories': '208 kcal', 'protein': '25g', 'carbs': '0g', 'fat': '12g'}, 'serving_size': '100g', 'brand': 'Lidl'},
-
-            # Common UK Ready Meals & Convenience Foods
-            {'name': 'Tesco Chicken Tikka Masala', 'source': 'UK Retail', 'nutrients': {'calories': '145 kcal', 'protein': '12g', 'carbs': '8g', 'fat': '8g'}, 'serving_size': '100g', 'brand': 'Tesco'},
-            {'name': 'M&S Chicken & Vegetable Curry', 'source': 'UK Retail', 'nutrients': {'calories': '120 kcal', 'protein': '14g', 'carbs': '6g', 'fat': '5g'}, 'serving_size': '100g', 'brand': 'M&S'},
-            {'name': 'Sainsburys Lasagne', 'source': 'UK Retail', 'nutrients': {'calories': '155 kcal', 'protein': '9g', 'carbs': '15g', 'fat': '7g'}, 'serving_size': '100g', 'brand': 'Sainsburys'},
-            {'name': 'ASDA Fish & Chips', 'source': 'UK Retail', 'nutrients': {'calories': '220 kcal', 'protein': '12g', 'carbs': '25g', 'fat': '9g'}, 'serving_size': '100g', 'brand': 'ASDA'},
-
-            # UK Breakfast Items
-            {'name': 'Tesco Baked Beans', 'source': 'UK Retail', 'nutrients': {'calories': '81 kcal', 'protein': '5g', 'carbs': '15g', 'fat': '0.6g'}, 'serving_size': '100g', 'brand': 'Tesco'},
-            {'name': 'Warburtons Crumpets', 'source': 'UK Retail', 'nutrients': {'calories': '199 kcal', 'protein': '6g', 'carbs': '38g', 'fat': '2.4g'}, 'serving_size': '100g', 'brand': 'Warburtons'},
-            {'name': 'Kelloggs Cornflakes', 'source': 'UK Retail', 'nutrients': {'calories': '378 kcal', 'protein': '7g', 'carbs': '84g', 'fat': '0.9g'}, 'serving_size': '100g', 'brand': 'Kelloggs'},
-            {'name': 'Weetabix Original', 'source': 'UK Retail', 'nutrients': {'calories': '362 kcal', 'protein': '12g', 'carbs': '69g', 'fat': '2.2g'}, 'serving_size': '100g', 'brand': 'Weetabix'},
-
-            # UK Snacks & Treats
-            {'name': 'McVities Digestive Biscuits', 'source': 'UK Retail', 'nutrients': {'calories': '471 kcal', 'protein': '7g', 'carbs': '66g', 'fat': '20g'}, 'serving_size': '100g', 'brand': 'McVities'},
-            {'name': 'Walkers Ready Salted Crisps', 'source': 'UK Retail', 'nutrients': {'calories': '534 kcal', 'protein': '6g', 'carbs': '49g', 'fat': '35g'}, 'serving_size': '100g', 'brand': 'Walkers'},
-            {'name': 'Cadbury Dairy Milk Chocolate', 'source': 'UK Retail', 'nutrients': {'calories': '534 kcal', 'protein': '7.3g', 'carbs': '57g', 'fat': '30g'}, 'serving_size': '100g', 'brand': 'Cadbury'},
-
-            # UK Cheese & Dairy
-            {'name': 'Cathedral City Mature Cheddar', 'source': 'UK Retail', 'nutrients': {'calories': '416 kcal', 'protein': '25g', 'carbs': '0.1g', 'fat': '35g'}, 'serving_size': '100g', 'brand': 'Cathedral City'},
-            {'name': 'Philadelphia Cream Cheese', 'source': 'UK Retail', 'nutrients': {'calories': '255 kcal', 'protein': '5.8g', 'carbs': '4g', 'fat': '24g'}, 'serving_size': '100g', 'brand': 'Philadelphia'},
-            {'name': 'Yeo Valley Organic Butter', 'source': 'UK Retail', 'nutrients': {'calories': '737 kcal', 'protein': '0.9g', 'carbs': '0.6g', 'fat': '81g'}, 'serving_size': '100g', 'brand': 'Yeo Valley'},
-        ]
-
         # Filter based on query
         if not query or len(query) < 2:
-            return uk_foods[:20]  # Return first 20 if no query
+            return uk_retail_index.first(20)  # Return first 20 if no query
 
-        filtered_foods = [food for food in uk_foods
-                         if query.lower() in food['name'].lower() or
-                            query.lower() in food['brand'].lower()]
-
-        return filtered_foods[:15]  # Return max 15 results
+        # Typos ("chiken breast") get fuzzy matches before anything goes remote
+        results = uk_retail_index.search(query, 15)
+        return results or uk_retail_fuzzy.search(query, 15)  # Return max 15 results
 
     def get_uk_restaurant_foods(self, query: str) -> List[Dict]:
         """Get UK restaurant and delivery foods"""
-        restaurant_foods = [
-            # McDonalds UK
-            {'name': 'McDonalds Big Mac', 'source': 'UK Restaurant', 'calories_per_100g': 257, 'nutrients': {'calories': '503 kcal', 'protein': '25g', 'carbs': '44g', 'fat': '26g'}, 'serving_size': '1 burger', 'brand': 'McDonalds'},
-            {'name': 'Big Mac', 'source': 'UK Restaurant', 'calories_per_100g': 257, 'nutrients': {'calories': '503 kcal', 'protein': '25g', 'carbs': '44g', 'fat': '26g'}, 'serving_size': '1 burger', 'brand': 'McDonalds'},
-            {'name': 'McDonalds Chicken McNuggets (6)', 'source': 'UK Restaurant', 'nutrients': {'calories': '259 kcal', 'protein': '15g', 'carbs': '16g', 'fat': '15g'}, 'serving_size': '6 nuggets', 'brand': 'McDonalds'},
-            {'name': 'McDonalds Fries (Medium)', 'source': 'UK Restaurant', 'nutrients': {'calories': '337 kcal', 'protein': '3.4g', 'carbs': '41g', 'fat': '17g'}, 'serving_size': '1 portion', 'brand': 'McDonalds'},
-            {'name': 'McDonalds Quarter Pounder with Cheese', 'source': 'UK Restaurant', 'nutrients': {'calories': '529 kcal', 'protein': '30g', 'carbs': '41g', 'fat': '31g'}, 'serving_size': '1 burger', 'brand': 'McDonalds'},
-            {'name': 'McDonalds Filet-O-Fish', 'source': 'UK Restaurant', 'nutrients': {'calories': '329 kcal', 'protein': '17g', 'carbs': '33g', 'fat': '13g'}, 'serving_size': '1 burger', 'brand': 'McDonalds'},
-
-            # KFC UK
-            {'name': 'KFC Original Recipe Chicken (1 piece)', 'source': 'UK Restaurant', 'nutrients': {'calories': '237 kcal', 'protein': '21g', 'carbs': '7.4g', 'fat': '13g'}, 'serving_size': '1 piece', 'brand': 'KFC'},
-            {'name': 'KFC Zinger Burger', 'source': 'UK Restaurant', 'nutrients': {'calories': '450 kcal', 'protein': '27g', 'carbs': '44g', 'fat': '19g'}, 'serving_size': '1 burger', 'brand': 'KFC'},
-            {'name': 'KFC Fries (Regular)', 'source': 'UK Restaurant', 'nutrients': {'calories': '284 kcal', 'protein': '3.4g', 'carbs': '34g', 'fat': '14g'}, 'serving_size': '1 portion', 'brand': 'KFC'},
-            {'name': 'KFC Popcorn Chicken (Regular)', 'source': 'UK Restaurant', 'nutrients': {'calories': '285 kcal', 'protein': '16g', 'carbs': '21g', 'fat': '16g'}, 'serving_size': '1 portion', 'brand': 'KFC'},
-
-            # Pizza Hut UK
-            {'name': 'Pizza Hut Margherita Pizza (Slice)', 'source': 'UK Restaurant', 'nutrients': {'calories': '220 kcal', 'protein': '9g', 'carbs': '25g', 'fat': '9g'}, 'serving_size': '1 slice', 'brand': 'Pizza Hut'},
-            {'name': 'Pizza Hut Pepperoni Feast (Slice)', 'source': 'UK Restaurant', 'nutrients': {'calories': '280 kcal', 'protein': '12g', 'carbs': '28g', 'fat': '14g'}, 'serving_size': '1 slice', 'brand': 'Pizza Hut'},
-            {'name': 'Pizza Hut Garlic Bread', 'source': 'UK Restaurant', 'nutrients': {'calories': '180 kcal', 'protein': '4g', 'carbs': '25g', 'fat': '7g'}, 'serving_size': '1 slice', 'brand': 'Pizza Hut'},
-
-            # Subway UK
-            {'name': 'Subway Italian B.M.T. (6 inch)', 'source': 'UK Restaurant', 'nutrients': {'calories': '380 kcal', 'protein': '19g', 'carbs': '44g', 'fat': '14g'}, 'serving_size': '1 sub', 'brand': 'Subway'},
-            {'name': 'Subway Chicken Teriyaki (6 inch)', 'source': 'UK Restaurant', 'nutrients': {'calories': '370 kcal', 'protein': '25g', 'carbs': '48g', 'fat': '8g'}, 'serving_size': '1 sub', 'brand': 'Subway'},
-            {'name': 'Subway Veggie Delite (6 inch)', 'source': 'UK Restaurant', 'nutrients': {'calories': '230 kcal', 'protein': '9g', 'carbs': '37g', 'fat': '3g'}, 'serving_size': '1 sub', 'brand': 'Subway'},
-
-            # Nandos UK
-            {'name': 'Nandos 1/4 Chicken', 'source': 'UK Restaurant', 'nutrients': {'calories': '327 kcal', 'protein': '42g', 'carbs': '0g', 'fat': '17g'}, 'serving_size': '1 portion', 'brand': 'Nandos'},
-            {'name': 'Nandos Peri-Peri Fries (Regular)', 'source': 'UK Restaurant', 'nutrients': {'calories': '441 kcal', 'protein': '4.4g', 'carbs': '54g', 'fat': '22g'}, 'serving_size': '1 portion', 'brand': 'Nandos'},
-            {'name': 'Nandos Spicy Rice', 'source': 'UK Restaurant', 'nutrients': {'calories': '369 kcal', 'protein': '7.3g', 'carbs': '67g', 'fat': '7.3g'}, 'serving_size': '1 portion', 'brand': 'Nandos'},
-
-            # Burger King UK
-            {'name': 'Burger King Whopper', 'source': 'UK Restaurant', 'nutrients': {'calories': '677 kcal', 'protein': '29g', 'carbs': '49g', 'fat': '41g'}, 'serving_size': '1 burger', 'brand': 'Burger King'},
-            {'name': 'Burger King Chicken Royale', 'source': 'UK Restaurant', 'nutrients': {'calories': '623 kcal', 'protein': '23g', 'carbs': '55g', 'fat': '34g'}, 'serving_size': '1 burger', 'brand': 'Burger King'},
-            {'name': 'Burger King Fries (Medium)', 'source': 'UK Restaurant', 'nutrients': {'calories': '354 kcal', 'protein': '4g', 'carbs': '45g', 'fat': '17g'}, 'serving_size': '1 portion', 'brand': 'Burger King'},
-
-            # Dominos Pizza UK
-            {'name': 'Dominos Margherita Pizza (Slice)', 'source': 'UK Restaurant', 'nutrients': {'calories': '210 kcal', 'protein': '8g', 'carbs': '24g', 'fat': '8g'}, 'serving_size': '1 slice', 'brand': 'Dominos'},
-            {'name': 'Dominos Pepperoni Passion (Slice)', 'source': 'UK Restaurant', 'nutrients': {'calories': '270 kcal', 'protein': '11g', 'carbs': '27g', 'fat': '13g'}, 'serving_size': '1 slice', 'brand': 'Dominos'},
-            {'name': 'Dominos Garlic Pizza Bread', 'source': 'UK Restaurant', 'nutrients': {'calories': '170 kcal', 'protein': '3g', 'carbs': '23g', 'fat': '7g'}, 'serving_size': '1 slice', 'brand': 'Dominos'},
-
-            # Just Eat / Deliveroo - Generic (Needs Specifics)
-            {'name': 'Just Eat - Generic Takeaway Meal', 'source': 'UK Delivery', 'nutrients': {'calories': '800 kcal', 'protein': '30g', 'carbs': '80g', 'fat': '40g'}, 'serving_size': '1 meal', 'brand': 'Just Eat'},
-            {'name': 'Deliveroo - Generic Restaurant Meal', 'source': 'UK Delivery', 'nutrients': {'calories': '750 kcal', 'protein': '25g', 'carbs': '70g', 'fat': '40g'}, 'serving_size': '1 meal', 'brand': 'Deliveroo'},
-
-            # Greggs UK
-            {'name': 'Greggs Sausage Roll', 'source': 'UK Retail', 'nutrients': {'calories': '329 kcal', 'protein': '9.7g', 'carbs': '27g', 'fat': '20g'}, 'serving_size': '1 roll', 'brand': 'Greggs'},
-            {'name': 'Greggs Steak Bake', 'source': 'UK Retail', 'nutrients': {'calories': '411 kcal', 'protein': '14g', 'carbs': '37g', 'fat': '22g'}, 'serving_size': '1 bake', 'brand': 'Greggs'},
-            {'name': 'Greggs Vegan Sausage Roll', 'source': 'UK Retail', 'nutrients': {'calories': '311 kcal', 'protein': '7.7g', 'carbs': '24g', 'fat': '20g'}, 'serving_size': '1 roll', 'brand': 'Greggs'},
-
-             # Local Indian Takeaway - Generic
-            {'name': 'Chicken Tikka Masala (Takeaway)', 'source': 'UK Takeaway', 'nutrients': {'calories': '750 kcal', 'protein': '40g', 'carbs': '60g', 'fat': '40g'}, 'serving_size': '1 portion', 'brand': 'Local Indian'},
-            {'name': 'Lamb Biryani (Takeaway)', 'source': 'UK Takeaway', 'nutrients': {'calories': '850 kcal', 'protein': '35g', 'carbs': '90g', 'fat': '40g'}, 'serving_size': '1 portion', 'brand': 'Local Indian'},
-            {'name': 'Vegetable Samosa (Takeaway)', 'source': 'UK Takeaway', 'nutrients': {'calories': '250 kcal', 'protein': '5g', 'carbs': '30g', 'fat': '12g'}, 'serving_size': '1 piece', 'brand': 'Local Indian'},
-
-            # Local Chinese Takeaway - Generic
-            {'name': 'Sweet and Sour Chicken (Takeaway)', 'source': 'UK Takeaway', 'nutrients': {'calories': '650 kcal', 'protein': '30g', 'carbs': '70g', 'fat': '25g'}, 'serving_size': '1 portion', 'brand': 'Local Chinese'},
-            {'name': 'Egg Fried Rice (Takeaway)', 'source': 'UK Takeaway', 'nutrients': {'calories': '400 kcal', 'protein': '10g', 'carbs': '50g', 'fat': '15g'}, 'serving_size': '1 portion', 'brand': 'Local Chinese'},
-            {'name': 'Spring Rolls (Takeaway)', 'source': 'UK Takeaway', 'nutrients': {'calories': '200 kcal', 'protein': '3g', 'carbs': '20g', 'fat': '10g'}, 'serving_size': '1 piece', 'brand': 'Local Chinese'},
-
-            # Local Fish and Chips Shop - Generic
-            {'name': 'Fish and Chips (Takeaway)', 'source': 'UK Takeaway', 'calories_per_100g': 200, 'nutrients': {'calories': '800 kcal', 'protein': '30g', 'carbs': '70g', 'fat': '50g'}, 'serving_size': '1 portion', 'brand': 'Local Chippy'},
-            {'name': 'Sausage and Chips (Takeaway)', 'source': 'UK Takeaway', 'calories_per_100g': 175, 'nutrients': {'calories': '700 kcal', 'protein': '25g', 'carbs': '60g', 'fat': '40g'}, 'serving_size': '1 portion', 'brand': 'Local Chippy'},
-            {'name': 'Battered Sausage (Takeaway)', 'source': 'UK Takeaway', 'calories_per_100g': 267, 'nutrients': {'calories': '400 kcal', 'protein': '15g', 'carbs': '30g', 'fat': '25g'}, 'serving_size': '1 piece', 'brand': 'Local Chippy'},
-
-            # More Popular Branded Foods
-            # Coca-Cola Products
-            {'name': 'Coca Cola', 'source': 'UK Retail', 'calories_per_100g': 42, 'nutrients': {'calories': '42 kcal', 'protein': '0g', 'carbs': '10.6g', 'fat': '0g'}, 'serving_size': '100ml', 'brand': 'Coca-Cola'},
-            {'name': 'Diet Coke', 'source': 'UK Retail', 'calories_per_100g': 0, 'nutrients': {'calories': '0 kcal', 'protein': '0g', 'carbs': '0g', 'fat': '0g'}, 'serving_size': '100ml', 'brand': 'Coca-Cola'},
-            {'name': 'Sprite', 'source': 'UK Retail', 'calories_per_100g': 37, 'nutrients': {'calories': '37 kcal', 'protein': '0g', 'carbs': '9g', 'fat': '0g'}, 'serving_size': '100ml', 'brand': 'Coca-Cola'},
-
-            # Nestle Products
-            {'name': 'Kit Kat', 'source': 'UK Retail', 'calories_per_100g': 518, 'nutrients': {'calories': '518 kcal', 'protein': '8g', 'carbs': '57g', 'fat': '28g'}, 'serving_size': '100g', 'brand': 'Nestle'},
-            {'name': 'Smarties', 'source': 'UK Retail', 'calories_per_100g': 468, 'nutrients': {'calories': '468 kcal', 'protein': '4.5g', 'carbs': '73g', 'fat': '17g'}, 'serving_size': '100g', 'brand': 'Nestle'},
-            {'name': 'Aero Chocolate', 'source': 'UK Retail', 'calories_per_100g': 535, 'nutrients': {'calories': '535 kcal', 'protein': '6.9g', 'carbs': '56g', 'fat': '32g'}, 'serving_size': '100g', 'brand': 'Nestle'},
-
-            # Unilever Products
-            {'name': 'Ben & Jerrys Cookie Dough', 'source': 'UK Retail', 'calories_per_100g': 270, 'nutrients': {'calories': '270 kcal', 'protein': '4g', 'carbs': '28g', 'fat': '16g'}, 'serving_size': '100g', 'brand': 'Ben & Jerrys'},
-            {'name': 'Magnum Classic', 'source': 'UK Retail', 'calories_per_100g': 310, 'nutrients': {'calories': '310 kcal', 'protein': '4.3g', 'carbs': '26g', 'fat': '21g'}, 'serving_size': '100g', 'brand': 'Magnum'},
-
-            # Mars Products
-            {'name': 'Mars Bar', 'source': 'UK Retail', 'calories_per_100g': 449, 'nutrients': {'calories': '449 kcal', 'protein': '4.6g', 'carbs': '68g', 'fat': '17g'}, 'serving_size': '100g', 'brand': 'Mars'},
-            {'name': 'Snickers', 'source': 'UK Retail', 'calories_per_100g': 488, 'nutrients': {'calories': '488 kcal', 'protein': '8.2g', 'carbs': '56g', 'fat': '25g'}, 'serving_size': '100g', 'brand': 'Mars'},
-            {'name': 'Twix', 'source': 'UK Retail', 'calories_per_100g': 502, 'nutrients': {'calories': '502 kcal', 'protein': '5.2g', 'carbs': '62g', 'fat': '25g'}, 'serving_size': '100g', 'brand': 'Mars'},
-
-            # Kelloggs Products
-            {'name': 'Kelloggs Special K', 'source': 'UK Retail', 'calories_per_100g': 378, 'nutrients': {'calories': '378 kcal', 'protein': '17g', 'carbs': '67g', 'fat': '1.5g'}, 'serving_size': '100g', 'brand': 'Kelloggs'},
-            {'name': 'Kelloggs Crunchy Nut', 'source': 'UK Retail', 'calories_per_100g': 407, 'nutrients': {'calories': '407 kcal', 'protein': '7g', 'carbs': '77g', 'fat': '8g'}, 'serving_size': '100g', 'brand': 'Kelloggs'},
-            {'name': 'Kelloggs Frosties', 'source': 'UK Retail', 'calories_per_100g': 375, 'nutrients': {'calories': '375 kcal', 'protein': '4.5g', 'carbs': '87g', 'fat': '0.6g'}, 'serving_size': '100g', 'brand': 'Kelloggs'},
-
-            # Pepsico Products
-            {'name': 'Pepsi Cola', 'source': 'UK Retail', 'calories_per_100g': 43, 'nutrients': {'calories': '43 kcal', 'protein': '0g', 'carbs': '11g', 'fat': '0g'}, 'serving_size': '100ml', 'brand': 'Pepsi'},
-            {'name': 'Walkers Cheese & Onion', 'source': 'UK Retail', 'calories_per_100g': 534, 'nutrients': {'calories': '534 kcal', 'protein': '6g', 'carbs': '49g', 'fat': '35g'}, 'serving_size': '100g', 'brand': 'Walkers'},
-            {'name': 'Doritos Tangy Cheese', 'source': 'UK Retail', 'calories_per_100g': 498, 'nutrients': {'calories': '498 kcal', 'protein': '7g', 'carbs': '58g', 'fat': '26g'}, 'serving_size': '100g', 'brand': 'Doritos'},
-
-            # Heinz Products
-            {'name': 'Heinz Baked Beans', 'source': 'UK Retail', 'calories_per_100g': 81, 'nutrients': {'calories': '81 kcal', 'protein': '5g', 'carbs': '15g', 'fat': '0.6g'}, 'serving_size': '100g', 'brand': 'Heinz'},
-            {'name': 'Heinz Tomato Ketchup', 'source': 'UK Retail', 'calories_per_100g': 101, 'nutrients': {'calories': '101 kcal', 'protein': '1.1g', 'carbs': '24g', 'fat': '0.1g'}, 'serving_size': '100g', 'brand': 'Heinz'},
-
-            # Mondelez Products
-            {'name': 'Oreo Cookies', 'source': 'UK Retail', 'calories_per_100g': 480, 'nutrients': {'calories': '480 kcal', 'protein': '5g', 'carbs': '70g', 'fat': '20g'}, 'serving_size': '100g', 'brand': 'Oreo'},
-            {'name': 'Toblerone', 'source': 'UK Retail', 'calories_per_100g': 534, 'nutrients': {'calories': '534 kcal', 'protein': '8.8g', 'carbs': '62g', 'fat': '28g'}, 'serving_size': '100g', 'brand': 'Toblerone'},
-
-            # General Mills
-            {'name': 'Haagen Dazs Vanilla', 'source': 'UK Retail', 'calories_per_100g': 244, 'nutrients': {'calories': '244 kcal', 'protein': '4.5g', 'carbs': '21g', 'fat': '16g'}, 'serving_size': '100g', 'brand': 'Haagen-Dazs'},
-
-            # UK Specific Brands
-            {'name': 'Yorkshire Tea', 'source': 'UK Retail', 'calories_per_100g': 1, 'nutrients': {'calories': '1 kcal', 'protein': '0g', 'carbs': '0.3g', 'fat': '0g'}, 'serving_size': '100ml', 'brand': 'Yorkshire Tea'},
-            {'name': 'Hovis Wholemeal Bread', 'source': 'UK Retail', 'calories_per_100g': 219, 'nutrients': {'calories': '219 kcal', 'protein': '9g', 'carbs': '36g', 'fat': '3g'}, 'serving_size': '100g', 'brand': 'Hovis'},
-            {'name': 'Bisto Gravy', 'source': 'UK Retail', 'calories_per_100g': 363, 'nutrients': {'calories': '363 kcal', 'protein': '2.5g', 'carbs': '79g', 'fat': '5.5g'}, 'serving_size': '100g', 'brand': 'Bisto'},
-        ]
-
         # Filter based on query
         if not query or len(query) < 2:
-            return restaurant_foods[:20]  # Return first 20 if no query
+            return uk_restaurant_index.first(20)  # Return first 20 if no query
 
-        filtered_foods = [food for food in restaurant_foods
-                         if query.lower() in food['name'].lower() or
-                            query.lower() in food['brand'].lower()]
+        # Typos ("chiken breast") get fuzzy matches before anything goes remote
+        results = uk_restaurant_index.search(query, 15)
+        return results or uk_restaurant_fuzzy.search(query, 15)  # Return max 15 results
 
-        return filtered_foods[:15]  # Return max 15 results
+    def autocomplete(self, query: str, limit: int = 10) -> List[Dict]:
+        """Typo-tolerant, ranked matches from the local catalogs (no remote calls)"""
+        if not query or len(query) < 2:
+            return []
+        return autocomplete(query, limit)
 
     def analyze_food_with_ai(self, food_name: str, context: str = "") -> Dict:
         """Use OpenAI to analyze food choices"""
         try:
-            import openai
-
             prompt = f"""
             Analyze this food choice for someone on a fat loss journey:
 
@@ -629,14 +574,14 @@ class FoodDatabaseService:
             Keep response under 100 words, supportive tone.
             """
 
-            response = openai.ChatCompletion.create(
+            analysis = ai_cache.chat_completion(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=150
             )
 
             return {
-                'analysis': response.choices[0].message.content,
+                'analysis': analysis,
                 'food': food_name,
                 'timestamp': json.dumps({"timestamp": "now"})
             }
@@ -649,7 +594,23 @@ class FoodDatabaseService:
             }
 
     def search_all_databases(self, query: str, limit_per_db: int = 5) -> List[Dict]:
-        """Search all available databases and combine results"""
+        """Search all available databases, dedupe across them and rank the combined results.
+
+        Concurrent calls for the same normalized query wait for the one
+        already running and get copies of its results.
+        """
+        key = (food_store_module.normalize_query(query), limit_per_db)
+        foods = self._search_flight.do(key, self._search_all_databases, query, limit_per_db)
+        return [dict(food) for food in foods]
+
+    def coalescing_stats(self) -> Dict[str, Dict]:
+        """Upstream-bound calls made and calls that joined one already in flight"""
+        return {
+            'search_all_databases': dict(self._search_flight.stats),
+            'analyze_packaged_food': dict(label_flight.stats)
+        }
+
+    def _search_all_databases(self, query: str, limit_per_db: int) -> List[Dict]:
         all_foods = []
 
         # Search restaurant and delivery foods first (most relevant for takeaways)
@@ -660,11 +621,13 @@ class FoodDatabaseService:
         uk_foods = self.get_uk_specific_foods(query)
         all_foods.extend(uk_foods[:limit_per_db])
 
-        # Search multiple databases
-        fdc_results = self.search_food_multiple_sources(query, limit_per_db)
-        all_foods.extend(fdc_results)
+        # Search multiple databases (via the local food store)
+        remote_results = self.search_remote_databases(query, limit_per_db)
+        all_foods.extend(remote_results)
 
-        return all_foods[:20]  # Return top 20 results
+        # The same item often comes back from several sources ("McDonalds
+        # Big Mac" and "Big Mac"); keep the best record of each
+        return merge_results(query, all_foods, 20)  # Return top 20 results
 
 # Initialize the service
 food_db = FoodDatabaseService()
\ No newline at end of file
@@ -0,0 +1,194 @@
+"""
+Fuzzy Food Search
+Typo-tolerant trigram search over the local food catalogs, ranked with
+BM25 and cheap enough to run on every keystroke, plus the merge stage that
+dedupes and ranks results gathered from several sources
+"""
+
+import heapq
+import math
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from food_catalog import UK_RESTAURANT_FOODS, UK_RETAIL_FOODS, tokenize
+
+def trigrams(text: str) -> Counter:
+    """Padded character trigrams per word ("chicken" -> "  c", " ch", ... "en ")"""
+    grams = Counter()
+    for token in tokenize(text):
+        padded = f'  {token} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class FuzzySearchEngine:
+    """Immutable trigram index with BM25 scoring and brand boosting"""
+
+    def __init__(self, foods: Iterable[Dict], brand_boost: float = 1.5,
+                 min_coverage: float = 0.5, k1: float = 1.2, b: float = 0.75):
+        self.foods = tuple(foods)
+        self.min_coverage = min_coverage
+
+        postings = defaultdict(list)
+        lengths = []
+        for doc_id, food in enumerate(self.foods):
+            name_grams = trigrams(food['name'])
+            brand_grams = trigrams(food.get('brand') or '')
+            weighted = Counter(name_grams)
+            for gram, count in brand_grams.items():
+                # Brand matches ("tesco", "greggs") count for more than name matches
+                weighted[gram] += brand_boost * count
+            for gram, weight in weighted.items():
+                postings[gram].append((doc_id, weight))
+            lengths.append(sum(name_grams.values()) + sum(brand_grams.values()))
+
+        count = len(self.foods)
+        average = (sum(lengths) / count) if count else 1.0
+        # Per-document part of the BM25 denominator, precomputed once
+        self._norms = tuple(k1 * (1 - b + b * length / average) for length in lengths)
+        self._k1 = k1
+        # Trigrams found in a large share of documents ("ken", " ch") never
+        # nominate candidates on their own; they are looked up per candidate
+        self._dense_threshold = max(256, count // 20)
+        self._postings = {}
+        for gram, docs in postings.items():
+            idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            dense = len(docs) > self._dense_threshold
+            self._postings[gram] = (idf, dict(docs) if dense else tuple(docs))
+
+    def search_scored(self, query: str, limit: int = 10) -> List[Tuple[float, Dict]]:
+        """(score, food) pairs for the best `limit` matches, best first"""
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        scores = defaultdict(float)
+        matched = defaultdict(int)
+        k1 = self._k1
+        norms = self._norms
+
+        entries = [self._postings[gram] for gram in grams if gram in self._postings]
+        sparse = [(idf, docs) for idf, docs in entries if isinstance(docs, tuple)]
+        dense = sorted(((idf, docs) for idf, docs in entries if isinstance(docs, dict)),
+                       key=lambda entry: len(entry[1]))
+        if not sparse and dense:
+            # Only common trigrams: let the rarest of them nominate candidates
+            idf, docs = dense.pop(0)
+            sparse = [(idf, tuple(docs.items()))]
+
+        for idf, docs in sparse:
+            for doc_id, tf in docs:
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norms[doc_id])
+                matched[doc_id] += 1
+        for idf, docs in dense:
+            for doc_id in scores:
+                tf = docs.get(doc_id)
+                if tf is not None:
+                    scores[doc_id] += idf * tf * (k1 + 1) / (tf + norms[doc_id])
+                    matched[doc_id] += 1
+
+        # Drop documents sharing only a stray trigram or two with the query
+        needed = max(1, math.ceil(len(grams) * self.min_coverage))
+        candidates = ((score, -doc_id) for doc_id, score in scores.items() if matched[doc_id] >= needed)
+        best = heapq.nlargest(limit, candidates)
+        return [(score, dict(self.foods[-negative_id])) for score, negative_id in best]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        return [food for _, food in self.search_scored(query, limit)]
+
+uk_retail_fuzzy = FuzzySearchEngine(UK_RETAIL_FOODS)
+uk_restaurant_fuzzy = FuzzySearchEngine(UK_RESTAURANT_FOODS)
+
+def autocomplete(query: str, limit: int = 10) -> List[Dict]:
+    """Best fuzzy matches across both UK catalogs"""
+    scored = uk_restaurant_fuzzy.search_scored(query, limit) + uk_retail_fuzzy.search_scored(query, limit)
+    return [food for _, food in heapq.nlargest(limit, scored, key=lambda pair: pair[0])]
+
+# Curated catalogs first, then the sources with the most complete records
+SOURCE_QUALITY = {
+    'UK Restaurant': 0.2,
+    'UK Retail': 0.2,
+    'USDA FoodData Central': 0.15,
+    'OpenFoodFacts': 0.1,
+    'Edamam': 0.1,
+}
+
+def normalize_brand(brand) -> str:
+    """'Tesco, Tesco Finest' -> 'tesco'; "McDonald's" -> 'mcdonalds'"""
+    return ' '.join(tokenize(str(brand or '').split(',')[0]))
+
+def normalize_name(name: str, brand: str = '') -> str:
+    """Name tokens without the brand's, so 'McDonalds Big Mac' == 'Big Mac'"""
+    brand_tokens = set(brand.split())
+    tokens = [token for token in tokenize(name) if token not in brand_tokens]
+    return ' '.join(tokens) or ' '.join(tokenize(name))
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def _dice(a: set, b: set) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+def _calories(food: Dict) -> Optional[float]:
+    value = food.get('calories_per_100g')
+    return float(value) if isinstance(value, (int, float)) and value > 0 else None
+
+def record_quality(food: Dict) -> float:
+    """0-1.2: share of macros present, known serving weight, source"""
+    macros = sum(1 for key in ('calories_per_100g', 'protein_per_100g', 'carbs_per_100g', 'fat_per_100g')
+                 if isinstance(food.get(key), (int, float)) and food[key] > 0)
+    return (0.75 * macros / 4 + (0.25 if food.get('serving_grams') else 0.0)
+            + SOURCE_QUALITY.get(food.get('source'), 0.0))
+
+class _Candidate:
+    __slots__ = ('food', 'brand', 'grams', 'calories', 'coverage', 'relevance', 'quality')
+
+    def __init__(self, food: Dict, query_grams: set):
+        self.food = food
+        self.brand = normalize_brand(food.get('brand'))
+        name = food.get('name') or ''
+        self.grams = set(trigrams(normalize_name(name, self.brand)))
+        self.calories = _calories(food)
+        # Share of the query found in the name or brand, then closeness to the name
+        labelled = set(trigrams(f"{name} {food.get('brand') or ''}"))
+        self.coverage = len(query_grams & labelled) / len(query_grams) if query_grams else 1.0
+        self.relevance = self.coverage + 0.5 * _dice(query_grams, set(trigrams(name)))
+        self.quality = record_quality(food)
+
+    def duplicates(self, other: '_Candidate', threshold: float) -> bool:
+        if self.brand != other.brand or _jaccard(self.grams, other.grams) < threshold:
+            return False
+        # Same name but clearly different nutrition (e.g. a diet variant) stays apart
+        if self.calories and other.calories:
+            return abs(self.calories - other.calories) <= 0.2 * max(self.calories, other.calories)
+        return True
+
+def merge_results(query: str, foods: Iterable[Dict], limit: int = 20,
+                  threshold: float = 0.75, min_coverage: float = 0.3) -> List[Dict]:
+    """Dedupe foods gathered from several sources and rank them together.
+
+    Near-duplicates (same normalized brand, similar normalized name,
+    compatible calories) form a cluster represented by its most complete
+    record. Clusters are ranked by their best match for the query, with
+    record quality as a small tiebreaker; foods sharing less than
+    `min_coverage` of the query's trigrams are dropped.
+    """
+    query_grams = set(trigrams(query))
+    clusters = []  # [representative, best relevance]
+    for food in foods:
+        if not food.get('name'):
+            continue
+        candidate = _Candidate(food, query_grams)
+        if candidate.coverage < min_coverage:
+            continue
+        for cluster in clusters:
+            if cluster[0].duplicates(candidate, threshold):
+                if candidate.quality > cluster[0].quality:
+                    cluster[0] = candidate
+                cluster[1] = max(cluster[1], candidate.relevance)
+                break
+        else:
+            clusters.append([candidate, candidate.relevance])
+
+    # Stable sort keeps the caller's source order among equal scores
+    clusters.sort(key=lambda cluster: cluster[1] + 0.1 * cluster[0].quality, reverse=True)
+    return [cluster[0].food for cluster in clusters[:limit]]
@@ -0,0 +1,211 @@
+"""
+Local Food Store
+SQLite FTS5 store of foods fetched from the remote databases, so repeat
+and offline searches are answered locally and upstream is only asked
+again once a source's TTL has passed
+"""
+
+import json
+import os
+import time
+from typing import Dict, Iterable, List
+
+from db_pool import get_pool
+from food_catalog import tokenize
+
+FOOD_STORE_PATH = os.getenv('FOOD_STORE_PATH', 'food_store.db')
+
+# How long a query's results from each source are trusted before refreshing.
+# Edamam's free tier allows 100 requests/month, so it is asked least often.
+SOURCE_TTLS = {
+    'FDC': 30 * 24 * 3600,
+    'OpenFoodFacts': 7 * 24 * 3600,
+    'Edamam': 60 * 24 * 3600,
+}
+DEFAULT_TTL = 7 * 24 * 3600
+
+# Sources that can be bulk-imported: the `source` their food records carry
+# and the data types their upstream search covers (search_fdc asks for
+# Foundation and SR Legacy). Finished imports stand in for the upstream
+# search only once they cover every one of those types.
+BULK_SOURCES = {
+    'FDC': ('USDA FoodData Central', frozenset({'foundation_food', 'sr_legacy_food'})),
+}
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS foods (
+        id INTEGER PRIMARY KEY,
+        source TEXT NOT NULL,
+        name TEXT NOT NULL,
+        brand TEXT NOT NULL DEFAULT '',
+        data TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        imported INTEGER NOT NULL DEFAULT 0,
+        UNIQUE (source, name, brand)
+    )''',
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS foods_fts USING fts5(
+        name, brand, content='foods', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )''',
+    # Keep the external-content FTS index in step with foods
+    '''CREATE TRIGGER IF NOT EXISTS foods_ai AFTER INSERT ON foods BEGIN
+        INSERT INTO foods_fts (rowid, name, brand) VALUES (new.id, new.name, new.brand);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS foods_ad AFTER DELETE ON foods BEGIN
+        INSERT INTO foods_fts (foods_fts, rowid, name, brand) VALUES ('delete', old.id, old.name, old.brand);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS foods_au AFTER UPDATE OF name, brand ON foods BEGIN
+        INSERT INTO foods_fts (foods_fts, rowid, name, brand) VALUES ('delete', old.id, old.name, old.brand);
+        INSERT INTO foods_fts (rowid, name, brand) VALUES (new.id, new.name, new.brand);
+    END''',
+    # When each source was last asked about a normalized query
+    '''CREATE TABLE IF NOT EXISTS food_queries (
+        query TEXT NOT NULL,
+        source TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        PRIMARY KEY (query, source)
+    )''',
+    # Resumable bulk dataset imports (see fdc_import.py), with the
+    # comma-separated data types each one contained
+    '''CREATE TABLE IF NOT EXISTS bulk_imports (
+        path TEXT PRIMARY KEY,
+        source TEXT NOT NULL,
+        phase TEXT NOT NULL,
+        position INTEGER NOT NULL DEFAULT 0,
+        rows INTEGER NOT NULL DEFAULT 0,
+        started_at REAL NOT NULL,
+        finished_at REAL,
+        data_types TEXT NOT NULL DEFAULT ''
+    )''',
+]
+
+def normalize_query(query: str) -> str:
+    return ' '.join(tokenize(query))
+
+def _match_expression(query: str) -> str:
+    # Every word must appear, each as a prefix; tokens are [a-z0-9&]+ so
+    # quoting them is enough to keep FTS5 syntax out
+    return ' '.join(f'"{token}"*' for token in tokenize(query))
+
+class FoodStore:
+    """Persistent, full-text searchable cache of remote food results"""
+
+    def __init__(self, database: str = FOOD_STORE_PATH, ttls: Dict[str, float] = None,
+                 max_age: float = 180 * 24 * 3600):
+        self.database = database
+        self.ttls = dict(SOURCE_TTLS if ttls is None else ttls)
+        self.max_age = max_age
+        self._ready = False
+        self._last_purge = 0.0
+
+    def _pool(self):
+        pool = get_pool(self.database)
+        if not self._ready:
+            with pool.connection() as conn:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+                # Stores created before bulk imports existed
+                if 'imported' not in {row[1] for row in conn.execute('PRAGMA table_info(foods)')}:
+                    conn.execute('ALTER TABLE foods ADD COLUMN imported INTEGER NOT NULL DEFAULT 0')
+                if 'data_types' not in {row[1] for row in conn.execute('PRAGMA table_info(bulk_imports)')}:
+                    conn.execute("ALTER TABLE bulk_imports ADD COLUMN data_types TEXT NOT NULL DEFAULT ''")
+            self._ready = True
+        return pool
+
+    def connection(self):
+        """Borrow a store connection; one transaction, committed on exit"""
+        return self._pool().connection()
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Stored foods matching every query word, best BM25 match first"""
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        with self._pool().connection() as conn:
+            rows = conn.execute('''
+                SELECT foods.data FROM foods_fts
+                JOIN foods ON foods.id = foods_fts.rowid
+                WHERE foods_fts MATCH ?
+                ORDER BY bm25(foods_fts)
+                LIMIT ?
+            ''', (expression, limit)).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def _answered_by_import(self, conn, query: str, source: str) -> bool:
+        """Whether finished imports cover `source`'s upstream data types and match the query"""
+        if source not in BULK_SOURCES:
+            return False
+        food_source, upstream_types = BULK_SOURCES[source]
+        imported_types = set()
+        for (data_types,) in conn.execute(
+            'SELECT data_types FROM bulk_imports WHERE source = ? AND finished_at IS NOT NULL', (source,)
+        ):
+            imported_types.update(filter(None, data_types.split(',')))
+        if not upstream_types <= imported_types:
+            return False
+
+        expression = _match_expression(query)
+        return bool(expression) and conn.execute('''
+            SELECT 1 FROM foods_fts JOIN foods ON foods.id = foods_fts.rowid
+            WHERE foods_fts MATCH ? AND foods.source = ? AND foods.imported = 1 LIMIT 1
+        ''', (expression, food_source)).fetchone() is not None
+
+    def stale_sources(self, query: str, sources: Iterable[str]) -> List[str]:
+        """Sources that have not answered this query within their TTL.
+
+        A source is never stale for queries its finished bulk imports
+        answer, as long as they cover everything its upstream search does.
+        """
+        sources = list(sources)
+        now = time.time()
+        with self._pool().connection() as conn:
+            fetched = dict(conn.execute(
+                f'SELECT source, fetched_at FROM food_queries WHERE query = ? '
+                f'AND source IN ({", ".join("?" * len(sources))})',
+                (normalize_query(query), *sources)
+            ).fetchall())
+            return [source for source in sources
+                    if now - fetched.get(source, 0) > self.ttls.get(source, DEFAULT_TTL)
+                    and not self._answered_by_import(conn, query, source)]
+
+    def save(self, query: str, results_by_source: Dict[str, List[Dict]]):
+        """Store one fan-out's results and mark each answering source fresh.
+
+        Only sources present in results_by_source are marked; a source that
+        timed out or failed stays stale and is asked again next time.
+        """
+        now = time.time()
+        normalized = normalize_query(query)
+        with self._pool().connection() as conn:
+            for source, foods in results_by_source.items():
+                self.upsert(conn, foods, now)
+                conn.execute(
+                    'INSERT OR REPLACE INTO food_queries (query, source, fetched_at) VALUES (?, ?, ?)',
+                    (normalized, source, now)
+                )
+
+            # Foods no upstream has returned for max_age are dropped daily;
+            # bulk-imported foods stay until the next import replaces them
+            if now - self._last_purge > 24 * 3600:
+                self._last_purge = now
+                conn.execute('DELETE FROM food_queries WHERE fetched_at < ?', (now - self.max_age,))
+                conn.execute('DELETE FROM foods WHERE imported = 0 AND fetched_at < ?', (now - self.max_age,))
+
+    def upsert(self, conn, foods: Iterable[Dict], fetched_at: float = None, imported: bool = False) -> int:
+        """Insert or refresh foods (keyed on source, name and brand) on `conn`.
+
+        A food once bulk-imported stays marked imported when an upstream
+        search later refreshes it.
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        rows = [
+            (food['source'], food['name'], food.get('brand') or '', json.dumps(food), fetched_at, int(imported))
+            for food in foods if food.get('name')
+        ]
+        conn.executemany('''
+            INSERT INTO foods (source, name, brand, data, fetched_at, imported) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (source, name, brand) DO UPDATE SET
+                data = excluded.data, fetched_at = excluded.fetched_at, imported = MAX(imported, excluded.imported)
+        ''', rows)
+        return len(rows)
+
+food_store = FoodStore()
@@ -0,0 +1,126 @@
+"""
+Device History Backfill
+Pulls a date range of tracker history in the largest windows each
+provider allows, splits it into per-day health_data rows and bulk-loads
+them, checkpointing after every window so an interrupted backfill resumes
+where it stopped
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from dashboard_cache import bump_data_version
+from db_pool import DATABASE, get_pool
+from db_writer import get_writer
+from fitness_tracker_apis import RANGE_WINDOW_DAYS, FitnessTrackerAPI, fitness_tracker_api
+from raw_archive import archive_payload, release_payloads
+
+def _day(date: str) -> datetime:
+    return datetime.strptime(date, '%Y-%m-%d')
+
+def _format(day: datetime) -> str:
+    return day.strftime('%Y-%m-%d')
+
+def store_days(conn, user_id: int, provider: str, days: Dict[str, Dict]) -> int:
+    """Upsert per-day records into health_data on `conn` (one row per user, day and provider).
+
+    A day's 'raw' provider JSON goes to the raw payload archive, and the
+    payloads of the rows it replaces are dropped once unreferenced.
+    """
+    if not days:
+        return 0
+    replaced = [row[0] for row in conn.execute('''
+        SELECT raw_payload_id FROM health_data
+        WHERE user_id = ? AND source = ? AND date >= ? AND date <= ? AND raw_payload_id IS NOT NULL
+    ''', (user_id, provider, min(days), max(days)))]
+
+    rows = [
+        (user_id, date, day.get('steps', 0), day.get('heart_rate'),
+         day.get('calories_burned', 0), day.get('active_minutes', 0), provider,
+         archive_payload(conn, day['raw']) if day.get('raw') is not None else None)
+        for date, day in sorted(days.items())
+    ]
+    conn.executemany('''
+        INSERT OR REPLACE INTO health_data
+        (user_id, date, steps, heart_rate, calories_burned, active_minutes, source, raw_payload_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    release_payloads(conn, replaced)
+    bump_data_version(conn, user_id)
+    return len(rows)
+
+def load_backfill(user_id: int, provider: str, database: str = DATABASE) -> Optional[Dict]:
+    with get_pool(database).connection() as conn:
+        row = conn.execute(
+            'SELECT * FROM health_backfills WHERE user_id = ? AND provider = ?', (user_id, provider)
+        ).fetchone()
+    return dict(row) if row else None
+
+def unfinished_backfills(database: str = DATABASE) -> List[Dict]:
+    """Checkpoints of backfills that stopped before reaching their end date"""
+    with get_pool(database).connection() as conn:
+        rows = conn.execute('SELECT * FROM health_backfills WHERE finished_at IS NULL').fetchall()
+    return [dict(row) for row in rows]
+
+def backfill_history(user_id: int, provider: str, access_token: str, start_date: str, end_date: str,
+                     database: str = DATABASE, api: FitnessTrackerAPI = fitness_tracker_api) -> Dict:
+    """Load start_date..end_date (inclusive) from `provider` into health_data.
+
+    An unfinished backfill of the device is resumed where it stopped
+    instead, with its end moved forward to `end_date` if that is later.
+    Each window is written together with its checkpoint, so a failure costs
+    at most the window in flight; the returned dict then carries 'error'
+    and the date the next run will start from.
+    """
+    checkpoint = load_backfill(user_id, provider, database)
+    writer = get_writer(database)
+
+    if checkpoint and not checkpoint['finished_at']:
+        if end_date > checkpoint['end_date']:
+            writer.execute(
+                'UPDATE health_backfills SET end_date = ? WHERE user_id = ? AND provider = ?',
+                (end_date, user_id, provider)
+            ).result()
+        end_date = max(end_date, checkpoint['end_date'])
+    else:
+        def start(conn):
+            conn.execute('''
+                INSERT OR REPLACE INTO health_backfills (user_id, provider, start_date, end_date, next_date)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (user_id, provider, start_date, end_date, start_date))
+        writer.submit(start).result()
+        checkpoint = load_backfill(user_id, provider, database)
+
+    window = timedelta(days=RANGE_WINDOW_DAYS[provider])
+    cursor, last = _day(checkpoint['next_date']), _day(end_date)
+    days_loaded = checkpoint['days_loaded']
+    if cursor > last:
+        writer.execute('''
+            UPDATE health_backfills SET finished_at = CURRENT_TIMESTAMP WHERE user_id = ? AND provider = ?
+        ''', (user_id, provider)).result()
+
+    while cursor <= last:
+        window_end = min(cursor + window - timedelta(days=1), last)
+        try:
+            days = api.fetch_daily_range(provider, access_token, _format(cursor), _format(window_end))
+        except Exception as e:
+            print(f"{provider} backfill for user {user_id} stopped at {_format(cursor)}: {e}")
+            return {'provider': provider, 'days_loaded': days_loaded, 'next_date': _format(cursor), 'error': str(e)}
+
+        next_date = window_end + timedelta(days=1)
+        finished = next_date > last
+
+        def save(conn, days=days, next_date=_format(next_date), finished=finished):
+            loaded = store_days(conn, user_id, provider, days)
+            conn.execute('''
+                UPDATE health_backfills
+                SET next_date = ?, days_loaded = days_loaded + ?,
+                    finished_at = CASE WHEN ? THEN CURRENT_TIMESTAMP END
+                WHERE user_id = ? AND provider = ?
+            ''', (next_date, loaded, finished, user_id, provider))
+            return loaded
+
+        days_loaded += writer.submit(save).result()
+        cursor = next_date
+
+    return {'provider': provider, 'days_loaded': days_loaded, 'next_date': _format(cursor)}
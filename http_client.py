@@ -0,0 +1,135 @@
+"""
+Outbound HTTP Client
+One pooled, keep-alive requests session shared by every third-party
+integration, with default timeouts, jittered retries and per-integration
+latency/error metrics
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Statuses where the server says it did not process the request at all
+REFUSED_STATUSES = {429, 503}
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Seconds requested by a Retry-After header (delta or HTTP date), if any"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class HTTPClient:
+    """Thread-safe wrapper around a pooled requests.Session"""
+
+    def __init__(self, pool_size: int = 20, timeout=(3.05, 10), retries: int = 2,
+                 backoff: float = 0.5, max_backoff: float = 8.0, max_retry_after: float = 30.0):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+
+        # urllib3 keeps one keep-alive pool per host behind this adapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def get(self, url: str, integration: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, integration, **kwargs)
+
+    def post(self, url: str, integration: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, integration, **kwargs)
+
+    def request(self, method: str, url: str, integration: str, retries: Optional[int] = None,
+                idempotent: Optional[bool] = None, **kwargs) -> requests.Response:
+        """Send a request, retrying transient failures.
+
+        Idempotent requests are retried on connection errors, timeouts and
+        5xx/429 answers. Other requests are only retried when the server
+        refused them (429/503), since they may otherwise have been applied.
+        Retry-After is honoured up to max_retry_after. The final response is
+        returned whatever its status; the final exception is raised.
+        """
+        method = method.upper()
+        retries = self.retries if retries is None else retries
+        idempotent = method in IDEMPOTENT_METHODS if idempotent is None else idempotent
+        kwargs.setdefault('timeout', self.timeout)
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(integration, time.perf_counter() - started, error=True, retry=False)
+                if not idempotent or attempt >= retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                failed = response.status_code >= 500 or response.status_code == 429
+                self._record(integration, time.perf_counter() - started, error=failed, retry=False)
+                retryable = response.status_code in (RETRY_STATUSES if idempotent else REFUSED_STATUSES)
+                if not retryable or attempt >= retries:
+                    return response
+                delay = retry_after_seconds(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                elif delay > self.max_retry_after:
+                    return response  # Not worth holding the caller that long
+                response.close()
+
+            attempt += 1
+            self._record(integration, 0.0, error=False, retry=True)
+            time.sleep(delay)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying clients from synchronising
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def _record(self, integration: str, seconds: float, error: bool, retry: bool):
+        with self._lock:
+            metrics = self._metrics.setdefault(
+                integration, {'requests': 0, 'errors': 0, 'retries': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+            )
+            if retry:
+                metrics['retries'] += 1
+                return
+            metrics['requests'] += 1
+            metrics['errors'] += int(error)
+            metrics['seconds'] += seconds
+            metrics['max_seconds'] = max(metrics['max_seconds'], seconds)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-integration request, error and retry counts with latencies in ms"""
+        with self._lock:
+            return {
+                name: {
+                    'requests': m['requests'],
+                    'errors': m['errors'],
+                    'retries': m['retries'],
+                    'avg_ms': round(1000 * m['seconds'] / m['requests'], 1) if m['requests'] else 0.0,
+                    'max_ms': round(1000 * m['max_seconds'], 1)
+                }
+                for name, m in self._metrics.items()
+            }
+
+http_client = HTTPClient()
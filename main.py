@@ -4,7 +4,6 @@ A comprehensive fitness tracking app with personalized AI coaching
 """
 
 from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
-import sqlite3
 import bcrypt
 import json
 import os
@@ -13,7 +12,20 @@ import openai
 from dotenv import load_dotenv
 import secrets
 import re
+import hashlib
 from personalisation import generate_personalized_dashboard_content
+import db_pool
+import db_writer
+import migrations
+import ai_insights
+from ai_cache import ai_cache
+from food_database import NutritionCalculator, food_db
+from raw_archive import archive_payload, iter_raw_history, release_payloads
+from oauth_handlers import oauth_handler
+from sync_scheduler import create_scheduler, register_device
+from token_manager import create_token_manager
+from dashboard_cache import bump_data_version, dashboard_cache
+from user_stats import load_user_stats, log_snapshot, record_daily_log
 
 # Load environment variables
 load_dotenv()
@@ -25,18 +37,55 @@ app.secret_key = os.getenv('FLASK_SECRET_KEY', secrets.token_hex(16))
 openai.api_key = os.getenv('OPENAI_API_KEY')
 
 # Database configuration
-DATABASE = 'fitness_app.db'
+DATABASE = db_pool.DATABASE
+MAX_LOG_PAGE_SIZE = 100
+MAX_RAW_EXPORT_DAYS = 366
 
 def get_db_connection():
-    """Get database connection with row factory"""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Borrow a pooled database connection (use as a context manager)"""
+    return db_pool.connection(DATABASE)
+
+def get_db_writer():
+    """Shared group-commit writer for high-volume inserts"""
+    return db_writer.get_writer(DATABASE)
+
+# Device tokens are refreshed ahead of expiry and handed to scheduled syncs
+token_manager = create_token_manager(DATABASE)
+device_scheduler = create_scheduler(token_manager.get_token, DATABASE)
+
+# URL name -> (provider, auth URL builder, callback handler)
+DEVICE_OAUTH = {
+    'fitbit': ('fitbit', oauth_handler.get_fitbit_auth_url, oauth_handler.handle_fitbit_callback),
+    'oura': ('oura', oauth_handler.get_oura_auth_url, oauth_handler.handle_oura_callback),
+    'google': ('google_fit', oauth_handler.get_google_fit_auth_url, oauth_handler.handle_google_fit_callback),
+}
+# Days of history loaded when a device is first connected
+DEVICE_BACKFILL_DAYS = int(os.getenv('DEVICE_BACKFILL_DAYS', '90'))
+
+# Token refresh and scheduled device syncs run in each serving process;
+# turn them off in all but one when running several workers
+BACKGROUND_JOBS = os.getenv('BACKGROUND_JOBS', 'true').lower() == 'true'
+
+def start_background_jobs():
+    """Start token refresh and scheduled device syncs (idempotent)"""
+    token_manager.start()
+    device_scheduler.start()
+
+@app.before_request
+def ensure_background_jobs():
+    # Started by the first request rather than at import, so the debug
+    # reloader's watcher process (which never serves) does not run them
+    # and forked WSGI workers start their own threads
+    if BACKGROUND_JOBS and not device_scheduler.started:
+        start_background_jobs()
 
 def init_db():
     """Initialize the database with required tables"""
-    conn = get_db_connection()
-    
+    with get_db_connection() as conn:
+        migrations.migrate(conn, baseline=_create_tables)
+
+def _create_tables(conn):
+    """Base tables for a database that has never been migrated"""
     # Users table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -50,7 +99,7 @@ def init_db():
             questionnaire_completed BOOLEAN DEFAULT FALSE
         )
     ''')
-    
+
     # Daily logs table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS daily_logs (
@@ -72,31 +121,11 @@ def init_db():
             UNIQUE(user_id, date)
         )
     ''')
-    
-    # Health data table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS health_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            steps INTEGER,
-            heart_rate REAL,
-            calories_burned INTEGER,
-            active_minutes INTEGER,
-            source TEXT,
-            synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
 
 def get_user(email):
     """Get user by email"""
-    conn = get_db_connection()
-    user = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
-    conn.close()
+    with get_db_connection() as conn:
+        user = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
     
     if user:
         user_dict = dict(user)
@@ -112,52 +141,69 @@ def get_user(email):
 
 def save_user(user_data):
     """Save or update user data"""
-    conn = get_db_connection()
-    
     if 'profile_data' in user_data and isinstance(user_data['profile_data'], dict):
         profile_json = json.dumps(user_data['profile_data'])
     else:
         profile_json = user_data.get('profile_data', '{}')
     
-    if 'id' in user_data:
-        # Update existing user
-        conn.execute('''
-            UPDATE users 
-            SET name = ?, profile_data = ?, questionnaire_completed = ?
-            WHERE id = ?
-        ''', (
-            user_data['name'],
-            profile_json,
-            user_data.get('questionnaire_completed', False),
-            user_data['id']
-        ))
-    else:
-        # Create new user
-        conn.execute('''
-            INSERT INTO users (name, email, password_hash, date_of_birth, profile_data, questionnaire_completed)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            user_data['name'],
-            user_data['email'],
-            user_data['password_hash'],
-            user_data.get('date_of_birth'),
-            profile_json,
-            user_data.get('questionnaire_completed', False)
-        ))
-    
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        if 'id' in user_data:
+            # Update existing user
+            conn.execute('''
+                UPDATE users 
+                SET name = ?, profile_data = ?, questionnaire_completed = ?
+                WHERE id = ?
+            ''', (
+                user_data['name'],
+                profile_json,
+                user_data.get('questionnaire_completed', False),
+                user_data['id']
+            ))
+            bump_data_version(conn, user_data['id'])
+        else:
+            # Create new user
+            conn.execute('''
+                INSERT INTO users (name, email, password_hash, date_of_birth, profile_data, questionnaire_completed)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                user_data['name'],
+                user_data['email'],
+                user_data['password_hash'],
+                user_data.get('date_of_birth'),
+                profile_json,
+                user_data.get('questionnaire_completed', False)
+            ))
 
 def get_user_logs(user_id, days=30):
     """Get user's daily logs for the specified number of days"""
-    conn = get_db_connection()
-    logs = conn.execute('''
-        SELECT * FROM daily_logs 
-        WHERE user_id = ? 
-        ORDER BY date DESC 
-        LIMIT ?
-    ''', (user_id, days)).fetchall()
-    conn.close()
+    return get_user_logs_page(user_id, None, days)
+
+def get_user_stats(user_id):
+    """Dashboard statistics from the user's materialized user_stats row"""
+    with get_db_connection() as conn:
+        return load_user_stats(conn, user_id)
+
+def get_user_logs_page(user_id, before_date=None, page_size=30):
+    """Get up to page_size logs older than before_date, newest first.
+
+    (user_id, date) is unique, so the date of the last log on a page is a
+    complete keyset cursor for the next one.
+    """
+    with get_db_connection() as conn:
+        if before_date:
+            logs = conn.execute('''
+                SELECT * FROM daily_logs 
+                WHERE user_id = ? AND date < ?
+                ORDER BY date DESC 
+                LIMIT ?
+            ''', (user_id, before_date, page_size)).fetchall()
+        else:
+            logs = conn.execute('''
+                SELECT * FROM daily_logs 
+                WHERE user_id = ? 
+                ORDER BY date DESC 
+                LIMIT ?
+            ''', (user_id, page_size)).fetchall()
     
     return [dict(log) for log in logs]
 
@@ -227,22 +273,12 @@ def calculate_daily_score(log_data, user_profile):
     
     return min(score, max_score)
 
-def generate_ai_insights(user_profile, recent_logs):
-    """Generate AI-powered insights based on user data"""
-    if not openai.api_key:
-        return [{
-            'category': 'System',
-            'icon': '💡',
-            'message': 'AI insights will be available once OpenAI API is configured.',
-            'action': 'Contact support for API setup assistance.'
-        }]
+def build_insight_context(user_profile, recent_logs):
+    """Prompt context the AI insights are generated from"""
+    goal = user_profile.get('goal', 'fat_loss')
+    activity_level = user_profile.get('activity_level', 'moderately_active')
     
-    try:
-        goal = user_profile.get('goal', 'fat_loss')
-        activity_level = user_profile.get('activity_level', 'moderately_active')
-        
-        # Prepare context for AI
-        context = f"""
+    context = f"""
         User Profile:
         - Goal: {goal}
         - Activity Level: {activity_level}
@@ -250,19 +286,36 @@ def generate_ai_insights(user_profile, recent_logs):
         
         Recent patterns:
         """
+    
+    if recent_logs:
+        avg_sleep = sum(float(log.get('sleep_hours', 0)) for log in recent_logs) / len(recent_logs)
+        avg_stress = sum(int(log.get('stress_level', 5)) for log in recent_logs) / len(recent_logs)
+        workout_days = len([log for log in recent_logs if log.get('workout_duration', 0) > 0])
         
-        if recent_logs:
-            avg_sleep = sum(float(log.get('sleep_hours', 0)) for log in recent_logs) / len(recent_logs)
-            avg_stress = sum(int(log.get('stress_level', 5)) for log in recent_logs) / len(recent_logs)
-            workout_days = len([log for log in recent_logs if log.get('workout_duration', 0) > 0])
-            
-            context += f"""
+        context += f"""
             - Average sleep: {avg_sleep:.1f} hours
             - Average stress: {avg_stress:.1f}/10
             - Workout days: {workout_days}/{len(recent_logs)}
             """
+    
+    return context
+
+def generate_ai_insights(user_profile, recent_logs):
+    """Generate AI-powered insights based on user data"""
+    if not openai.api_key:
+        raise ai_insights.InsightsUnavailable('OpenAI API key not configured', [{
+            'category': 'System',
+            'icon': '💡',
+            'message': 'AI insights will be available once OpenAI API is configured.',
+            'action': 'Contact support for API setup assistance.'
+        }])
+    
+    try:
+        # Prepare context for AI
+        context = build_insight_context(user_profile, recent_logs)
         
-        response = openai.ChatCompletion.create(
+        # Identical contexts are common, so responses are shared across users
+        insights = ai_cache.chat_completion(
             model="gpt-3.5-turbo",
             messages=[
                 {
@@ -274,22 +327,39 @@ def generate_ai_insights(user_profile, recent_logs):
                     "content": context
                 }
             ],
+            # Content that is not JSON is not cached, so a retry asks again
+            parse=json.loads,
             max_tokens=500
         )
         
-        insights_text = response.choices[0].message.content
-        insights = json.loads(insights_text)
-        
         return insights if isinstance(insights, list) else [insights]
         
     except Exception as e:
-        print(f"AI insights error: {e}")
-        return [{
+        # Not stored as this context's insights, so it is retried later
+        raise ai_insights.InsightsUnavailable(f'AI insights error: {e}', [{
             'category': 'General',
             'icon': '💪',
             'message': 'Keep up the great work with your fitness journey!',
             'action': 'Continue logging daily for personalized insights.'
-        }]
+        }]) from e
+
+insight_worker = ai_insights.create_worker(generate_ai_insights, DATABASE)
+
+def get_ai_insights(user, recent_logs):
+    """Latest stored insights, regenerated in the background when their inputs change"""
+    try:
+        context = build_insight_context(user['profile_data'], recent_logs)
+    except (TypeError, ValueError):
+        context = json.dumps(recent_logs, default=str)  # Unparseable log values
+    context_hash = hashlib.sha256(context.encode('utf-8')).hexdigest()
+    
+    with get_db_connection() as conn:
+        stored = ai_insights.load_insights(conn, user['id'])
+    
+    if ai_insights.needs_refresh(stored, context_hash):
+        insight_worker.refresh(user['id'], user['profile_data'], recent_logs, context_hash)
+    
+    return stored['insights'] if stored else ai_insights.PENDING_INSIGHTS
 
 @app.route('/')
 def landing_page():
@@ -428,6 +498,54 @@ def questionnaire():
     
     return render_template('questionnaire.html')
 
+def build_dashboard(user):
+    """Build (or reuse) everything the dashboard views show for a user.
+
+    Cached per data version; today's date is part of the version because
+    streak_days counts up to today.
+    """
+    version = (user.get('data_version', 0), datetime.now().strftime('%Y-%m-%d'))
+    cached = dashboard_cache.get(user['id'], version)
+    if cached is not None:
+        return cached
+    
+    # Get user's recent logs
+    recent_logs = get_user_logs(user['id'], 30)
+    
+    # Statistics are maintained incrementally as logs are saved
+    user_stats = get_user_stats(user['id'])
+    
+    # Generate personalized content
+    personalized_content = generate_personalized_dashboard_content(
+        user, recent_logs, user_stats
+    )
+    
+    # Get latest score and components
+    latest_log = recent_logs[0] if recent_logs else None
+    latest_score = latest_log.get('score') if latest_log else None
+    
+    # Stored AI insights; new ones are generated off the request path
+    insights = get_ai_insights(user, recent_logs[:7])
+    
+    context = {
+        'user_stats': user_stats,
+        'latest_score': latest_score,
+        'recent_logs': recent_logs[:7],
+        'ai_insights': insights,
+        'personalized_content': personalized_content,
+        'score_history': prepare_score_history(recent_logs)
+    }
+    api_payload = {
+        'user': {
+            'name': user['name'],
+            'email': user['email'],
+            'profile_data': user['profile_data']
+        },
+        **{key: value for key, value in context.items() if key != 'recent_logs'}
+    }
+    body = app.json.dumps(api_payload).encode('utf-8')
+    return dashboard_cache.put(user['id'], version, context, body)
+
 @app.route('/dashboard')
 def dashboard():
     """Main dashboard with personalized content"""
@@ -442,41 +560,8 @@ def dashboard():
         return redirect(url_for('questionnaire'))
     
     try:
-        # Get user's recent logs
-        recent_logs = get_user_logs(user['id'], 30)
-        
-        # Calculate user statistics
-        user_stats = {
-            'total_logs': len(recent_logs),
-            'streak_days': calculate_streak(recent_logs),
-            'days_active': len([log for log in recent_logs if log.get('workout_duration', 0) > 0]),
-            'avg_score': calculate_average_score(recent_logs)
-        }
-        
-        # Generate personalized content
-        personalized_content = generate_personalized_dashboard_content(
-            user, recent_logs, user_stats
-        )
-        
-        # Get latest score and components
-        latest_log = recent_logs[0] if recent_logs else None
-        latest_score = latest_log.get('score') if latest_log else None
-        
-        # Generate AI insights
-        ai_insights = generate_ai_insights(user['profile_data'], recent_logs[:7])
-        
-        # Prepare dashboard data
-        dashboard_data = {
-            'user': user,
-            'user_stats': user_stats,
-            'latest_score': latest_score,
-            'recent_logs': recent_logs[:7],
-            'ai_insights': ai_insights,
-            'personalized_content': personalized_content,
-            'score_history': prepare_score_history(recent_logs)
-        }
-        
-        return render_template('dashboard.html', **dashboard_data)
+        dashboard_data = build_dashboard(user).context
+        return render_template('dashboard.html', user=user, **dashboard_data)
         
     except Exception as e:
         print(f"Dashboard error: {e}")
@@ -513,21 +598,26 @@ def daily_log():
             score = calculate_daily_score(log_data, user['profile_data'])
             log_data['score'] = score
             
+            def save_log(conn):
+                previous = log_snapshot(conn, user['id'], today)
+                conn.execute('''
+                    INSERT OR REPLACE INTO daily_logs 
+                    (user_id, date, weight, sleep_hours, water_intake, stress_level, 
+                     mood, food_log, workout, workout_duration, notes, score)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    user['id'], today, log_data['weight'], log_data['sleep_hours'],
+                    log_data['water_intake'], log_data['stress_level'], log_data['mood'],
+                    log_data['food_log'], log_data['workout'], log_data['workout_duration'],
+                    log_data['notes'], log_data['score']
+                ))
+                # Same transaction, so the stats row never lags the log
+                record_daily_log(conn, user['id'], today, previous)
+                bump_data_version(conn, user['id'])
+
             # Save to database
-            conn = get_db_connection()
-            conn.execute('''
-                INSERT OR REPLACE INTO daily_logs 
-                (user_id, date, weight, sleep_hours, water_intake, stress_level, 
-                 mood, food_log, workout, workout_duration, notes, score)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                user['id'], today, log_data['weight'], log_data['sleep_hours'],
-                log_data['water_intake'], log_data['stress_level'], log_data['mood'],
-                log_data['food_log'], log_data['workout'], log_data['workout_duration'],
-                log_data['notes'], log_data['score']
-            ))
-            conn.commit()
-            conn.close()
+            # Queued for the next group commit; result() waits until durable
+            get_db_writer().submit(save_log).result()
             
             flash(f'Daily log saved! Your score today: {score:.1f}/10')
             return redirect(url_for('dashboard'))
@@ -538,12 +628,11 @@ def daily_log():
     
     # Get today's existing log if any
     today = datetime.now().strftime('%Y-%m-%d')
-    conn = get_db_connection()
-    existing_log = conn.execute(
-        'SELECT * FROM daily_logs WHERE user_id = ? AND date = ?',
-        (user['id'], today)
-    ).fetchone()
-    conn.close()
+    with get_db_connection() as conn:
+        existing_log = conn.execute(
+            'SELECT * FROM daily_logs WHERE user_id = ? AND date = ?',
+            (user['id'], today)
+        ).fetchone()
     
     return render_template('daily-log.html', 
                          user=user, 
@@ -560,36 +649,92 @@ def api_dashboard_data():
         return jsonify({'error': 'User not found'}), 404
     
     try:
-        recent_logs = get_user_logs(user['id'], 30)
-        user_stats = {
-            'total_logs': len(recent_logs),
-            'streak_days': calculate_streak(recent_logs),
-            'days_active': len([log for log in recent_logs if log.get('workout_duration', 0) > 0]),
-            'avg_score': calculate_average_score(recent_logs)
-        }
+        dashboard = build_dashboard(user)
         
-        personalized_content = generate_personalized_dashboard_content(
-            user, recent_logs, user_stats
-        )
+        # Strong ETag over the exact body, so clients revalidate with
+        # If-None-Match and get a 304 while nothing has changed
+        response = app.response_class(dashboard.body, mimetype='application/json')
+        response.set_etag(dashboard.etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
         
-        ai_insights = generate_ai_insights(user['profile_data'], recent_logs[:7])
+    except Exception as e:
+        print(f"API dashboard error: {e}")
+        return jsonify({'error': 'Failed to load dashboard data'}), 500
+
+@app.route('/api/food-search')
+def api_food_search():
+    """Food autocomplete for the daily log food field"""
+    if 'user_email' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    query = request.args.get('q', '').strip()[:100]
+    if len(query) < 2:
+        return jsonify([])
+    
+    # Local fuzzy matches answer most keystrokes; anything else goes to the
+    # store-backed remote search
+    foods = food_db.autocomplete(query, 10) or food_db.search_all_databases(query)
+    return jsonify(foods)
+
+@app.route('/api/nutrition-summary', methods=['POST'])
+def api_nutrition_summary():
+    """Per-meal and daily macro totals for foods picked in the daily log"""
+    if 'user_email' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    # {"meals": {"breakfast": [{"food": {...}, "grams": 150}, {"food": {...}, "servings": 1}], ...}}
+    meals = (request.get_json(silent=True) or {}).get('meals')
+    if not isinstance(meals, dict):
+        return jsonify({'error': 'meals must be an object of meal name to items'}), 400
+    
+    try:
+        summary = NutritionCalculator.day_totals({
+            str(meal): [(item['food'], float(item.get('grams', 100)),
+                         float(item['servings']) if item.get('servings') is not None else None)
+                        for item in items]
+            for meal, items in meals.items()
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except (AttributeError, KeyError, TypeError):
+        return jsonify({'error': 'Each item needs a food object and a gram or serving amount'}), 400
+    return jsonify(summary)
+
+@app.route('/api/logs')
+def api_logs():
+    """Paginated daily log history (for mobile app and history views)"""
+    if 'user_email' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    user = get_user(session['user_email'])
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    page_size = request.args.get('page_size', 30, type=int)
+    page_size = max(1, min(page_size, MAX_LOG_PAGE_SIZE))
+    
+    before_date = request.args.get('before_date')
+    if before_date:
+        try:
+            datetime.strptime(before_date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'before_date must be YYYY-MM-DD'}), 400
+    
+    try:
+        # Fetch one extra row to know whether another page exists
+        logs = get_user_logs_page(user['id'], before_date, page_size + 1)
+        has_more = len(logs) > page_size
+        logs = logs[:page_size]
         
         return jsonify({
-            'user': {
-                'name': user['name'],
-                'email': user['email'],
-                'profile_data': user['profile_data']
-            },
-            'user_stats': user_stats,
-            'latest_score': recent_logs[0].get('score') if recent_logs else None,
-            'ai_insights': ai_insights,
-            'personalized_content': personalized_content,
-            'score_history': prepare_score_history(recent_logs)
+            'logs': logs,
+            'next_before_date': logs[-1]['date'] if has_more else None
         })
         
     except Exception as e:
-        print(f"API dashboard error: {e}")
-        return jsonify({'error': 'Failed to load dashboard data'}), 500
+        print(f"API logs error: {e}")
+        return jsonify({'error': 'Failed to load logs'}), 500
 
 @app.route('/api/health-connect', methods=['POST'])
 def api_health_connect():
@@ -608,22 +753,30 @@ def api_health_connect():
         
         today = datetime.now().strftime('%Y-%m-%d')
         
+        def save_health_data(conn):
+            replaced = conn.execute(
+                'SELECT raw_payload_id FROM health_data WHERE user_id = ? AND date = ? AND source = ?',
+                (user['id'], today, platform)
+            ).fetchone()
+            conn.execute('''
+                INSERT OR REPLACE INTO health_data 
+                (user_id, date, steps, heart_rate, calories_burned, active_minutes, source, raw_payload_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                user['id'], today,
+                data.get('steps', 0),
+                data.get('heart_rate'),
+                data.get('calories', 0),
+                data.get('active_minutes', 0),
+                platform,
+                archive_payload(conn, data)
+            ))
+            if replaced:
+                release_payloads(conn, [replaced[0]])
+            bump_data_version(conn, user['id'])
+        
         # Save health data
-        conn = get_db_connection()
-        conn.execute('''
-            INSERT OR REPLACE INTO health_data 
-            (user_id, date, steps, heart_rate, calories_burned, active_minutes, source)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            user['id'], today,
-            data.get('steps', 0),
-            data.get('heart_rate'),
-            data.get('calories', 0),
-            data.get('active_minutes', 0),
-            platform
-        ))
-        conn.commit()
-        conn.close()
+        get_db_writer().submit(save_health_data).result()
         
         return jsonify({'success': True, 'message': 'Health data synced successfully'})
         
@@ -631,6 +784,88 @@ def api_health_connect():
         print(f"Health connect error: {e}")
         return jsonify({'error': 'Failed to sync health data'}), 500
 
+@app.route('/api/health-data/raw')
+def api_health_data_raw():
+    """Export the provider payloads behind a user's health data (for reprocessing)"""
+    if 'user_email' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    user = get_user(session['user_email'])
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    try:
+        end = datetime.strptime(request.args.get('end') or datetime.now().strftime('%Y-%m-%d'), '%Y-%m-%d')
+        start = datetime.strptime(request.args.get('start') or (end - timedelta(days=29)).strftime('%Y-%m-%d'), '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+    if start > end or (end - start).days >= MAX_RAW_EXPORT_DAYS:
+        return jsonify({'error': f'range must be 1 to {MAX_RAW_EXPORT_DAYS} days'}), 400
+    
+    try:
+        with get_db_connection() as conn:
+            days = list(iter_raw_history(conn, user['id'], start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')))
+        return jsonify({'days': days})
+        
+    except Exception as e:
+        print(f"Raw health export error: {e}")
+        return jsonify({'error': 'Failed to export health data'}), 500
+
+@app.route('/connect/<device>')
+def connect_device(device):
+    """Start the OAuth flow for a fitness tracker"""
+    if 'user_email' not in session:
+        return redirect(url_for('landing_page'))
+    if device not in DEVICE_OAUTH:
+        return jsonify({'error': 'Unknown device'}), 404
+    
+    _, auth_url, _ = DEVICE_OAUTH[device]
+    url = auth_url(session['user_email'], request.url_root.rstrip('/'))
+    if not url:
+        flash('This device is not available yet.')
+        return redirect(url_for('dashboard'))
+    return redirect(url)
+
+@app.route('/oauth/<device>/callback')
+def device_oauth_callback(device):
+    """Store the tracker's tokens, schedule its syncs and load its recent history"""
+    if 'user_email' not in session:
+        return redirect(url_for('landing_page'))
+    if device not in DEVICE_OAUTH:
+        return jsonify({'error': 'Unknown device'}), 404
+    
+    user = get_user(session['user_email'])
+    if not user:
+        return redirect(url_for('landing_page'))
+    
+    provider, _, handle_callback = DEVICE_OAUTH[device]
+    result = handle_callback(request.args.get('code', ''), request.args.get('state', ''),
+                             session['user_email'], request.url_root.rstrip('/'))
+    if 'error' in result:
+        print(f"{provider} OAuth error: {result['error']}")
+        flash('Connecting your device failed. Please try again.')
+        return redirect(url_for('dashboard'))
+    
+    try:
+        token_manager.store_tokens(user['id'], provider, result)
+        register_device(user['id'], provider, DATABASE)
+    except Exception as e:
+        print(f"{provider} connect error: {e}")
+        flash('Connecting your device failed. Please try again.')
+        return redirect(url_for('dashboard'))
+    
+    # Older history is loaded in the background (and resumed by the
+    # scheduler if interrupted); scheduled syncs keep it current
+    today = datetime.now()
+    device_scheduler.queue_backfill(
+        user['id'], provider,
+        (today - timedelta(days=DEVICE_BACKFILL_DAYS)).strftime('%Y-%m-%d'),
+        (today - timedelta(days=1)).strftime('%Y-%m-%d')
+    )
+    
+    flash('Device connected! Your history is being imported.')
+    return redirect(url_for('dashboard'))
+
 @app.route('/logout')
 def logout():
     """Handle user logout"""
@@ -639,32 +874,6 @@ def logout():
     return redirect(url_for('landing_page'))
 
 # Utility functions
-def calculate_streak(logs):
-    """Calculate current streak of consecutive days with logs"""
-    if not logs:
-        return 0
-    
-    streak = 0
-    current_date = datetime.now().date()
-    
-    for log in logs:
-        log_date = datetime.strptime(log['date'], '%Y-%m-%d').date()
-        if log_date == current_date:
-            streak += 1
-            current_date -= timedelta(days=1)
-        else:
-            break
-    
-    return streak
-
-def calculate_average_score(logs):
-    """Calculate average score from recent logs"""
-    if not logs:
-        return 0
-    
-    scores = [log.get('score', 0) for log in logs if log.get('score')]
-    return sum(scores) / len(scores) if scores else 0
-
 def prepare_score_history(logs):
     """Prepare score history data for charts"""
     if not logs:
@@ -0,0 +1,262 @@
+"""
+Schema Migrations
+Versioned schema changes tracked with PRAGMA user_version, so the DDL runs
+once per database instead of on every import
+"""
+
+import logging
+import sqlite3
+from typing import Callable, List, Optional, Tuple
+
+import schema
+import user_stats
+
+logger = logging.getLogger(__name__)
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """Current schema version stored in the database header"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def table_columns(conn: sqlite3.Connection, table: str) -> set:
+    """Column names of `table` (empty if the table does not exist)"""
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+def _create_index(conn, name, table, columns, unique=False):
+    """Create an index only if `table` has every column it needs.
+
+    database.py (email keyed) and main.py (id keyed) create differently
+    shaped users/daily_logs tables in the same file, so each migration has
+    to cope with whichever layout is present.
+    """
+    wanted = [column.split()[0] for column in columns]
+    if not set(wanted) <= table_columns(conn, table):
+        return False
+    conn.execute(
+        f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS {name} '
+        f'ON {table} ({", ".join(columns)})'
+    )
+    return True
+
+def _create_health_data(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS health_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            steps INTEGER,
+            heart_rate REAL,
+            calories_burned INTEGER,
+            active_minutes INTEGER,
+            source TEXT,
+            synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+def _add_history_indexes(conn):
+    # database.py layout
+    _create_index(conn, 'idx_daily_logs_email_ts', 'daily_logs', ['user_email', 'timestamp'])
+    _create_index(conn, 'idx_weekly_checkins_email_ts', 'weekly_checkins', ['user_email', 'timestamp'])
+
+    # main.py layout: UNIQUE(user_id, date) already gives daily_logs an
+    # index that serves "WHERE user_id = ? ORDER BY date DESC", so no
+    # second copy is created here.
+
+    _create_index(conn, 'idx_health_data_user_date_source', 'health_data', ['user_id', 'date', 'source'])
+
+# Hot numeric daily log fields promoted out of database.py's JSON blob
+TYPED_LOG_COLUMNS = [
+    ('weight', 'REAL'),
+    ('sleep_hours', 'REAL'),
+    ('stress_level', 'INTEGER'),
+    ('workout_duration', 'INTEGER'),
+    ('score', 'REAL'),
+]
+
+def _add_typed_log_columns(conn):
+    columns = table_columns(conn, 'daily_logs')
+    if 'data' not in columns:
+        return  # main.py layout already stores these as columns
+
+    for name, column_type in TYPED_LOG_COLUMNS:
+        if name not in columns:
+            conn.execute(f'ALTER TABLE daily_logs ADD COLUMN {name} {column_type}')
+    _create_index(conn, 'idx_daily_logs_email_date', 'daily_logs', ['user_email', 'date'])
+
+    # Existing rows are moved over in small batches after startup
+    # (database.backfill_log_columns) rather than inside this transaction.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS backfills (
+            name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL,
+            target_id INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO backfills (name, last_id, target_id)
+        SELECT 'daily_log_columns', 0, IFNULL(MAX(id), 0) FROM daily_logs
+    ''')
+
+def _create_user_stats(conn):
+    conn.execute(schema.CREATE_USER_STATS)
+    if 'user_id' not in table_columns(conn, 'daily_logs'):
+        return  # database.py layout has no numeric user ids to key on
+
+    user_ids = [row[0] for row in conn.execute('SELECT DISTINCT user_id FROM daily_logs')]
+    for user_id in user_ids:
+        user_stats.refresh_user_stats(conn, user_id)
+
+def _add_data_version(conn):
+    # Bumped with every change to a user's logs, profile or health data;
+    # dashboard caches are keyed on it (see dashboard_cache.py)
+    columns = table_columns(conn, 'users')
+    if 'id' in columns and 'data_version' not in columns:
+        conn.execute('ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0')
+
+def _create_ai_insights(conn):
+    conn.execute(schema.CREATE_AI_INSIGHTS)
+
+def _create_health_backfills(conn):
+    conn.execute(schema.CREATE_HEALTH_BACKFILLS)
+
+def _create_device_syncs(conn):
+    conn.execute(schema.CREATE_DEVICE_SYNCS)
+
+def _create_raw_payloads(conn):
+    # Provider JSON lives in its own table so health_data rows stay narrow
+    conn.execute(schema.CREATE_RAW_PAYLOADS)
+    if 'raw_payload_id' not in table_columns(conn, 'health_data'):
+        conn.execute('ALTER TABLE health_data ADD COLUMN raw_payload_id INTEGER REFERENCES raw_payloads (id)')
+    # Serves the "still referenced?" check when payloads are released
+    _create_index(conn, 'idx_health_data_raw_payload', 'health_data', ['raw_payload_id'])
+
+def _create_device_tokens(conn):
+    conn.execute(schema.CREATE_DEVICE_TOKENS)
+    # The background refresh looks tokens up by expiry
+    _create_index(conn, 'idx_device_tokens_expires_at', 'device_tokens', ['expires_at'])
+
+def _add_user_stats_windows_date(conn):
+    # Day the stored rolling windows end on; older ones are recomputed on read
+    if 'windows_date' not in table_columns(conn, 'user_stats'):
+        conn.execute('ALTER TABLE user_stats ADD COLUMN windows_date TEXT')
+
+def _dedupe_health_data(conn):
+    # health_data is written with INSERT OR REPLACE once per user/day/source;
+    # a unique index is what makes the REPLACE actually replace. The newest
+    # row of each duplicate group is kept. NULL sources never conflict in a
+    # unique index, so those rows are left alone.
+    duplicates = conn.execute('''
+        SELECT id, raw_payload_id FROM health_data WHERE source IS NOT NULL AND id NOT IN (
+            SELECT MAX(id) FROM health_data WHERE source IS NOT NULL GROUP BY user_id, date, source
+        )
+    ''').fetchall()
+    if duplicates:
+        conn.executemany('DELETE FROM health_data WHERE id = ?', [(row[0],) for row in duplicates])
+        payload_ids = [(row[1],) for row in duplicates if row[1] is not None]
+        conn.executemany('''
+            DELETE FROM raw_payloads WHERE id = ?1
+            AND NOT EXISTS (SELECT 1 FROM health_data WHERE raw_payload_id = ?1)
+        ''', payload_ids)
+        logger.warning('Removed %d duplicate health_data rows', len(duplicates))
+
+    conn.execute('DROP INDEX IF EXISTS idx_health_data_user_date_source')
+    _create_index(conn, 'idx_health_data_user_date_source', 'health_data',
+                  ['user_id', 'date', 'source'], unique=True)
+
+# (version, description, step) - append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, 'health_data table', _create_health_data),
+    (2, 'indexes for per-user history queries', _add_history_indexes),
+    (3, 'typed daily log columns', _add_typed_log_columns),
+    (4, 'materialized user_stats', _create_user_stats),
+    (5, 'users.data_version for dashboard caching', _add_data_version),
+    (6, 'stored AI insights', _create_ai_insights),
+    (7, 'device history backfill checkpoints', _create_health_backfills),
+    (8, 'device sync high-water marks', _create_device_syncs),
+    (9, 'compressed raw payload archive', _create_raw_payloads),
+    (10, 'device OAuth tokens with expiry', _create_device_tokens),
+    (11, 'user_stats rolling window anchor date', _add_user_stats_windows_date),
+    (12, 'unique health_data rows per user, day and source', _dedupe_health_data),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def migrate(conn: sqlite3.Connection, baseline: Optional[Callable] = None) -> int:
+    """Bring the database up to SCHEMA_VERSION.
+
+    `baseline` creates the caller's base tables and only runs on a database
+    that has never been migrated. Each migration runs in its own IMMEDIATE
+    transaction together with its user_version bump, so concurrent
+    processes apply it exactly once.
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return SCHEMA_VERSION
+
+    if conn.in_transaction:
+        conn.commit()
+
+    for number, description, step in MIGRATIONS:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = schema_version(conn)
+            if number <= version:
+                conn.rollback()
+                continue
+            if version == 0 and baseline:
+                baseline(conn)
+            step(conn)
+            conn.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+            logger.info('Applied migration %d: %s', number, description)
+        except Exception:
+            conn.rollback()
+            raise
+
+    return schema_version(conn)
+
+# Queries that must be served from an index; checked by check_query_plans()
+HOT_QUERIES = [
+    ('daily_logs', {'user_email', 'timestamp'},
+     'SELECT data FROM daily_logs WHERE user_email = ? ORDER BY timestamp', ('x',)),
+    ('daily_logs', {'user_email', 'date', 'weight'},
+     'SELECT date, weight FROM daily_logs WHERE user_email = ? AND date >= ? ORDER BY date', ('x', '')),
+    ('daily_logs', {'user_email', 'date', 'weight'},
+     'SELECT id, date FROM daily_logs WHERE user_email = ? AND (date, id) < (?, ?) '
+     'ORDER BY date DESC, id DESC LIMIT ?', ('x', '2024-01-01', 10, 31)),
+    ('weekly_checkins', {'user_email', 'timestamp'},
+     'SELECT data FROM weekly_checkins WHERE user_email = ? ORDER BY timestamp DESC', ('x',)),
+    ('weekly_checkins', {'user_email', 'timestamp'},
+     'SELECT id, timestamp, data FROM weekly_checkins WHERE user_email = ? AND (timestamp, id) < (?, ?) '
+     'ORDER BY timestamp DESC, id DESC LIMIT ?', ('x', '2024-01-01', 10, 11)),
+    ('daily_logs', {'user_id', 'date'},
+     'SELECT * FROM daily_logs WHERE user_id = ? ORDER BY date DESC LIMIT ?', (1, 30)),
+    ('daily_logs', {'user_id', 'date'},
+     'SELECT * FROM daily_logs WHERE user_id = ? AND date = ?', (1, '2024-01-01')),
+    ('daily_logs', {'user_id', 'date'},
+     'SELECT * FROM daily_logs WHERE user_id = ? AND date < ? ORDER BY date DESC LIMIT ?', (1, '2024-01-01', 31)),
+    ('daily_logs', {'user_id', 'date', 'score'},
+     'SELECT AVG(score) FROM daily_logs WHERE user_id = ? AND date > ? AND date <= ?', (1, '2024-01-01', '2024-01-30')),
+    ('health_data', {'user_id', 'date', 'source'},
+     'SELECT * FROM health_data WHERE user_id = ? AND date >= ? ORDER BY date', (1, '2024-01-01')),
+]
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, params=()) -> List[str]:
+    """Detail lines of EXPLAIN QUERY PLAN for `sql`"""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+def check_query_plans(conn: sqlite3.Connection) -> List[Tuple[str, List[str]]]:
+    """Return the hot queries that would full-scan or sort in a temp b-tree.
+
+    Queries for a table layout that is not present are skipped; an empty
+    list means every applicable query is index-backed.
+    """
+    problems = []
+    for table, columns, sql, params in HOT_QUERIES:
+        if not columns <= table_columns(conn, table):
+            continue
+        plan = explain_query_plan(conn, sql, params)
+        scans = [line for line in plan
+                 if (line.startswith('SCAN ') and 'USING' not in line) or 'TEMP B-TREE' in line]
+        if scans:
+            problems.append((sql, plan))
+    return problems
@@ -0,0 +1,149 @@
+"""
+Numeric Nutrient Model
+Foods carry their nutrients as plain floats per 100 g in one fixed order
+and canonical units, parsed once at ingest instead of re-reading display
+strings like '165 kcal' or '31g' wherever a number is needed
+"""
+
+import re
+from array import array
+from operator import itemgetter, mul
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Fixed vector order and the canonical unit of each slot
+NUTRIENTS = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'sugar', 'sodium')
+UNITS = ('kcal', 'g', 'g', 'g', 'g', 'g', 'mg')
+WIDTH = len(NUTRIENTS)
+PER_100G_KEYS = tuple(f'{name}_per_100g' for name in NUTRIENTS)
+PER_SERVING_KEYS = tuple(f'{name}_per_serving' for name in NUTRIENTS)
+_per_100g = itemgetter(*PER_100G_KEYS)
+
+# Energy per gram of each macro, for calorie splits
+KCAL_PER_GRAM = {'protein': 4.0, 'carbs': 4.0, 'fat': 9.0}
+
+_AMOUNT = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*([a-zµ]*)', re.IGNORECASE)
+
+# Multipliers into the canonical unit, per canonical unit
+_CONVERSIONS = {
+    'kcal': {'': 1.0, 'kcal': 1.0, 'cal': 1.0, 'kj': 1 / 4.184},
+    'g': {'': 1.0, 'g': 1.0, 'mg': 0.001, 'ug': 1e-6, 'µg': 1e-6, 'mcg': 1e-6, 'kg': 1000.0},
+    'mg': {'': 1.0, 'mg': 1.0, 'g': 1000.0, 'ug': 0.001, 'µg': 0.001, 'mcg': 0.001},
+}
+
+_SERVING_UNITS = {'g': 1.0, 'gram': 1.0, 'grams': 1.0, 'kg': 1000.0, 'ml': 1.0, 'l': 1000.0}
+
+def parse_amount(value, unit: str) -> float:
+    """'165 kcal', '690 kJ', '31g', '380mg' or a bare number, in `unit`.
+
+    Bare numbers are taken to already be in the canonical unit; anything
+    unparseable counts as 0.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _AMOUNT.match(str(value or ''))
+    if not match:
+        return 0.0
+    factor = _CONVERSIONS[unit].get(match.group(2).lower())
+    return float(match.group(1)) * factor if factor is not None else 0.0
+
+def serving_grams(food: Dict) -> Optional[float]:
+    """Weight of the serving the `nutrients` strings describe, when known.
+
+    '100g' and '250 ml' are read directly (1 ml taken as 1 g). Servings like
+    '1 burger' are weighed from calories_per_100g when the food has it.
+    """
+    match = _AMOUNT.match(str(food.get('serving_size') or ''))
+    if match and match.group(2).lower() in _SERVING_UNITS:
+        grams = float(match.group(1)) * _SERVING_UNITS[match.group(2).lower()]
+        if grams > 0:
+            return grams
+
+    per_100g = food.get('calories_per_100g')
+    calories = parse_amount((food.get('nutrients') or {}).get('calories'), 'kcal')
+    if isinstance(per_100g, (int, float)) and per_100g > 0 and calories > 0:
+        return round(calories / per_100g * 100, 1)
+    return None
+
+def serving_vector(food: Dict) -> Optional[array]:
+    """Nutrients of one serving (as described by `nutrients`), or None without them"""
+    nutrients = food.get('nutrients')
+    if not nutrients:
+        return None
+    return array('d', (parse_amount(nutrients.get(name), unit) for name, unit in zip(NUTRIENTS, UNITS)))
+
+def nutrient_vector(food: Dict) -> Optional[array]:
+    """Nutrients per 100 g as a fixed-order float array (see NUTRIENTS).
+
+    None when that cannot be known: the serving weight is unknown and the
+    source gives no per-100g values (e.g. '6 nuggets' with only
+    per-serving strings). Such foods are counted with serving_vector.
+    """
+    if 'serving_grams' in food:
+        # Already normalized at ingest
+        try:
+            values = _per_100g(food)
+            if values.count(None) == WIDTH:
+                return None
+            return array('d', values)
+        except (KeyError, TypeError):
+            pass
+
+    # Numeric per-100g fields from the source are authoritative
+    stated = [(i, float(food[key])) for i, key in enumerate(PER_100G_KEYS)
+              if isinstance(food.get(key), (int, float)) and food[key]]
+    grams = serving_grams(food)
+    if grams is None and not stated:
+        return None
+
+    per_serving = serving_vector(food) if grams else None
+    vector = (array('d', (value * 100 / grams for value in per_serving)) if per_serving
+              else array('d', [0.0] * WIDTH))
+    for i, value in stated:
+        vector[i] = value
+    return vector
+
+def normalize_food(food: Dict) -> Dict:
+    """Copy of `food` with numeric <nutrient>_per_100g and _per_serving fields and serving_grams.
+
+    Either set of fields is None where it cannot be derived; the display
+    `nutrients` strings are kept as they are.
+    """
+    vector = nutrient_vector(food)
+    per_serving = serving_vector(food)
+    normalized = dict(food)
+    normalized.update(zip(PER_100G_KEYS, (round(value, 2) for value in vector) if vector else (None,) * WIDTH))
+    normalized.update(zip(PER_SERVING_KEYS, (round(value, 2) for value in per_serving) if per_serving
+                          else (None,) * WIDTH))
+    normalized['serving_grams'] = food['serving_grams'] if 'serving_grams' in food else serving_grams(food)
+    return normalized
+
+def group_totals(vectors: Sequence[array], grams: Sequence[float],
+                 bounds: Sequence[Tuple[int, int]]) -> List[array]:
+    """Gram-weighted nutrient sums for contiguous groups of items.
+
+    All vectors are laid out in one flat row-major matrix so each nutrient
+    column of a group is a single strided slice, summed against the item
+    weights in one pass.
+    """
+    matrix = array('d')
+    for vector in vectors:
+        matrix.extend(vector)
+    weights = array('d', (g / 100 for g in grams))
+
+    totals = []
+    for start, end in bounds:
+        group_weights = weights[start:end]
+        totals.append(array('d', (
+            sum(map(mul, matrix[start * WIDTH + column:end * WIDTH:WIDTH], group_weights))
+            for column in range(WIDTH)
+        )))
+    return totals
+
+def as_dict(vector: Iterable[float], digits: int = 1) -> Dict[str, float]:
+    return {name: round(value, digits) for name, value in zip(NUTRIENTS, vector)}
+
+def macro_split(totals: Dict[str, float]) -> Dict[str, float]:
+    """Share of macro energy from protein, carbs and fat, in percent"""
+    energy = {name: totals.get(name, 0.0) * kcal for name, kcal in KCAL_PER_GRAM.items()}
+    total = sum(energy.values())
+    return {name: round(100 * value / total, 1) if total else 0.0 for name, value in energy.items()}
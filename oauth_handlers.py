@@ -1,11 +1,12 @@
 
 from flask import request, redirect, session, url_for, jsonify
-import requests
 import base64
 import secrets
 from urllib.parse import urlencode
 import os
 
+from http_client import http_client
+
 class FitnessOAuthHandler:
     """Handle OAuth flows for fitness tracker APIs"""
     
@@ -106,7 +107,7 @@ class FitnessOAuthHandler:
         }
         
         try:
-            response = requests.post(self.fitbit_token_url, headers=headers, data=data)
+            response = http_client.post(self.fitbit_token_url, 'fitbit', headers=headers, data=data)
             
             if response.status_code == 200:
                 tokens = response.json()
@@ -143,7 +144,7 @@ class FitnessOAuthHandler:
         }
         
         try:
-            response = requests.post(self.oura_token_url, headers=headers, data=data)
+            response = http_client.post(self.oura_token_url, 'oura', headers=headers, data=data)
             
             if response.status_code == 200:
                 tokens = response.json()
@@ -179,7 +180,7 @@ class FitnessOAuthHandler:
         }
         
         try:
-            response = requests.post(self.google_token_url, headers=headers, data=data)
+            response = http_client.post(self.google_token_url, 'google_fit', headers=headers, data=data)
             
             if response.status_code == 200:
                 tokens = response.json()
@@ -210,7 +211,55 @@ class FitnessOAuthHandler:
         }
         
         try:
-            response = requests.post(self.fitbit_token_url, headers=headers, data=data)
+            response = http_client.post(self.fitbit_token_url, 'fitbit', headers=headers, data=data)
+            
+            if response.status_code == 200:
+                return response.json()
+            else:
+                return {"error": f"Token refresh failed: {response.status_code}"}
+                
+        except Exception as e:
+            return {"error": f"Token refresh failed: {str(e)}"}
+    
+    def refresh_oura_token(self, refresh_token: str) -> dict:
+        """Refresh Oura access token"""
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded'
+        }
+        
+        data = {
+            'client_id': self.oura_client_id,
+            'client_secret': self.oura_client_secret,
+            'grant_type': 'refresh_token',
+            'refresh_token': refresh_token
+        }
+        
+        try:
+            response = http_client.post(self.oura_token_url, 'oura', headers=headers, data=data)
+            
+            if response.status_code == 200:
+                return response.json()
+            else:
+                return {"error": f"Token refresh failed: {response.status_code}"}
+                
+        except Exception as e:
+            return {"error": f"Token refresh failed: {str(e)}"}
+    
+    def refresh_google_fit_token(self, refresh_token: str) -> dict:
+        """Refresh Google Fit access token (Google keeps the refresh token unchanged)"""
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded'
+        }
+        
+        data = {
+            'client_id': self.google_fit_client_id,
+            'client_secret': self.google_fit_client_secret,
+            'grant_type': 'refresh_token',
+            'refresh_token': refresh_token
+        }
+        
+        try:
+            response = http_client.post(self.google_token_url, 'google_fit', headers=headers, data=data)
             
             if response.status_code == 200:
                 return response.json()
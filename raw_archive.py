@@ -0,0 +1,98 @@
+"""
+Raw Payload Archive
+Provider JSON behind each health_data row, kept out of the row itself:
+payloads are compressed once into a content-addressed blob table and
+health_data only holds the blob's id. Summary queries never touch the
+blobs; they are decompressed on demand for reprocessing or export
+"""
+
+import hashlib
+import json
+import lzma
+import os
+import zlib
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+# Per-day payloads are small and written often, so zlib is the default;
+# RAW_ARCHIVE_CODEC=lzma trades slower writes for smaller blobs
+DEFAULT_CODEC = os.getenv('RAW_ARCHIVE_CODEC', 'zlib')
+
+_COMPRESS = {
+    'none': bytes,
+    'zlib': lambda data: zlib.compress(data, 6),
+    'lzma': lambda data: lzma.compress(data, preset=6),
+}
+_DECOMPRESS = {
+    'none': bytes,
+    'zlib': zlib.decompress,
+    'lzma': lzma.decompress,
+}
+
+def canonical_json(payload) -> bytes:
+    """Stable encoding of `payload`, so equal payloads share one digest"""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+
+def encode_payload(payload, codec: Optional[str] = None) -> Tuple[bytes, str, int, bytes]:
+    """(digest, codec, uncompressed size, stored bytes) for `payload`.
+
+    Payloads too small to shrink are stored as they are, under codec 'none'.
+    """
+    codec = codec or DEFAULT_CODEC
+    data = canonical_json(payload)
+    compressed = _COMPRESS[codec](data)
+    if len(compressed) >= len(data):
+        codec, compressed = 'none', data
+    return hashlib.sha256(data).digest(), codec, len(data), compressed
+
+def archive_payload(conn, payload, codec: Optional[str] = None) -> int:
+    """Store `payload` on `conn` (a no-op if an identical one exists); returns its id"""
+    digest, codec, size, data = encode_payload(payload, codec)
+    conn.execute(
+        'INSERT OR IGNORE INTO raw_payloads (digest, codec, size, data) VALUES (?, ?, ?, ?)',
+        (digest, codec, size, data)
+    )
+    return conn.execute('SELECT id FROM raw_payloads WHERE digest = ?', (digest,)).fetchone()[0]
+
+def decode_payload(codec: str, data: bytes):
+    return json.loads(_DECOMPRESS[codec](data))
+
+def load_payload(conn, payload_id: Optional[int]):
+    """The archived payload with id `payload_id`, or None"""
+    if payload_id is None:
+        return None
+    row = conn.execute('SELECT codec, data FROM raw_payloads WHERE id = ?', (payload_id,)).fetchone()
+    return decode_payload(row[0], row[1]) if row else None
+
+def release_payloads(conn, payload_ids: Iterable[int]) -> int:
+    """Delete those of `payload_ids` that no health_data row references any more"""
+    ids = sorted({payload_id for payload_id in payload_ids if payload_id is not None})
+    if not ids:
+        return 0
+    marks = ', '.join('?' * len(ids))
+    return conn.execute(f'''
+        DELETE FROM raw_payloads WHERE id IN ({marks})
+        AND id NOT IN (SELECT raw_payload_id FROM health_data WHERE raw_payload_id IN ({marks}))
+    ''', ids + ids).rowcount
+
+def iter_raw_history(conn, user_id: int, start_date: str, end_date: str) -> Iterator[Dict]:
+    """A user's health_data rows for start_date..end_date with their raw payloads.
+
+    Rows are decompressed one at a time as the caller iterates.
+    """
+    rows = conn.execute('''
+        SELECT h.date, h.source, p.codec, p.data
+        FROM health_data h JOIN raw_payloads p ON p.id = h.raw_payload_id
+        WHERE h.user_id = ? AND h.date >= ? AND h.date <= ?
+        ORDER BY h.date, h.source
+    ''', (user_id, start_date, end_date))
+    for date, source, codec, data in rows:
+        yield {'date': date, 'source': source, 'raw': decode_payload(codec, data)}
+
+def archive_stats(conn) -> Dict:
+    """Payload count with raw and stored sizes, per codec"""
+    rows = conn.execute('''
+        SELECT codec, COUNT(*), IFNULL(SUM(size), 0), IFNULL(SUM(LENGTH(data)), 0)
+        FROM raw_payloads GROUP BY codec
+    ''').fetchall()
+    return {codec: {'payloads': count, 'raw_bytes': size, 'stored_bytes': stored}
+            for codec, count, size, stored in rows}
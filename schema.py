@@ -0,0 +1,88 @@
+"""
+Table Definitions
+DDL for the tables added by feature modules, kept free of imports so the
+migrations can create them without loading those modules (and their
+HTTP, Flask and OAuth dependencies)
+"""
+
+# user_stats.py
+CREATE_USER_STATS = '''
+    CREATE TABLE IF NOT EXISTS user_stats (
+        user_id INTEGER PRIMARY KEY,
+        total_logs INTEGER NOT NULL DEFAULT 0,
+        active_days INTEGER NOT NULL DEFAULT 0,
+        current_streak INTEGER NOT NULL DEFAULT 0,
+        longest_streak INTEGER NOT NULL DEFAULT 0,
+        last_log_date TEXT,
+        avg_score_7d REAL,
+        avg_score_30d REAL,
+        active_days_7d INTEGER NOT NULL DEFAULT 0,
+        active_days_30d INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        windows_date TEXT
+    )
+'''
+
+# ai_insights.py
+CREATE_AI_INSIGHTS = '''
+    CREATE TABLE IF NOT EXISTS ai_insights (
+        user_id INTEGER PRIMARY KEY,
+        context_hash TEXT NOT NULL,
+        insights TEXT NOT NULL,
+        generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# health_backfill.py
+CREATE_HEALTH_BACKFILLS = '''
+    CREATE TABLE IF NOT EXISTS health_backfills (
+        user_id INTEGER NOT NULL,
+        provider TEXT NOT NULL,
+        start_date TEXT NOT NULL,
+        end_date TEXT NOT NULL,
+        next_date TEXT NOT NULL,
+        days_loaded INTEGER NOT NULL DEFAULT 0,
+        finished_at TIMESTAMP,
+        PRIMARY KEY (user_id, provider)
+    )
+'''
+
+# sync_scheduler.py
+CREATE_DEVICE_SYNCS = '''
+    CREATE TABLE IF NOT EXISTS device_syncs (
+        user_id INTEGER NOT NULL,
+        provider TEXT NOT NULL,
+        synced_through TEXT,
+        last_attempt_at REAL,
+        last_success_at REAL,
+        last_error TEXT,
+        PRIMARY KEY (user_id, provider)
+    )
+'''
+
+# raw_archive.py
+CREATE_RAW_PAYLOADS = '''
+    CREATE TABLE IF NOT EXISTS raw_payloads (
+        id INTEGER PRIMARY KEY,
+        digest BLOB UNIQUE NOT NULL,
+        codec TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# token_manager.py
+CREATE_DEVICE_TOKENS = '''
+    CREATE TABLE IF NOT EXISTS device_tokens (
+        user_id INTEGER NOT NULL,
+        provider TEXT NOT NULL,
+        access_token TEXT NOT NULL,
+        refresh_token TEXT,
+        expires_at REAL,
+        refreshed_at REAL,
+        refresh_failed_at REAL,
+        last_error TEXT,
+        PRIMARY KEY (user_id, provider)
+    )
+'''
@@ -0,0 +1,48 @@
+"""
+Call Coalescing
+Concurrent calls for the same key share one execution of the underlying
+function instead of each hitting the upstream service
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Callable, Hashable
+
+class SingleFlight:
+    """Deduplicates in-flight calls by key"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'coalesced': 0}
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs):
+        """Run fn(*args, **kwargs), or wait for the identical call already running.
+
+        Waiters get the leader's result or exception. Nothing is kept once
+        the call finishes; caching results is the caller's job.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.stats['calls'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
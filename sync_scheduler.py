@@ -0,0 +1,237 @@
+"""
+Background Device Sync
+Keeps a per-user, per-provider high-water mark of synced days and pulls
+only the days after it. Users are spread across the hour, recently active
+users are synced most often, and upstream concurrency stays capped by the
+per-provider limits in fitness_tracker_apis
+"""
+
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from db_pool import DATABASE, get_pool
+from db_writer import get_writer
+from fitness_tracker_apis import FitnessTrackerAPI, fitness_tracker_api
+from health_backfill import backfill_history, store_days, unfinished_backfills
+
+# Hours between syncs by days since the user's last daily log
+ACTIVITY_INTERVALS = ((7, 1), (30, 6), (None, 24))
+# Seconds before an interrupted history backfill is resumed again
+BACKFILL_RETRY_AFTER = 3600
+
+def sync_slot(user_id: int, provider: str) -> int:
+    """Stable second within the hour at which this device syncs"""
+    return zlib.crc32(f'{user_id}:{provider}'.encode()) % 3600
+
+def sync_interval_hours(last_log_date: Optional[str], today: date) -> int:
+    if not last_log_date:
+        return ACTIVITY_INTERVALS[-1][1]
+    idle_days = (today - datetime.strptime(last_log_date, '%Y-%m-%d').date()).days
+    for max_idle, hours in ACTIVITY_INTERVALS:
+        if max_idle is None or idle_days <= max_idle:
+            return hours
+
+def is_due(slot: int, interval_hours: int, last_attempt_at: Optional[float], now: float) -> bool:
+    """Whether a device's latest slot time has come round since its last attempt.
+
+    Due times stay anchored to the slot, so syncs do not drift together
+    however late a tick runs.
+    """
+    slot_time = now - now % 3600 + slot
+    if slot_time > now:
+        slot_time -= 3600
+    return last_attempt_at is None or last_attempt_at < slot_time - (interval_hours - 1) * 3600
+
+def register_device(user_id: int, provider: str, database: str = DATABASE):
+    """Start scheduled syncs for a newly connected device (older history comes from backfill_history)"""
+    get_writer(database).execute(
+        'INSERT OR IGNORE INTO device_syncs (user_id, provider) VALUES (?, ?)', (user_id, provider)
+    ).result()
+
+class SyncScheduler:
+    """Ticks every few seconds and syncs the devices that are due"""
+
+    def __init__(self, token_lookup: Callable[[int, str], Optional[str]], database: str = DATABASE,
+                 api: FitnessTrackerAPI = fitness_tracker_api, max_workers: int = 4,
+                 tick: float = 30.0, initial_days: int = 7, max_gap_days: int = 30):
+        self.token_lookup = token_lookup
+        self.database = database
+        self.api = api
+        self.max_workers = max_workers
+        self.tick = tick
+        self.initial_days = initial_days
+        self.max_gap_days = max_gap_days
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='device-scheduler')
+        self._lock = threading.Lock()
+        self._running = set()
+        self._backfill_attempts = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'scheduled': 0, 'synced': 0, 'failed': 0, 'days': 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='device-scheduler', daemon=True)
+            self._thread.start()
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+                self.resume_backfills()
+            except Exception as e:
+                print(f"Device sync scheduler error: {e}")
+            self._stop.wait(self.tick)
+
+    def due_devices(self, now: Optional[float] = None) -> List[Dict]:
+        """Devices due for a sync, most recently active users first"""
+        now = time.time() if now is None else now
+        today = datetime.fromtimestamp(now).date()
+        with get_pool(self.database).connection() as conn:
+            rows = conn.execute('''
+                SELECT d.user_id, d.provider, d.synced_through, d.last_attempt_at, s.last_log_date
+                FROM device_syncs d LEFT JOIN user_stats s ON s.user_id = d.user_id
+            ''').fetchall()
+
+        due = [dict(row) for row in rows if is_due(
+            sync_slot(row['user_id'], row['provider']),
+            sync_interval_hours(row['last_log_date'], today),
+            row['last_attempt_at'], now
+        )]
+        due.sort(key=lambda row: row['last_log_date'] or '', reverse=True)
+        return due
+
+    def run_pending(self, now: Optional[float] = None) -> int:
+        """Queue every due device not already syncing; returns how many were queued"""
+        queued = 0
+        for device in self.due_devices(now):
+            key = (device['user_id'], device['provider'])
+            with self._lock:
+                if key in self._running:
+                    continue
+                self._running.add(key)
+                self.stats['scheduled'] += 1
+            self._executor.submit(self._run, device)
+            queued += 1
+        return queued
+
+    def _run(self, device: Dict):
+        try:
+            self.sync_device(device['user_id'], device['provider'], device['synced_through'])
+        finally:
+            with self._lock:
+                self._running.discard((device['user_id'], device['provider']))
+
+    def sync_device(self, user_id: int, provider: str, synced_through: Optional[str]) -> Dict:
+        """Pull the days after the high-water mark (and today, which is still filling in).
+
+        A gap longer than max_gap_days is caught up oldest first, one window
+        per sync; the device stays due until the window reaches today.
+        """
+        today = date.today()
+        start = (today - timedelta(days=self.initial_days - 1) if not synced_through
+                 else datetime.strptime(synced_through, '%Y-%m-%d').date() + timedelta(days=1))
+        start = min(start, today)
+        end = min(start + timedelta(days=self.max_gap_days - 1), today)
+        started = time.time()
+
+        try:
+            token = self.token_lookup(user_id, provider)
+            if not token:
+                raise LookupError(f'no {provider} token')
+            days = self.api.fetch_daily_range(provider, token, start.isoformat(), end.isoformat(),
+                                              deadline=time.monotonic() + self.api.sync_budget)
+        except Exception as e:
+            get_writer(self.database).execute('''
+                UPDATE device_syncs SET last_attempt_at = ?, last_error = ? WHERE user_id = ? AND provider = ?
+            ''', (started, str(e)[:500], user_id, provider)).result()
+            with self._lock:
+                self.stats['failed'] += 1
+            return {'provider': provider, 'error': str(e)}
+
+        # Completed days are done; today is fetched again next time
+        synced = min(end, today - timedelta(days=1)).isoformat()
+        # While catching up the attempt is not recorded, so the next tick
+        # picks up the following window
+        caught_up = end >= today
+
+        def save(conn):
+            loaded = store_days(conn, user_id, provider, days)
+            conn.execute('''
+                UPDATE device_syncs
+                SET synced_through = MAX(IFNULL(synced_through, ''), ?),
+                    last_attempt_at = CASE WHEN ? THEN ? ELSE last_attempt_at END,
+                    last_success_at = ?, last_error = NULL
+                WHERE user_id = ? AND provider = ?
+            ''', (synced, caught_up, started, time.time(), user_id, provider))
+            return loaded
+
+        loaded = get_writer(self.database).submit(save).result()
+        with self._lock:
+            self.stats['synced'] += 1
+            self.stats['days'] += loaded
+        return {'provider': provider, 'days': loaded, 'synced_through': synced, 'caught_up': caught_up}
+
+    def queue_backfill(self, user_id: int, provider: str, start_date: str, end_date: str) -> bool:
+        """Run backfill_history for the device on the scheduler's workers.
+
+        Returns False if a backfill of the device is already running.
+        """
+        key = ('backfill', user_id, provider)
+        with self._lock:
+            if key in self._running:
+                return False
+            self._running.add(key)
+            self._backfill_attempts[(user_id, provider)] = time.time()
+        self._executor.submit(self._backfill, user_id, provider, start_date, end_date)
+        return True
+
+    def _backfill(self, user_id: int, provider: str, start_date: str, end_date: str):
+        try:
+            token = self.token_lookup(user_id, provider)
+            if not token:
+                print(f"{provider} backfill for user {user_id} skipped: no token")
+                return
+            backfill_history(user_id, provider, token, start_date, end_date, self.database, self.api)
+        except Exception as e:
+            print(f"{provider} backfill for user {user_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._running.discard(('backfill', user_id, provider))
+
+    def resume_backfills(self, now: Optional[float] = None) -> int:
+        """Queue the unfinished backfills not attempted within BACKFILL_RETRY_AFTER; returns how many"""
+        now = time.time() if now is None else now
+        queued = 0
+        for checkpoint in unfinished_backfills(self.database):
+            user_id, provider = checkpoint['user_id'], checkpoint['provider']
+            with self._lock:
+                attempted = self._backfill_attempts.get((user_id, provider))
+            if attempted is not None and now - attempted < BACKFILL_RETRY_AFTER:
+                continue
+            if self.queue_backfill(user_id, provider, checkpoint['start_date'], checkpoint['end_date']):
+                queued += 1
+        return queued
+
+def create_scheduler(token_lookup: Callable[[int, str], Optional[str]], database: str = DATABASE) -> SyncScheduler:
+    """Scheduler sized from DEVICE_SYNC_WORKERS (default 4)"""
+    return SyncScheduler(token_lookup, database, max_workers=int(os.getenv('DEVICE_SYNC_WORKERS', '4')))
@@ -0,0 +1,56 @@
+import ast
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+# Modules open their default databases on import; keep those out of the repo
+_scratch = tempfile.mkdtemp(prefix='fitness-tests-')
+for _name, _file in (('DATABASE_PATH', 'fitness_app.db'), ('AI_CACHE_PATH', 'ai_cache.db'),
+                     ('FOOD_STORE_PATH', 'food_store.db')):
+    os.environ[_name] = os.path.join(_scratch, _file)
+
+import pytest
+
+import migrations
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def _load_baseline(module: str):
+    """`_create_tables` from a module's source, without importing it.
+
+    Both modules open the app's database (and main.py the whole Flask app)
+    at import time, so only the function itself is compiled.
+    """
+    tree = ast.parse((ROOT / module).read_text(), module)
+    function = next(node for node in tree.body
+                    if isinstance(node, ast.FunctionDef) and node.name == '_create_tables')
+    namespace = {}
+    exec(compile(ast.Module(body=[function], type_ignores=[]), module, 'exec'), namespace)
+    return namespace['_create_tables']
+
+@pytest.fixture
+def baseline():
+    """Loader for a module's base tables: baseline('main.py')"""
+    return _load_baseline
+
+@pytest.fixture
+def connect(tmp_path):
+    """Opens connections to one fresh database file per test"""
+    connections = []
+
+    def connect():
+        conn = sqlite3.connect(tmp_path / 'test.db', isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        connections.append(conn)
+        return conn
+
+    yield connect
+    for conn in connections:
+        conn.close()
+
+@pytest.fixture
+def main_database(tmp_path, connect):
+    """Path of a database fully migrated in the main.py layout"""
+    migrations.migrate(connect(), baseline=_load_baseline('main.py'))
+    return str(tmp_path / 'test.db')
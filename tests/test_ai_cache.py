@@ -0,0 +1,47 @@
+"""
+OpenAI response cache: completions are only cached once the caller's
+parser accepts them
+"""
+
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from ai_cache import AIResponseCache
+
+MESSAGES = [{'role': 'user', 'content': 'insights please'}]
+
+@pytest.fixture
+def replies(monkeypatch):
+    """Queue of completion contents the fake OpenAI client returns in order"""
+    queue = []
+
+    def create(model, messages, **params):
+        message = SimpleNamespace(content=queue.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setitem(sys.modules, 'openai', SimpleNamespace(ChatCompletion=SimpleNamespace(create=create)))
+    return queue
+
+@pytest.fixture
+def cache(tmp_path):
+    return AIResponseCache(str(tmp_path / 'ai_cache.db'))
+
+def test_rejected_completion_is_not_cached(cache, replies):
+    replies.extend(['Here are your insights!', '[{"message": "hi"}]'])
+
+    with pytest.raises(json.JSONDecodeError):
+        cache.chat_completion('gpt', MESSAGES, parse=json.loads)
+    assert cache.chat_completion('gpt', MESSAGES, parse=json.loads) == [{'message': 'hi'}]
+    # Now served from the cache
+    assert cache.chat_completion('gpt', MESSAGES, parse=json.loads) == [{'message': 'hi'}]
+    assert replies == []
+
+def test_cached_content_the_parser_rejects_is_fetched_again(cache, replies):
+    replies.extend(['not json', '{"message": "hi"}'])
+
+    assert cache.chat_completion('gpt', MESSAGES) == 'not json'
+    assert cache.chat_completion('gpt', MESSAGES, parse=json.loads) == {'message': 'hi'}
+    assert cache.chat_completion('gpt', MESSAGES) == '{"message": "hi"}'
@@ -0,0 +1,56 @@
+"""
+Dashboard API: responses carry an ETag and revalidate to 304 until the
+user's data changes
+"""
+
+import sqlite3
+import sys
+
+import pytest
+
+import personalization
+from dashboard_cache import bump_data_version
+
+@pytest.fixture
+def client(main_database, monkeypatch):
+    # main.py imports the module under its British spelling
+    sys.modules.setdefault('personalisation', personalization)
+    import main
+
+    monkeypatch.setattr(main, 'DATABASE', main_database)
+    monkeypatch.setattr(main, 'BACKGROUND_JOBS', False)
+    with sqlite3.connect(main_database) as conn:
+        conn.execute('''
+            INSERT INTO users (id, name, email, password_hash, questionnaire_completed)
+            VALUES (1, 'A', 'a@example.com', 'x', 1)
+        ''')
+    main.dashboard_cache.clear()
+    main.app.config['TESTING'] = True
+    client = main.app.test_client()
+    with client.session_transaction() as session:
+        session['user_email'] = 'a@example.com'
+    return client
+
+def test_unchanged_dashboard_revalidates_to_304(client, main_database):
+    first = client.get('/api/dashboard-data')
+    assert first.status_code == 200 and first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    again = client.get('/api/dashboard-data', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.data == b''
+
+    with sqlite3.connect(main_database) as conn:
+        conn.execute('''
+            INSERT INTO daily_logs (user_id, date, weight, sleep_hours, water_intake, stress_level, mood,
+                                    food_log, workout, workout_duration, notes, score)
+            VALUES (1, '2024-01-01', 72.5, 7.5, 2.0, 4, 'good', 'oats', 'run', '30', '', 7.5)
+        ''')
+        bump_data_version(conn, 1)
+
+    changed = client.get('/api/dashboard-data', headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != first.headers['ETag']
+
+def test_stale_etag_gets_the_full_body(client):
+    response = client.get('/api/dashboard-data', headers={'If-None-Match': '"not-the-etag"'})
+    assert response.status_code == 200 and response.get_json()
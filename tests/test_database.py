@@ -0,0 +1,58 @@
+"""
+database.py daily logs: typed columns round-trip the logged values, and
+the online backfill resumes from its checkpoint
+"""
+
+import json
+
+import pytest
+
+import database
+from db_pool import connection
+
+@pytest.fixture(autouse=True)
+def empty_logs():
+    with connection() as conn:
+        conn.execute('DELETE FROM daily_logs')
+        conn.execute('DELETE FROM backfills')
+
+def _log(day, **fields):
+    return {'date': f'2024-01-{day:02d}', 'timestamp': f'2024-01-{day:02d}T08:00:00', **fields}
+
+def test_logs_come_back_as_saved():
+    logs = [
+        _log(1, weight='72.5', sleep_hours='7', stress_level='4', notes='form strings'),
+        _log(2, weight=72, sleep_hours=7.5, stress_level=4, workout_duration=30.0, score=8),
+        _log(3, weight=71.8, score=7.5, stress_level='n/a'),
+    ]
+    for log in logs:
+        database.add_daily_log('a@example.com', log)
+
+    # Compared as JSON, since 7 == 7.0 == '7' would not show a changed type
+    saved = database.get_user_logs('a@example.com')
+    assert json.dumps(saved, sort_keys=True) == json.dumps(logs[::-1], sort_keys=True)
+
+    # Numeric values are in the columns whatever form they were logged in
+    with connection() as conn:
+        rows = conn.execute('SELECT weight, sleep_hours, stress_level FROM daily_logs ORDER BY date').fetchall()
+    assert [tuple(row) for row in rows] == [(72.5, 7.0, 4), (72.0, 7.5, 4), (71.8, None, None)]
+
+def test_backfill_resumes_from_its_checkpoint():
+    with connection() as conn:
+        for day in range(1, 6):
+            log = _log(day, weight=70.0 + day, sleep_hours='7')
+            conn.execute('INSERT INTO daily_logs (id, user_email, date, timestamp, data) VALUES (?, ?, ?, ?, ?)',
+                         (day, 'a@example.com', log['date'], log['timestamp'], json.dumps(log)))
+        # An earlier run stopped after row 2
+        conn.execute("INSERT INTO backfills (name, last_id, target_id) VALUES ('daily_log_columns', 2, 5)")
+
+    database.backfill_log_columns(batch_size=2)
+
+    with connection() as conn:
+        rows = conn.execute('SELECT id, weight, data FROM daily_logs ORDER BY id').fetchall()
+        progress = conn.execute("SELECT last_id FROM backfills WHERE name = 'daily_log_columns'").fetchone()[0]
+    assert [row['weight'] for row in rows] == [None, None, 73.0, 74.0, 75.0]
+    # Moved values leave the blob; strings stay there in their original form
+    assert 'weight' not in json.loads(rows[2]['data']) and json.loads(rows[2]['data'])['sleep_hours'] == '7'
+    assert progress == 5
+    assert [log['weight'] for log in database.get_user_logs('a@example.com')] == [75.0, 74.0, 73.0, 72.0, 71.0]
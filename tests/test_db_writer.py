@@ -0,0 +1,57 @@
+"""
+Group-commit writer: a failing operation is rolled back to its savepoint
+without taking the rest of its batch with it
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from db_writer import GroupCommitWriter
+
+@pytest.fixture
+def writer(tmp_path):
+    path = str(tmp_path / 'writer.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE items (name TEXT PRIMARY KEY)')
+    writer = GroupCommitWriter(path)
+    yield writer
+    writer.close()
+
+def _names(writer):
+    with sqlite3.connect(writer.database) as conn:
+        return [row[0] for row in conn.execute('SELECT name FROM items ORDER BY name')]
+
+def test_failed_operation_only_rolls_back_itself(writer):
+    # Hold the writer inside a first batch so the next three queue up together
+    running, release = threading.Event(), threading.Event()
+    blocker = writer.submit(lambda conn: running.set() or release.wait(5))
+    running.wait(5)
+
+    def failing(conn):
+        conn.execute("INSERT INTO items VALUES ('b')")
+        raise RuntimeError('bad row')
+
+    first = writer.execute("INSERT INTO items VALUES ('a')")
+    second = writer.submit(failing)
+    third = writer.execute("INSERT INTO items VALUES ('c')")
+    release.set()
+
+    assert blocker.result(5) is True
+    assert first.result(5) == 1 and third.result(5) == 1
+    with pytest.raises(RuntimeError, match='bad row'):
+        second.result(5)
+    assert _names(writer) == ['a', 'c']
+    # The second batch committed despite the failure inside it
+    assert writer.stats['commits'] == 2 and writer.stats['failed'] == 1
+
+def test_constraint_error_is_reported_to_its_caller_only(writer):
+    writer.execute("INSERT INTO items VALUES ('a')").result(5)
+    duplicate = writer.execute("INSERT INTO items VALUES ('a')")
+    other = writer.execute("INSERT INTO items VALUES ('b')")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(5)
+    assert other.result(5) == 1
+    assert _names(writer) == ['a', 'b']
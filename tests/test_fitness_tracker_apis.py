@@ -0,0 +1,62 @@
+"""
+Device syncs: upstream requests never outlive the sync deadline
+"""
+
+import threading
+import time
+
+import pytest
+import requests
+
+import fitness_tracker_apis
+from fitness_tracker_apis import PROVIDER_CONCURRENCY, FitnessTrackerAPI
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setenv('FITBIT_CLIENT_ID', 'id')
+    monkeypatch.setenv('OURA_API_KEY', 'key')
+    return FitnessTrackerAPI()
+
+@pytest.fixture
+def hanging_upstream(monkeypatch):
+    """Upstream that never answers: each request takes its full read timeout"""
+    calls = []
+
+    def request(method, url, integration, timeout=None, retries=None, **kwargs):
+        calls.append({'timeout': timeout, 'retries': retries})
+        time.sleep(timeout[1])
+        raise requests.Timeout('read timed out')
+
+    monkeypatch.setattr(fitness_tracker_apis.http_client, 'request', request)
+    return calls
+
+def _slots_free(api):
+    return all(limit._value == PROVIDER_CONCURRENCY[name] for name, limit in api._limits.items())
+
+def test_timed_out_providers_release_their_slots_by_the_deadline(api, hanging_upstream):
+    started = time.monotonic()
+    results = api.sync_all_connected_devices({'fitbit_access_token': 'f', 'oura_access_token': 'o'}, '2024-01-01',
+                                             budget=0.3)
+    assert all('timed out' in result['error'] for result in results)
+
+    # The provider threads wind down with their requests, right after the deadline
+    time.sleep(0.15)
+    assert _slots_free(api)
+    assert time.monotonic() - started < 1.0
+    assert all(call['retries'] == 0 and call['timeout'][0] <= 0.3 and call['timeout'][1] <= 0.3
+               for call in hanging_upstream)
+
+def test_request_without_deadline_waits_for_a_slot(api, monkeypatch):
+    monkeypatch.setattr(fitness_tracker_apis.http_client, 'request', lambda *args, **kwargs: 'ok')
+    limit = api._limits['oura']
+    for _ in range(4):
+        limit.acquire()
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(api._request('GET', 'url', 'oura', None)))
+    thread.start()
+    time.sleep(0.2)
+    assert thread.is_alive()
+    limit.release()
+    thread.join(1)
+    assert results == ['ok']
@@ -0,0 +1,36 @@
+"""
+Merged food search results: near-duplicates across sources collapse into
+their most complete record, and unrelated foods are dropped
+"""
+
+from food_search import merge_results
+
+def _food(name, source, brand=None, **per_100g):
+    return {'name': name, 'brand': brand, 'source': source,
+            **{f'{key}_per_100g': value for key, value in per_100g.items()}}
+
+def test_duplicates_across_sources_keep_the_most_complete_record():
+    sparse = _food("McDonald's Big Mac", 'OpenFoodFacts', brand="McDonald's", calories=257)
+    complete = _food('Big Mac', 'UK Restaurant', brand='McDonalds', calories=250, protein=12, carbs=20, fat=13)
+
+    assert merge_results('big mac', [sparse, complete]) == [complete]
+
+def test_same_name_with_different_nutrition_stays_apart():
+    cola = _food('Cola', 'OpenFoodFacts', brand='Coca-Cola', calories=42)
+    diet = _food('Cola', 'UK Retail', brand='Coca-Cola', calories=0.3)
+
+    assert merge_results('cola', [cola, diet]) == [diet, cola]
+
+def test_unrelated_foods_are_dropped_and_best_match_ranks_first():
+    foods = [
+        _food('Apple Pie', 'USDA FoodData Central', calories=237),
+        _food('Banana', 'USDA FoodData Central', calories=89),
+        _food('Apple, raw', 'USDA FoodData Central', calories=52),
+    ]
+    names = [food['name'] for food in merge_results('apple raw', foods)]
+    assert names[0] == 'Apple, raw' and 'Banana' not in names
+
+def test_limit_and_nameless_records():
+    foods = [{'name': '', 'source': 'Edamam'}] + [_food(f'Oat bar {n}', 'UK Retail', brand=f'B{n}') for n in range(5)]
+    merged = merge_results('oat bar', foods, limit=3)
+    assert len(merged) == 3 and all(food['name'] for food in merged)
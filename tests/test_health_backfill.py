@@ -0,0 +1,57 @@
+"""
+Device history backfill: interrupted backfills resume from their
+checkpoint, even when retried with a later end date
+"""
+
+import sqlite3
+
+import pytest
+
+from health_backfill import backfill_history, load_backfill, unfinished_backfills
+
+class FakeAPI:
+    """fetch_daily_range stand-in that records its windows and can fail one"""
+
+    def __init__(self, fail_on=()):
+        self.calls = []
+        self.fail_on = set(fail_on)
+
+    def fetch_daily_range(self, provider, access_token, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        if len(self.calls) in self.fail_on:
+            raise ConnectionError('upstream down')
+        return {start_date: {'steps': 1000, 'raw': {'day': start_date}}}
+
+@pytest.fixture
+def database(main_database):
+    with sqlite3.connect(main_database) as conn:
+        conn.execute("INSERT INTO users (id, name, email, password_hash) VALUES (1, 'A', 'a@example.com', 'x')")
+    return main_database
+
+def test_interrupted_backfill_resumes_with_a_later_end(database):
+    # google_fit is fetched in 90-day windows
+    api = FakeAPI(fail_on={2})
+    result = backfill_history(1, 'google_fit', 'token', '2024-01-01', '2024-06-30', database, api)
+    assert result['next_date'] == '2024-03-31' and 'error' in result
+    assert [row['provider'] for row in unfinished_backfills(database)] == ['google_fit']
+
+    # Retried a day later: picks up at the checkpoint and runs to the new end
+    api = FakeAPI()
+    result = backfill_history(1, 'google_fit', 'token', '2024-01-02', '2024-07-01', database, api)
+    assert api.calls == [('2024-03-31', '2024-06-28'), ('2024-06-29', '2024-07-01')]
+    assert 'error' not in result and result['days_loaded'] == 3
+
+    checkpoint = load_backfill(1, 'google_fit', database)
+    assert (checkpoint['start_date'], checkpoint['end_date']) == ('2024-01-01', '2024-07-01')
+    assert checkpoint['finished_at'] and unfinished_backfills(database) == []
+
+def test_finished_backfill_starts_over(database):
+    backfill_history(1, 'oura', 'token', '2024-01-01', '2024-01-31', database, FakeAPI())
+
+    api = FakeAPI()
+    backfill_history(1, 'oura', 'token', '2024-02-01', '2024-02-29', database, api)
+    assert api.calls == [('2024-02-01', '2024-02-29')]
+
+def test_empty_range_is_finished(database):
+    backfill_history(1, 'oura', 'token', '2024-01-02', '2024-01-01', database, FakeAPI())
+    assert unfinished_backfills(database) == []
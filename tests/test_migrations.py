@@ -0,0 +1,60 @@
+"""
+Schema migration checks: every hot query must be index-backed on a freshly
+migrated database, in both the database.py and main.py table layouts
+"""
+
+import pytest
+
+import migrations
+
+@pytest.mark.parametrize('module', ['database.py', 'main.py'])
+def test_hot_queries_use_indexes(connect, baseline, module):
+    conn = connect()
+    assert migrations.migrate(conn, baseline=baseline(module)) == migrations.SCHEMA_VERSION
+    assert migrations.check_query_plans(conn) == []
+
+@pytest.mark.parametrize('module', ['database.py', 'main.py'])
+def test_migrate_is_idempotent(connect, baseline, module):
+    create_tables = baseline(module)
+    migrations.migrate(connect(), baseline=create_tables)
+
+    conn = connect()
+    assert migrations.migrate(conn, baseline=create_tables) == migrations.SCHEMA_VERSION
+    assert migrations.schema_version(conn) == migrations.SCHEMA_VERSION
+
+def test_unindexed_baseline_is_reported(connect, baseline):
+    # Without the migrations' indexes the check must flag the email-keyed
+    # queries, or the assertions above would pass vacuously (main.py's
+    # UNIQUE(user_id, date) already backs its queries before any migration)
+    conn = connect()
+    baseline('database.py')(conn)
+    assert migrations.check_query_plans(conn) != []
+
+def test_health_data_duplicates_are_removed(connect, baseline):
+    conn = connect()
+    migrations.migrate(conn, baseline=baseline('main.py'))
+    # Roll back to before the dedupe and seed what older versions allowed
+    conn.execute('DROP INDEX idx_health_data_user_date_source')
+    conn.execute('PRAGMA user_version = 11')
+    conn.execute("INSERT INTO raw_payloads (id, digest, codec, size, data) VALUES (1, x'01', 'none', 2, '{}')")
+    conn.execute("INSERT INTO raw_payloads (id, digest, codec, size, data) VALUES (2, x'02', 'none', 2, '{}')")
+    rows = [
+        (1, 1, '2024-01-01', 100, 'fitbit', 1),
+        (2, 1, '2024-01-01', 200, 'fitbit', 2),
+        (3, 1, '2024-01-01', 300, 'oura', None),
+        (4, 2, '2024-01-01', 400, 'fitbit', None),
+        (5, 1, '2024-01-02', 500, None, None),
+        (6, 1, '2024-01-02', 600, None, None),
+    ]
+    conn.executemany('''
+        INSERT INTO health_data (id, user_id, date, steps, source, raw_payload_id) VALUES (?, ?, ?, ?, ?, ?)
+    ''', rows)
+
+    assert migrations.migrate(conn) == migrations.SCHEMA_VERSION
+    assert [row[0] for row in conn.execute('SELECT id FROM health_data ORDER BY id')] == [2, 3, 4, 5, 6]
+    # The deleted row's payload went with it
+    assert [row[0] for row in conn.execute('SELECT id FROM raw_payloads')] == [2]
+
+    conn.execute("INSERT OR REPLACE INTO health_data (user_id, date, steps, source) VALUES (1, '2024-01-01', 700, 'fitbit')")
+    assert conn.execute("SELECT COUNT(*) FROM health_data WHERE source = 'fitbit' AND user_id = 1").fetchone()[0] == 1
+    assert migrations.check_query_plans(conn) == []
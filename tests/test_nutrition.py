@@ -0,0 +1,31 @@
+"""
+Nutrition totals for foods with and without a known serving weight
+"""
+
+import pytest
+
+from food_database import NutritionCalculator
+
+NUGGETS = {'name': 'Chicken McNuggets', 'serving_size': '6 nuggets',
+           'nutrients': {'calories': '259 kcal', 'protein': '15g', 'carbs': '16g', 'fat': '15g'}}
+APPLE = {'name': 'Apple', 'calories_per_100g': 52, 'protein_per_100g': 0.3,
+         'carbs_per_100g': 14, 'fat_per_100g': 0.2}
+
+def test_serving_nutrition_scales_per_100g_values():
+    nutrition = NutritionCalculator.calculate_serving_nutrition(APPLE, 200)
+    assert nutrition == {'calories': 104.0, 'protein': 0.6, 'carbs': 28.0, 'fat': 0.4, 'serving_size': '200g'}
+
+def test_serving_nutrition_of_unknown_weight_food_is_none():
+    nutrition = NutritionCalculator.calculate_serving_nutrition(NUGGETS, 100)
+    assert nutrition == {'calories': None, 'protein': None, 'carbs': None, 'fat': None, 'serving_size': '100g'}
+
+def test_serving_nutrition_of_food_without_values_is_zero():
+    nutrition = NutritionCalculator.calculate_serving_nutrition({'name': 'Water'}, 250)
+    assert (nutrition['calories'], nutrition['protein']) == (0, 0)
+
+def test_day_totals_needs_servings_for_unknown_weight_food():
+    with pytest.raises(ValueError):
+        NutritionCalculator.day_totals({'lunch': [(NUGGETS, 100)]})
+
+    totals = NutritionCalculator.day_totals({'lunch': [(NUGGETS, None, 2), (APPLE, 100)]})
+    assert totals['total']['calories'] == pytest.approx(2 * 259 + 52)
@@ -0,0 +1,57 @@
+"""
+Device sync scheduler: interrupted history backfills are picked up again
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+from health_backfill import backfill_history, load_backfill
+from sync_scheduler import BACKFILL_RETRY_AFTER, SyncScheduler
+
+class FakeAPI:
+    sync_budget = 5.0
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def fetch_daily_range(self, provider, access_token, start_date, end_date, deadline=None):
+        self.calls.append((start_date, end_date))
+        if self.fail:
+            raise ConnectionError('upstream down')
+        return {start_date: {'steps': 1000}}
+
+@pytest.fixture
+def database(main_database):
+    with sqlite3.connect(main_database) as conn:
+        conn.execute("INSERT INTO users (id, name, email, password_hash) VALUES (1, 'A', 'a@example.com', 'x')")
+    return main_database
+
+def _wait_idle(scheduler):
+    deadline = time.monotonic() + 5
+    while scheduler._running and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def test_unfinished_backfill_is_resumed(database):
+    backfill_history(1, 'oura', 'token', '2024-01-01', '2024-01-31', database, FakeAPI(fail=True))
+
+    api = FakeAPI()
+    scheduler = SyncScheduler(lambda user_id, provider: 'token', database, api=api)
+    assert scheduler.resume_backfills() == 1
+    _wait_idle(scheduler)
+    assert api.calls == [('2024-01-01', '2024-01-31')]
+    assert load_backfill(1, 'oura', database)['finished_at']
+    assert scheduler.resume_backfills() == 0
+
+def test_failed_resume_waits_before_retrying(database):
+    backfill_history(1, 'oura', 'token', '2024-01-01', '2024-01-31', database, FakeAPI(fail=True))
+
+    scheduler = SyncScheduler(lambda user_id, provider: 'token', database, api=FakeAPI(fail=True))
+    now = time.time()
+    assert scheduler.resume_backfills(now) == 1
+    _wait_idle(scheduler)
+    assert scheduler.resume_backfills(now + 60) == 0
+    assert scheduler.resume_backfills(now + BACKFILL_RETRY_AFTER + 1) == 1
+    _wait_idle(scheduler)
@@ -0,0 +1,43 @@
+"""
+Device token storage: tokens are encrypted under DATA_ENCRYPTION_KEY and
+never stored without one
+"""
+
+import sqlite3
+
+import pytest
+from cryptography.fernet import Fernet
+
+import schema
+from token_manager import TokenManager
+
+TOKENS = {'access_token': 'access', 'refresh_token': 'refresh', 'expires_in': 3600}
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.delenv('DATA_ENCRYPTION_KEY', raising=False)
+    path = str(tmp_path / 'tokens.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute(schema.CREATE_DEVICE_TOKENS)
+    return path
+
+def _stored(database):
+    with sqlite3.connect(database) as conn:
+        return conn.execute('SELECT access_token, refresh_token FROM device_tokens').fetchall()
+
+def test_tokens_are_not_stored_without_a_key(database):
+    with pytest.raises(RuntimeError, match='DATA_ENCRYPTION_KEY'):
+        TokenManager(database).store_tokens(1, 'fitbit', TOKENS)
+    assert _stored(database) == []
+
+def test_tokens_are_encrypted_and_survive_a_restart(database, monkeypatch):
+    monkeypatch.setenv('DATA_ENCRYPTION_KEY', Fernet.generate_key().decode())
+    TokenManager(database).store_tokens(1, 'fitbit', TOKENS)
+
+    [(access, refresh)] = _stored(database)
+    assert 'access' not in access and 'refresh' not in refresh
+    assert TokenManager(database).get_token(1, 'fitbit') == 'access'
+
+def test_tokens_under_another_key_count_as_disconnected(database):
+    TokenManager(database, key=Fernet.generate_key().decode()).store_tokens(1, 'fitbit', TOKENS)
+    assert TokenManager(database, key=Fernet.generate_key().decode()).get_token(1, 'fitbit') is None
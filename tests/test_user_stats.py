@@ -0,0 +1,69 @@
+"""
+Materialized user stats: the incremental update after each saved log must
+match a full recompute from the log history
+"""
+
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+import user_stats
+
+COLUMNS = ('total_logs', 'active_days', 'current_streak', 'longest_streak', 'last_log_date',
+           'avg_score_7d', 'avg_score_30d', 'active_days_7d', 'active_days_30d')
+
+@pytest.fixture
+def conn(main_database):
+    conn = sqlite3.connect(main_database, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("INSERT INTO users (id, name, email, password_hash) VALUES (1, 'A', 'a@example.com', 'x')")
+    yield conn
+    conn.close()
+
+def _save_log(conn, day, workout_duration, score):
+    """Write a log the way main.py's daily log route does"""
+    previous = user_stats.log_snapshot(conn, 1, day)
+    conn.execute('''
+        INSERT OR REPLACE INTO daily_logs (user_id, date, workout_duration, score) VALUES (1, ?, ?, ?)
+    ''', (day, workout_duration, score))
+    user_stats.record_daily_log(conn, 1, day, previous)
+
+def _stats(conn):
+    row = conn.execute('SELECT * FROM user_stats WHERE user_id = 1').fetchone()
+    return {column: row[column] for column in COLUMNS}
+
+def _assert_matches_refresh(conn):
+    incremental = _stats(conn)
+    user_stats.refresh_user_stats(conn, 1)
+    assert incremental == _stats(conn)
+
+def test_backfilled_day_joins_two_streaks(conn):
+    today = date.today()
+    days = [(today - timedelta(days=n)).isoformat() for n in range(6, -1, -1)]
+    for day in days[:3] + days[4:]:
+        _save_log(conn, day, '30', 7.0)
+    assert _stats(conn)['current_streak'] == 3
+
+    _save_log(conn, days[3], '', 0)
+    assert (_stats(conn)['current_streak'], _stats(conn)['longest_streak']) == (7, 7)
+    _assert_matches_refresh(conn)
+
+def test_replaced_log_updates_active_days(conn):
+    day = date.today().isoformat()
+    _save_log(conn, day, '45', 8.0)
+    _save_log(conn, day, '', 6.0)
+    assert (_stats(conn)['total_logs'], _stats(conn)['active_days']) == (1, 0)
+    _save_log(conn, day, '20', 6.0)
+    assert _stats(conn)['active_days'] == 1
+    _assert_matches_refresh(conn)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_history_matches_refresh(conn, seed):
+    rng = random.Random(seed)
+    today = date.today()
+    for _ in range(60):
+        day = (today - timedelta(days=rng.randrange(40))).isoformat()
+        _save_log(conn, day, rng.choice(['', '0', '30', 'yoga', '60']), rng.choice([0, 5.5, 7.0, 9.0]))
+        _assert_matches_refresh(conn)
@@ -0,0 +1,234 @@
+"""
+Device Token Manager
+Stores each user's provider OAuth tokens (encrypted at rest) with their
+expiry and refreshes them in the background shortly before they expire,
+so syncs always get a live access token from memory instead of failing
+on an expired one first
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from db_pool import DATABASE, get_pool
+from db_writer import get_writer
+from oauth_handlers import FitnessOAuthHandler, oauth_handler
+from singleflight import SingleFlight
+
+# A token is refreshed in the background once it is this close to expiry;
+# get_token only refreshes inline if it gets within the smaller margin
+REFRESH_LEAD = 600
+INLINE_MARGIN = 60
+# Wait after a failed refresh before it is retried
+RETRY_AFTER = 300
+
+class TokenManager:
+    """Device tokens cached in memory, refreshed ahead of expiry by a background thread"""
+
+    def __init__(self, database: str = DATABASE, handler: FitnessOAuthHandler = oauth_handler,
+                 max_workers: int = 2, tick: float = 60.0, lead: float = REFRESH_LEAD,
+                 key: Optional[str] = None):
+        self.database = database
+        # Tokens are Fernet-encrypted in the database under `key`, or
+        # DATA_ENCRYPTION_KEY; the cipher is built on first use
+        self._key = key
+        self._cipher = None
+        self.tick = tick
+        self.lead = lead
+        self._refreshers = {
+            'fitbit': handler.refresh_fitbit_token,
+            'oura': handler.refresh_oura_token,
+            'google_fit': handler.refresh_google_fit_token,
+        }
+        # One refresh per (user, provider) at a time: Fitbit refresh tokens
+        # are single use, so a second concurrent refresh would fail
+        self._flight = SingleFlight()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='token-refresh')
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'hits': 0, 'loads': 0, 'refreshed': 0, 'inline': 0, 'failed': 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='token-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh_expiring()
+            except Exception as e:
+                print(f"Token refresh error: {e}")
+            self._stop.wait(self.tick)
+
+    def _fernet(self) -> Fernet:
+        if self._cipher is None:
+            key = self._key or os.getenv('DATA_ENCRYPTION_KEY')
+            if not key:
+                # A throwaway key would make every stored token unreadable after a restart
+                raise RuntimeError('DATA_ENCRYPTION_KEY is not set; device tokens cannot be stored')
+            self._cipher = Fernet(key)
+        return self._cipher
+
+    def _seal(self, value: Optional[str]) -> Optional[str]:
+        return self._fernet().encrypt(value.encode()).decode() if value is not None else None
+
+    def _open(self, value: Optional[str]) -> Optional[str]:
+        if not value:
+            return None
+        try:
+            return self._fernet().decrypt(value.encode()).decode()
+        except InvalidToken:
+            return None
+
+    def _load(self, user_id: int, provider: str) -> Optional[Dict]:
+        with get_pool(self.database).connection() as conn:
+            row = conn.execute(
+                'SELECT * FROM device_tokens WHERE user_id = ? AND provider = ?', (user_id, provider)
+            ).fetchone()
+        token = dict(row) if row else None
+        if token:
+            token['access_token'] = self._open(token['access_token'])
+            token['refresh_token'] = self._open(token['refresh_token'])
+            if token['access_token'] is None:
+                # Encrypted under another key: the device has to be reconnected
+                print(f"{provider} token for user {user_id} could not be decrypted")
+                token = None
+        with self._lock:
+            self.stats['loads'] += 1
+            if token:
+                self._tokens[(user_id, provider)] = token
+        return token
+
+    def store_tokens(self, user_id: int, provider: str, tokens: Dict):
+        """Save an OAuth token response ('access_token', 'refresh_token', 'expires_in')"""
+        now = time.time()
+        expires_in = tokens.get('expires_in')
+        token = {
+            'user_id': user_id,
+            'provider': provider,
+            'access_token': tokens['access_token'],
+            'refresh_token': tokens.get('refresh_token'),
+            'expires_at': now + float(expires_in) if expires_in else None,
+            'refreshed_at': now,
+            'refresh_failed_at': None,
+            'last_error': None,
+        }
+
+        access_token, refresh_token = self._seal(token['access_token']), self._seal(token['refresh_token'])
+
+        def save(conn):
+            conn.execute('''
+                INSERT INTO device_tokens
+                (user_id, provider, access_token, refresh_token, expires_at, refreshed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, provider) DO UPDATE SET
+                    access_token = excluded.access_token,
+                    refresh_token = IFNULL(excluded.refresh_token, refresh_token),
+                    expires_at = excluded.expires_at, refreshed_at = excluded.refreshed_at,
+                    refresh_failed_at = NULL, last_error = NULL
+            ''', (user_id, provider, access_token, refresh_token, token['expires_at'], now))
+
+        get_writer(self.database).submit(save).result()
+        with self._lock:
+            cached = self._tokens.get((user_id, provider))
+            if token['refresh_token'] is None and cached:
+                # Providers like Google only send a refresh token once
+                token['refresh_token'] = cached['refresh_token']
+            self._tokens[(user_id, provider)] = token
+
+    def get_token(self, user_id: int, provider: str) -> Optional[str]:
+        """A live access token for the device, or None if it is not connected.
+
+        Normally answered from memory; a token the background refresh has
+        not reached yet is refreshed here before it is handed out.
+        """
+        with self._lock:
+            token = self._tokens.get((user_id, provider))
+            if token:
+                self.stats['hits'] += 1
+        token = token or self._load(user_id, provider)
+        if not token:
+            return None
+
+        expires_at, failed_at = token['expires_at'], token['refresh_failed_at']
+        if (expires_at is None or expires_at - time.time() > INLINE_MARGIN or not token['refresh_token']
+                or provider not in self._refreshers or (failed_at and time.time() - failed_at < RETRY_AFTER)):
+            return token['access_token'] if expires_at is None or expires_at > time.time() else None
+
+        with self._lock:
+            self.stats['inline'] += 1
+        refreshed = self.refresh(user_id, provider)
+        if refreshed:
+            return refreshed['access_token']
+        # Refresh failed: the old token is still worth a try until it expires
+        return token['access_token'] if expires_at > time.time() else None
+
+    def refresh(self, user_id: int, provider: str) -> Optional[Dict]:
+        """Refresh the device's token now; concurrent callers share one refresh"""
+        return self._flight.do((user_id, provider), self._refresh, user_id, provider)
+
+    def _refresh(self, user_id: int, provider: str) -> Optional[Dict]:
+        # Re-read first: another process may already have used (and
+        # rotated) the refresh token this one has cached
+        token = self._load(user_id, provider)
+        if not token or not token['refresh_token']:
+            return None
+        if token['expires_at'] is not None and token['expires_at'] - time.time() > self.lead:
+            return token
+
+        result = self._refreshers[provider](token['refresh_token'])
+        if 'error' in result or 'access_token' not in result:
+            error = result.get('error', 'no access token in refresh response')
+            print(f"{provider} token refresh for user {user_id} failed: {error}")
+            failed_at = time.time()
+            get_writer(self.database).execute('''
+                UPDATE device_tokens SET refresh_failed_at = ?, last_error = ? WHERE user_id = ? AND provider = ?
+            ''', (failed_at, str(error)[:500], user_id, provider)).result()
+            with self._lock:
+                token.update(refresh_failed_at=failed_at, last_error=str(error)[:500])
+                self.stats['failed'] += 1
+            return None
+
+        self.store_tokens(user_id, provider, result)
+        with self._lock:
+            self.stats['refreshed'] += 1
+            return self._tokens[(user_id, provider)]
+
+    def expiring_tokens(self, now: Optional[float] = None) -> List[tuple]:
+        """(user_id, provider) of refreshable tokens within `lead` seconds of expiry"""
+        now = time.time() if now is None else now
+        with get_pool(self.database).connection() as conn:
+            rows = conn.execute('''
+                SELECT user_id, provider FROM device_tokens
+                WHERE expires_at < ? AND refresh_token IS NOT NULL
+                AND (refresh_failed_at IS NULL OR refresh_failed_at < ?)
+                ORDER BY expires_at
+            ''', (now + self.lead, now - RETRY_AFTER)).fetchall()
+        return [(row['user_id'], row['provider']) for row in rows if row['provider'] in self._refreshers]
+
+    def refresh_expiring(self, now: Optional[float] = None) -> int:
+        """Refresh every token close to expiry; returns how many were attempted"""
+        keys = self.expiring_tokens(now)
+        list(self._executor.map(lambda key: self.refresh(*key), keys))
+        return len(keys)
+
+def create_token_manager(database: str = DATABASE) -> TokenManager:
+    """Token manager refreshing TOKEN_REFRESH_LEAD seconds (default 600) before expiry"""
+    return TokenManager(database, lead=float(os.getenv('TOKEN_REFRESH_LEAD', str(REFRESH_LEAD))))
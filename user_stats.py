@@ -0,0 +1,152 @@
+"""
+Materialized User Statistics
+One user_stats row per user, updated incrementally as daily logs are saved,
+so dashboards read streaks and averages instead of recomputing them
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+# workout_duration comes straight from the form, so it may be '' or text
+ACTIVE = 'CAST(workout_duration AS INTEGER) > 0'
+
+def _day_after(date: str) -> str:
+    return (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+
+def log_snapshot(conn: sqlite3.Connection, user_id: int, date: str) -> Tuple[bool, bool]:
+    """(exists, active) for a user's log on `date`, taken before it is written"""
+    row = conn.execute(
+        f'SELECT {ACTIVE} FROM daily_logs WHERE user_id = ? AND date = ?', (user_id, date)
+    ).fetchone()
+    return (row is not None, bool(row and row[0]))
+
+def record_daily_log(conn: sqlite3.Connection, user_id: int, date: str, previous: Tuple[bool, bool]):
+    """Update user_stats after the log for `date` was inserted or replaced.
+
+    `previous` is the log_snapshot() taken before the write. Must run in the
+    same transaction as the write itself.
+    """
+    existed, was_active = previous
+    stats = conn.execute('SELECT * FROM user_stats WHERE user_id = ?', (user_id,)).fetchone()
+    if stats is None:
+        refresh_user_stats(conn, user_id)
+        return
+
+    is_active = log_snapshot(conn, user_id, date)[1]
+    total_logs = stats['total_logs'] + (0 if existed else 1)
+    active_days = stats['active_days'] + int(is_active) - int(was_active)
+
+    last_log_date = stats['last_log_date']
+    current_streak = stats['current_streak']
+    longest_streak = stats['longest_streak']
+
+    if last_log_date is None or date > last_log_date:
+        if last_log_date and _day_after(last_log_date) == date:
+            current_streak += 1
+        else:
+            current_streak = 1
+        last_log_date = date
+        longest_streak = max(longest_streak, current_streak)
+    elif date < last_log_date and not existed:
+        # A missed day was filled in, which can join two runs together
+        current_streak = _streak_ending(conn, user_id, last_log_date)
+        longest_streak = _longest_streak(conn, user_id)
+
+    _save(conn, user_id, total_logs, active_days, current_streak, longest_streak, last_log_date)
+
+def refresh_user_stats(conn: sqlite3.Connection, user_id: int):
+    """Recompute a user's stats row from their full log history"""
+    total_logs, active_days, last_log_date = conn.execute(
+        f'SELECT COUNT(*), IFNULL(SUM({ACTIVE}), 0), MAX(date) FROM daily_logs WHERE user_id = ?',
+        (user_id,)
+    ).fetchone()
+
+    current_streak = _streak_ending(conn, user_id, last_log_date) if last_log_date else 0
+    longest_streak = _longest_streak(conn, user_id)
+    _save(conn, user_id, total_logs, active_days, current_streak, longest_streak, last_log_date)
+
+def _streak_ending(conn, user_id, end_date) -> int:
+    """Consecutive logged days ending at end_date (walks back one index step per day)"""
+    streak = 0
+    expected = end_date
+    rows = conn.execute(
+        'SELECT date FROM daily_logs WHERE user_id = ? AND date <= ? ORDER BY date DESC',
+        (user_id, end_date)
+    )
+    for (date,) in rows:
+        if date != expected:
+            break
+        streak += 1
+        expected = (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+    return streak
+
+def _longest_streak(conn, user_id) -> int:
+    longest = run = 0
+    previous = None
+    for (date,) in conn.execute('SELECT date FROM daily_logs WHERE user_id = ? ORDER BY date', (user_id,)):
+        run = run + 1 if previous and _day_after(previous) == date else 1
+        longest = max(longest, run)
+        previous = date
+    return longest
+
+def _today() -> str:
+    return datetime.now().strftime('%Y-%m-%d')
+
+def _windows(conn, user_id, today) -> Dict[int, Tuple]:
+    """(average score, active days) over the 7 and 30 days ending today; at most 30 rows read.
+
+    Unscored (0) days are left out of the averages, as they always were.
+    """
+    return {days: conn.execute(f'''
+        SELECT AVG(NULLIF(score, 0)), IFNULL(SUM({ACTIVE}), 0) FROM daily_logs
+        WHERE user_id = ? AND date > date(?, '-{days} days') AND date <= ?
+    ''', (user_id, today, today)).fetchone() for days in (7, 30)}
+
+def _save(conn, user_id, total_logs, active_days, current_streak, longest_streak, last_log_date):
+    today = _today()
+    windows = _windows(conn, user_id, today)
+    conn.execute('''
+        INSERT OR REPLACE INTO user_stats
+        (user_id, total_logs, active_days, current_streak, longest_streak, last_log_date,
+         avg_score_7d, avg_score_30d, active_days_7d, active_days_30d, updated_at, windows_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+    ''', (
+        user_id, total_logs, active_days, current_streak, longest_streak, last_log_date,
+        windows[7][0], windows[30][0], windows[7][1], windows[30][1], today
+    ))
+
+def load_user_stats(conn: sqlite3.Connection, user_id: int, today: Optional[str] = None) -> Dict:
+    """Dashboard stats for a user from their user_stats row.
+
+    streak_days only counts a streak that reaches today, matching the
+    dashboard's "log every day" streak. Rolling windows stored on an
+    earlier day are recomputed for today, so they age out for users who
+    stopped logging.
+    """
+    today = today or _today()
+    row = conn.execute('SELECT * FROM user_stats WHERE user_id = ?', (user_id,)).fetchone()
+    if row is None:
+        return {
+            'total_logs': 0, 'streak_days': 0, 'longest_streak': 0, 'days_active': 0,
+            'avg_score': 0, 'avg_score_7d': 0, 'active_days_7d': 0, 'total_active_days': 0,
+            'last_log_date': None
+        }
+
+    if row['windows_date'] == today:
+        windows = {7: (row['avg_score_7d'], row['active_days_7d']),
+                   30: (row['avg_score_30d'], row['active_days_30d'])}
+    else:
+        windows = _windows(conn, user_id, today)
+
+    return {
+        'total_logs': row['total_logs'],
+        'streak_days': row['current_streak'] if row['last_log_date'] == today else 0,
+        'longest_streak': row['longest_streak'],
+        'days_active': windows[30][1],
+        'avg_score': windows[30][0] or 0,
+        'avg_score_7d': windows[7][0] or 0,
+        'active_days_7d': windows[7][1],
+        'total_active_days': row['active_days'],
+        'last_log_date': row['last_log_date']
+    }